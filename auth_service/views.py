@@ -9,9 +9,20 @@ __license__ = "BSD - see LICENSE file in top-level directory"
 from django.http import HttpResponse
 from django.views.generic import View
 
+from authenticate.metrics import CONTENT_TYPE, REGISTRY, get_metrics_dir
+
 
 class HomeView(View):
     """ Simple view to confirm that the server is running. """
 
     def get(self, request):
         return HttpResponse("The auth service is running", status=200)
+
+
+class MetricsView(View):
+    """ View exposing the service's metrics in the Prometheus text format.
+    """
+
+    def get(self, request):
+        return HttpResponse(REGISTRY.render(get_metrics_dir()),
+            content_type=CONTENT_TYPE)
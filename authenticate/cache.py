@@ -0,0 +1,319 @@
+""" Caching utilities for auth results. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import hashlib
+import math
+import threading
+import time
+
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from authenticate.metrics import record_cache_lookup
+
+
+DEFAULT_AUTH_CACHE = {
+    # Alias of a Django CACHES backend to share entries between processes
+    "alias": None,
+    # Maximum number of entries held in-process for each kind of cache
+    "l1_size": 1024,
+    # Lifetime in seconds of entries of each kind, 0 disables caching.
+    # Decision caches may give separate "allow" and "deny" lifetimes.
+    "ttls": {
+        "authentication": 0,
+        "authorization": 0,
+        "opa": {"allow": 0, "deny": 0},
+    },
+    # Included in every key so that changing it invalidates old entries
+    "version": "1",
+}
+
+# Kinds of cache whose lifetimes are set outside of AUTH_CACHE, which are
+# flushed along with the others
+SEPARATE_CACHE_KINDS = ("saml_decision",)
+
+# Seconds between checks for a flush of a shared cache by another process
+GENERATION_CHECK_INTERVAL = 1
+
+_tiered_caches = {}
+
+_MISSING = object()
+
+
+class TTLCache:
+    """ Thread-safe LRU cache with a lifetime on each entry.
+
+    Entries are evicted in least-recently-used order once `maxsize` is
+    reached. The lifetime of an entry is the smaller of the cache's `ttl` and
+    any `ttl` given when the entry is stored. Lookups in caches given a
+    `name` are counted in metrics.
+    """
+
+    def __init__(self, maxsize, ttl, name=None):
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+
+        self.hits = 0
+        self.misses = 0
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """ Returns the value stored for a key, or `default` if the key is
+        missing or has expired.
+        """
+
+        now = time.monotonic()
+        with self._lock:
+
+            value = _MISSING
+            entry = self._data.get(key)
+            if entry is not None:
+
+                expires, value = entry
+                if expires > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                else:
+                    del self._data[key]
+                    value = _MISSING
+
+            if value is _MISSING:
+                self.misses += 1
+
+        if self.name:
+            record_cache_lookup(self.name, value is not _MISSING)
+
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        """ Stores a value, capping its lifetime at the cache TTL. """
+
+        if ttl is None or ttl > self.ttl:
+            ttl = self.ttl
+
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        expires = time.monotonic() + ttl
+        with self._lock:
+
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """ Removes a key from the cache if present. """
+
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """ Removes all entries and resets the counters. """
+
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ Returns a dictionary describing the cache's usage. """
+
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class TieredCache:
+    """ Two-tier cache for auth results.
+
+    A small in-process TTLCache (L1) sits in front of an optional Django cache
+    backend (L2) shared between worker processes. Keys are hashed and include
+    the kind of cache, a configured version and a generation number which is
+    incremented whenever the cache is flushed.
+
+    `ttl` may be a number of seconds or a dictionary of named lifetimes, such
+    as separate lifetimes for "allow" and "deny" decisions.
+    """
+
+    def __init__(self, kind, ttl, l1_size, alias=None, version="1"):
+
+        self.kind = kind
+
+        self._named_ttls = {}
+        if isinstance(ttl, dict):
+            self._named_ttls = ttl
+            ttl = max(ttl.values())
+
+        self.ttl = ttl
+
+        self._l1 = TTLCache(maxsize=l1_size, ttl=ttl)
+        self._l2 = caches[alias] if alias else None
+        self._prefix = f"auth:{kind}:{version}"
+
+        self._generation = 0
+        self._generation_checked_at = None
+
+    def _get_generation(self):
+        """ Returns the current generation, checking periodically whether the
+        shared cache has been flushed by another process.
+        """
+
+        if self._l2 is None:
+            return self._generation
+
+        now = time.monotonic()
+        if self._generation_checked_at is None or \
+                now - self._generation_checked_at > GENERATION_CHECK_INTERVAL:
+
+            self._generation_checked_at = now
+            generation = self._l2.get(f"{self._prefix}:generation", 0)
+            if generation != self._generation:
+                self._l1.clear()
+                self._generation = generation
+
+        return self._generation
+
+    def ttl_for(self, name):
+        """ Returns the named lifetime, or the cache's lifetime if none has
+        been set for the name.
+        """
+
+        return self._named_ttls.get(name, self.ttl)
+
+    def make_key(self, *parts):
+        """ Builds a cache key from some identifying values. """
+
+        digest = hashlib.sha256(repr(parts).encode()).hexdigest()
+        return f"{self._prefix}:{self._get_generation()}:{digest}"
+
+    def stats(self):
+        """ Returns a dictionary describing the usage of the L1 cache. """
+
+        return self._l1.stats()
+
+    def get(self, key):
+        """ Returns the value for a key from L1, falling back to L2. """
+
+        value = self._l1.get(key)
+        if value is None and self._l2 is not None:
+
+            entry = self._l2.get(key)
+            if entry is not None:
+
+                # Keep the entry in L1 only as long as it remains valid in L2
+                expires_at, value = entry
+                self._l1.set(key, value, ttl=expires_at - time.time())
+
+        record_cache_lookup(self.kind, value is not None)
+        return value
+
+    def set(self, key, value, ttl=None):
+        """ Stores a value in both tiers. """
+
+        if ttl is None or ttl > self.ttl:
+            ttl = self.ttl
+
+        if ttl <= 0:
+            return
+
+        self._l1.set(key, value, ttl=ttl)
+        if self._l2 is not None:
+            self._l2.set(key, (time.time() + ttl, value),
+                timeout=math.ceil(ttl))
+
+    def clear(self):
+        """ Invalidates all entries, including those shared with other
+        processes through L2.
+        """
+
+        self._l1.clear()
+        if self._l2 is None:
+            self._generation += 1
+            return
+
+        generation_key = f"{self._prefix}:generation"
+        try:
+            self._generation = self._l2.incr(generation_key)
+        except ValueError:
+            self._l2.set(generation_key, 1, timeout=None)
+            self._generation = 1
+
+        self._generation_checked_at = time.monotonic()
+
+
+def get_cache_settings():
+    """ Returns the AUTH_CACHE setting with defaults filled in. """
+
+    cache_settings = DEFAULT_AUTH_CACHE.copy()
+    cache_settings.update(getattr(settings, "AUTH_CACHE", {}))
+
+    return cache_settings
+
+
+def get_tiered_cache(kind):
+    """ Returns the shared TieredCache for a kind of result, or None if
+    caching is disabled for it.
+    """
+
+    if kind not in _tiered_caches:
+
+        cache_settings = get_cache_settings()
+
+        cache = None
+        ttl = cache_settings["ttls"].get(kind, 0)
+        max_ttl = max(ttl.values()) if isinstance(ttl, dict) else ttl
+        if max_ttl > 0:
+            cache = TieredCache(
+                kind,
+                ttl,
+                cache_settings["l1_size"],
+                alias=cache_settings["alias"],
+                version=cache_settings["version"]
+            )
+
+        _tiered_caches[kind] = cache
+
+    return _tiered_caches[kind]
+
+
+def flush_tiered_cache(kind):
+    """ Invalidates cached results of a kind in every process sharing the L2
+    backend, even if caching of the kind is disabled in this process.
+    """
+
+    cache = get_tiered_cache(kind)
+    if cache is None:
+
+        cache_settings = get_cache_settings()
+        cache = TieredCache(kind, 0, 0, alias=cache_settings["alias"],
+            version=cache_settings["version"])
+
+    cache.clear()
+
+
+@receiver(setting_changed)
+def _reset_tiered_caches(setting, **kwargs):
+
+    if setting in ("AUTH_CACHE", "CACHES"):
+        _tiered_caches.clear()
@@ -0,0 +1,229 @@
+""" Circuit breakers for calls to upstream services. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from authenticate.cache import TTLCache
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_CIRCUIT_BREAKER = {
+    # Consecutive failures which open a circuit, 0 disables the breaker
+    "failure_threshold": 5,
+    # Seconds after which a successful call is still counted as a failure
+    "latency_threshold": None,
+    # Seconds a circuit stays open before a probe call is let through
+    "reset_timeout": 30,
+    # Seconds for which the last result of a call may be served while its
+    # upstream is failing, 0 disables stale results
+    "grace_period": 0,
+    # Maximum number of results kept for serving while stale
+    "grace_size": 1024,
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+_circuit_breakers = {}
+
+
+class CircuitOpenError(Exception):
+    """ Raised when a call is refused because its circuit is open. """
+
+
+class CircuitBreaker:
+    """ Stops calling an upstream service while it is failing or slow.
+
+    After `failure_threshold` consecutive failed or slow calls the circuit
+    opens and calls fail fast with a CircuitOpenError. Once `reset_timeout`
+    seconds have passed, a single probe call is let through: the circuit
+    closes if it succeeds and opens again if it fails.
+
+    If a `grace_period` is given, the last result of each call is kept for
+    that long, and is returned in place of an error while the upstream is
+    failing.
+    """
+
+    def __init__(self, name, failure_exceptions=(Exception,),
+            failure_threshold=5, latency_threshold=None, reset_timeout=30,
+            grace_period=0, grace_size=1024):
+
+        self.name = name
+        self.failure_exceptions = failure_exceptions
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self.failures = 0
+
+        self._opened_at = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+        self._stale_results = TTLCache(grace_size, grace_period)
+
+    def _allow_call(self):
+        """ Returns True if a call may be sent upstream. """
+
+        with self._lock:
+
+            if self.state == CLOSED or self.failure_threshold <= 0:
+                return True
+
+            if self.state == OPEN and \
+                    time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+
+            return False
+
+    def _record_success(self):
+
+        with self._lock:
+
+            if self.state != CLOSED:
+                LOG.info(f"Circuit for {self.name} closed")
+
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def _record_failure(self):
+
+        with self._lock:
+
+            self.failures += 1
+            self._probing = False
+
+            if self.failure_threshold <= 0:
+                return
+
+            if self.state == HALF_OPEN or \
+                    self.failures >= self.failure_threshold:
+
+                if self.state != OPEN:
+                    LOG.warning(f"Circuit for {self.name} opened after "
+                        f"{self.failures} failures")
+
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def _record_result(self, key, result, started):
+        """ Records a completed call, counting it as a failure if it was
+        slow, and keeps its result for serving while stale.
+        """
+
+        elapsed = time.monotonic() - started
+        if self.latency_threshold and elapsed > self.latency_threshold:
+            LOG.warning(f"Slow call to {self.name} took {elapsed:.3f}s")
+            self._record_failure()
+        else:
+            self._record_success()
+
+        self._stale_results.set(key, result)
+        return result
+
+    def _stale_result(self, key, error):
+        """ Returns the last result for a key, or raises `error` if there is
+        none within the grace period.
+        """
+
+        result = self._stale_results.get(key)
+        if result is None:
+            raise error
+
+        LOG.info(f"Serving stale result from {self.name}: {error}")
+        return result
+
+    def call(self, key, func, *args, **kwargs):
+        """ Calls `func` unless the circuit is open. `key` identifies the
+        call's result for serving while stale.
+        """
+
+        if not self._allow_call():
+            return self._stale_result(key,
+                CircuitOpenError(f"Circuit for {self.name} is open"))
+
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+
+        except self.failure_exceptions as e:
+
+            self._record_failure()
+            return self._stale_result(key, e)
+
+        except BaseException:
+
+            # Errors which don't indicate an upstream failure end a probe
+            with self._lock:
+                self._probing = False
+            raise
+
+        return self._record_result(key, result, started)
+
+    async def acall(self, key, func, *args, **kwargs):
+        """ Awaits `func` unless the circuit is open. `key` identifies the
+        call's result for serving while stale.
+        """
+
+        if not self._allow_call():
+            return self._stale_result(key,
+                CircuitOpenError(f"Circuit for {self.name} is open"))
+
+        started = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+
+        except self.failure_exceptions as e:
+
+            self._record_failure()
+            return self._stale_result(key, e)
+
+        except BaseException:
+
+            with self._lock:
+                self._probing = False
+            raise
+
+        return self._record_result(key, result, started)
+
+
+def get_circuit_breaker(name, failure_exceptions=(Exception,)):
+    """ Returns the shared CircuitBreaker for an upstream service, configured
+    by the `CIRCUIT_BREAKER` setting.
+    """
+
+    if name not in _circuit_breakers:
+
+        breaker_settings = DEFAULT_CIRCUIT_BREAKER.copy()
+        breaker_settings.update(getattr(settings, "CIRCUIT_BREAKER", {}))
+
+        _circuit_breakers[name] = CircuitBreaker(name,
+            failure_exceptions=failure_exceptions, **breaker_settings)
+
+    return _circuit_breakers[name]
+
+
+@receiver(setting_changed)
+def _reset_circuit_breakers(setting, **kwargs):
+
+    if setting == "CIRCUIT_BREAKER":
+        _circuit_breakers.clear()
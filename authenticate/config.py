@@ -0,0 +1,174 @@
+""" Settings used on the request path, read and validated once. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import binascii
+import codecs
+import logging
+import os
+
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_RESOURCE_URI_QUERY_KEY = "next"
+DEFAULT_RESOURCE_URI_HEADER_KEY = "HTTP_X_ORIGINAL_URI"
+DEFAULT_RESOURCE_URI_SESSION_KEY = "resource_uri"
+DEFAULT_REMOTE_USER_RESPONSE_HEADER_KEY = "X-Remote-User"
+
+DEFAULT_VERIFY_RESPONSE_CACHE = {
+    # Maximum seconds for which nginx may cache allowed and denied verify
+    # responses, 0 leaves responses without caching headers
+    "allow": 0,
+    "deny": 0,
+}
+
+_config = None
+
+
+@dataclass(frozen=True)
+class AuthConfig:
+    """ Settings read by the middleware and views for every request.
+
+    Use `get_config` rather than creating one directly.
+    """
+
+    resource_uri_query_key: str = DEFAULT_RESOURCE_URI_QUERY_KEY
+    # Key of the resource URI header in request.META
+    resource_uri_header_key: str = DEFAULT_RESOURCE_URI_HEADER_KEY
+    resource_uri_session_key: str = DEFAULT_RESOURCE_URI_SESSION_KEY
+    remote_user_response_header_key: str = \
+        DEFAULT_REMOTE_USER_RESPONSE_HEADER_KEY
+
+    # Claims holding usernames and groups, or None for each middleware's
+    # own defaults
+    oauth2_username_key: Optional[str] = None
+    oauth2_groups_key: Optional[str] = None
+    oidc_username_key: Optional[str] = None
+    oidc_groups_key: Optional[str] = None
+
+    account_cookie_name: Optional[str] = None
+    # Decoded SECURITY_SHAREDSECRET
+    shared_secret: Optional[bytes] = None
+
+    authorization_exempt_rules: Tuple[dict, ...] = ()
+    authorization_exempt_filter: Optional[Callable] = None
+
+    verify_cache_allow_ttl: int = 0
+    verify_cache_deny_ttl: int = 0
+    # Request headers which verify decisions depend on
+    verify_cache_vary: Tuple[str, ...] = ()
+
+    # Directory shared by worker processes to aggregate metrics
+    metrics_dir: Optional[str] = None
+
+
+def meta_key(header):
+    """ Returns the request.META key for a header name, e.g.
+    "X-Original-URI" becomes "HTTP_X_ORIGINAL_URI". Keys which are already
+    in META form are returned unchanged.
+    """
+
+    if header.startswith("HTTP_") or header in (
+            "CONTENT_TYPE", "CONTENT_LENGTH"):
+        return header
+
+    return "HTTP_" + header.upper().replace("-", "_")
+
+
+def header_name(key):
+    """ Returns the header name for a request.META key, e.g.
+    "HTTP_X_ORIGINAL_URI" becomes "X-Original-Uri".
+    """
+
+    if key.startswith("HTTP_"):
+        key = key[5:]
+
+    return "-".join(part.capitalize() for part in key.split("_"))
+
+
+def decode_secret(secret):
+    """ Decodes a base64 encoded secret. """
+
+    try:
+        return codecs.decode(secret.encode(), "base64")
+
+    except (binascii.Error, AttributeError) as e:
+        raise ImproperlyConfigured(
+            f"SECURITY_SHAREDSECRET must be base64 encoded: {e}")
+
+
+def build_config():
+    """ Builds an AuthConfig from the current settings. """
+
+    exempt_filter = getattr(settings, "AUTHORIZATION_EXEMPT_FILTER", None)
+    if exempt_filter is not None and not callable(exempt_filter):
+        raise ImproperlyConfigured(
+            "AUTHORIZATION_EXEMPT_FILTER must be callable")
+
+    shared_secret = getattr(settings, "SECURITY_SHAREDSECRET", None)
+    if shared_secret is not None:
+        shared_secret = decode_secret(shared_secret)
+
+    verify_cache = DEFAULT_VERIFY_RESPONSE_CACHE.copy()
+    verify_cache.update(getattr(settings, "VERIFY_RESPONSE_CACHE", {}))
+
+    resource_uri_header_key = meta_key(getattr(settings,
+        "RESOURCE_URI_HEADER_KEY", DEFAULT_RESOURCE_URI_HEADER_KEY))
+
+    return AuthConfig(
+        resource_uri_query_key=getattr(settings, "RESOURCE_URI_QUERY_KEY",
+            DEFAULT_RESOURCE_URI_QUERY_KEY),
+        resource_uri_header_key=resource_uri_header_key,
+        resource_uri_session_key=getattr(settings,
+            "RESOURCE_URI_SESSION_KEY", DEFAULT_RESOURCE_URI_SESSION_KEY),
+        remote_user_response_header_key=getattr(settings,
+            "REMOTE_USER_RESPONSE_HEADER_KEY",
+            DEFAULT_REMOTE_USER_RESPONSE_HEADER_KEY),
+        oauth2_username_key=getattr(settings, "OAUTH2_USERNAME_KEY", None),
+        oauth2_groups_key=getattr(settings, "OAUTH2_GROUPS_KEY", None),
+        oidc_username_key=getattr(settings, "OIDC_USERNAME_KEY", None),
+        oidc_groups_key=getattr(settings, "OIDC_GROUPS_KEY", None),
+        account_cookie_name=getattr(settings, "ACCOUNT_COOKIE_NAME", None),
+        shared_secret=shared_secret,
+        authorization_exempt_rules=tuple(getattr(settings,
+            "AUTHORIZATION_EXEMPT_RULES", ())),
+        authorization_exempt_filter=exempt_filter,
+        verify_cache_allow_ttl=verify_cache["allow"],
+        verify_cache_deny_ttl=verify_cache["deny"],
+        verify_cache_vary=("Authorization", "Cookie",
+            header_name(resource_uri_header_key)),
+        metrics_dir=getattr(settings, "METRICS_MULTIPROCESS_DIR",
+            os.environ.get("PROMETHEUS_MULTIPROC_DIR")),
+    )
+
+
+def get_config():
+    """ Returns the AuthConfig for the current settings, building it on
+    first use.
+    """
+
+    global _config
+
+    if _config is None:
+        _config = build_config()
+
+    return _config
+
+
+@receiver(setting_changed)
+def _reset_config(**kwargs):
+
+    global _config
+    _config = None
@@ -6,8 +6,9 @@ __copyright__ = "Copyright 2020 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 
 
-import codecs
+import hashlib
 import logging
+import time
 
 from crypto_cookie.exceptions import BadTicket
 from crypto_cookie.auth_tkt import SecureCookie
@@ -15,37 +16,63 @@ from crypto_cookie.signature import VerificationError
 from django.conf import settings
 from six.moves.urllib import parse
 
+from authenticate import tracing
+from authenticate.cache import TTLCache
+from authenticate.config import get_config
 from authenticate.middleware import AuthenticationMiddleware
+from authenticate.utils import limit_auth_expiry
 from authenticate.cookie.exceptions import CookieParsingError
 
 
 LOG = logging.getLogger(__name__)
 
+DEFAULT_TICKET_CACHE_SIZE = 1024
+DEFAULT_TICKET_CACHE_TTL = 300
+DEFAULT_TICKET_FAILURE_TTL = 5
+
 
 class CookieAuthenticationMiddleware(AuthenticationMiddleware):
-    """ Middleware for authentication using an encrypted cookie. """
+    """ Middleware for authentication using an encrypted cookie.
+
+    Parsed tickets are cached, keyed on a digest of the cookie, so that a
+    cookie is only decrypted and verified once until its ticket expires.
+    Cookies which fail to parse are cached for a short time too.
+    """
+
+    METRICS_LABEL = "cookie"
 
     USERNAME_INDEX = 1
 
-    def _parse_cookie_value(self, cookie_value):
-        """ Parses user information from an encrypted cookie """
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+
+        self.ticket_cache = TTLCache(
+            maxsize=getattr(settings, "COOKIE_TICKET_CACHE_SIZE",
+                DEFAULT_TICKET_CACHE_SIZE),
+            ttl=getattr(settings, "COOKIE_TICKET_CACHE_TTL",
+                DEFAULT_TICKET_CACHE_TTL),
+            name="cookie_ticket",
+        )
+        self._failure_ttl = getattr(settings, "COOKIE_TICKET_FAILURE_TTL",
+            DEFAULT_TICKET_FAILURE_TTL)
+        self._max_age = getattr(settings, "COOKIE_TICKET_MAX_AGE", None)
+
+    def _parse_ticket(self, cookie_value):
+        """ Decrypts and verifies an account cookie. Returns the user
+        information it holds and the time at which it expires, if known.
+        """
 
-        shared_secret = codecs.decode(
-            settings.SECURITY_SHAREDSECRET.encode(), "base64")
         try:
             parsed_cookie_items = SecureCookie.parse_ticket(
-                shared_secret,
+                get_config().shared_secret,
                 cookie_value,
                 None,
                 None
             )
+            timestamp = parsed_cookie_items[0]
             username = parsed_cookie_items[self.USERNAME_INDEX]
 
-            return {
-                "username": username,
-                "groups": [],
-            }
-
         except BadTicket as e:
             LOG.warning("Error decoding cookie.")
             raise CookieParsingError(e)
@@ -55,21 +82,93 @@ class CookieAuthenticationMiddleware(AuthenticationMiddleware):
         except IndexError as e:
             LOG.warning("Index not in cookie.")
             raise CookieParsingError(e)
+        except ValueError as e:
+            LOG.warning("Malformed cookie.")
+            raise CookieParsingError(e)
+
+        expires_at = None
+        if self._max_age:
+
+            expires_at = timestamp + self._max_age
+            if expires_at <= time.time():
+                LOG.warning("Cookie ticket has expired.")
+                raise CookieParsingError("Ticket expired")
+
+        return {
+            "username": username,
+            "groups": [],
+        }, expires_at
+
+    def _parse_cookie(self, cookie_value):
+        """ Returns the user information and expiry of an account cookie,
+        using the cached result if the cookie has been seen recently.
+        """
+
+        # The secret is included so that entries don't outlive a change to it
+        cache_key = hashlib.sha256(
+            (get_config().shared_secret or b"") + cookie_value.encode()
+        ).digest()
+
+        # Failures are cached as their message, so that a new exception is
+        # raised each time rather than one growing a traceback per re-raise
+        entry = self.ticket_cache.get(cache_key)
+        if isinstance(entry, str):
+            raise CookieParsingError(entry)
+
+        if entry is None:
+
+            try:
+                with tracing.stage("cookie-decrypt"):
+                    entry = self._parse_ticket(cookie_value)
+
+            except CookieParsingError as e:
+
+                self.ticket_cache.set(cache_key, str(e),
+                    ttl=self._failure_ttl)
+                raise
+
+            _, expires_at = entry
+            ttl = expires_at - time.time() if expires_at else None
+            self.ticket_cache.set(cache_key, entry, ttl=ttl)
+
+        return entry
+
+    def _parse_cookie_value(self, cookie_value):
+        """ Parses user information from an encrypted cookie """
+
+        user_data, _ = self._parse_cookie(cookie_value)
+        return user_data
+
+    def applies_to(self, request):
+        return get_config().account_cookie_name in request.COOKIES
+
+    def _get_credentials(self, request):
+        return request.COOKIES.get(get_config().account_cookie_name)
 
     def _authenticate(self, request):
         """ Checks for the presence of a valid account cookie in the request.
         Returns User associated with the token or None. """
 
-        cookie_name = settings.ACCOUNT_COOKIE_NAME
+        cookie_name = get_config().account_cookie_name
         if cookie_name in request.COOKIES:
 
             try:
-                return self._parse_cookie_value(request.COOKIES[cookie_name])
+                user_data, expires_at = self._parse_cookie(
+                    request.COOKIES[cookie_name])
 
             except CookieParsingError:
 
                 LOG.warning("Failed to parse cookie for request.")
                 return None
 
+            if expires_at:
+                limit_auth_expiry(request, expires_at)
+
+            return user_data
+
         else:
             LOG.debug(f"Missing cookie '{cookie_name}'")
+
+    async def _aauthenticate(self, request):
+        # Cookies are parsed locally, without outbound calls
+        return self._authenticate(request)
@@ -0,0 +1,6 @@
+""" Management package for the authenticate app. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
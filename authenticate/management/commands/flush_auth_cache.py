@@ -0,0 +1,43 @@
+""" Command to flush cached auth results. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authenticate.cache import SEPARATE_CACHE_KINDS, flush_tiered_cache, \
+    get_cache_settings
+
+
+class Command(BaseCommand):
+    """ Flushes cached results, e.g. after a policy bundle has changed.
+
+    Running processes only see the flush through a shared Django CACHES
+    backend, so the command fails if AUTH_CACHE gives no alias.
+    """
+
+    help = "Flushes cached authentication results and authorization decisions."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument("kinds", nargs="*",
+            help="Kinds of cache to flush, e.g. 'opa'. Defaults to all.")
+
+    def handle(self, *args, **options):
+
+        cache_settings = get_cache_settings()
+        if not cache_settings["alias"]:
+            raise CommandError("AUTH_CACHE has no shared cache alias, so "
+                "running processes can't be flushed. Restart them instead.")
+
+        kinds = options["kinds"]
+        if not kinds:
+            kinds = [*cache_settings["ttls"], *SEPARATE_CACHE_KINDS]
+
+        for kind in kinds:
+
+            flush_tiered_cache(kind)
+            self.stdout.write(f"Flushed {kind} cache")
@@ -0,0 +1,428 @@
+""" Lightweight metrics for the auth pipeline, exposed in the Prometheus
+text format.
+
+Each process keeps its own counters and histograms in memory. If
+`METRICS_MULTIPROCESS_DIR` is set, each process periodically writes a
+snapshot of its metrics to a file in that directory, and the snapshots of
+all processes are summed when metrics are rendered, so that any worker can
+report the metrics of the whole server.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import atexit
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from contextlib import contextmanager
+
+from authenticate import tracing
+from authenticate.config import get_config
+
+
+LOG = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10)
+
+# Seconds between writes of a process's metrics to the multiprocess directory
+FLUSH_INTERVAL = 1
+
+
+def _format_value(value):
+
+    if value == float("inf"):
+        return "+Inf"
+
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+
+    return repr(value)
+
+
+def _format_labels(labelnames, labels, extra=()):
+
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ""
+
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metric:
+    """ A named metric holding a value for each combination of labels. """
+
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=()):
+
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """ Returns the metric's values as a JSON serializable dictionary. """
+
+        with self._lock:
+            values = [[list(labels), self._copy(value)]
+                for labels, value in self._values.items()]
+
+        return {
+            "type": self.TYPE,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "values": values,
+        }
+
+    def clear(self):
+        """ Removes all recorded values. """
+
+        with self._lock:
+            self._values.clear()
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(Metric):
+    """ A count which only increases. """
+
+    TYPE = "counter"
+
+    def inc(self, *labels, amount=1):
+        """ Increments the count for some label values. """
+
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels):
+        """ Returns the count for some label values. """
+
+        return self._values.get(labels, 0)
+
+
+class Histogram(Metric):
+    """ A distribution of observed values, counted into buckets.
+
+    Each value is a list of the number of observations falling into each
+    bucket, followed by the sum of all observations.
+    """
+
+    TYPE = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(),
+            buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        """ Records an observation for some label values. """
+
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = \
+                    [0] * (len(self.buckets) + 1) + [0.0]
+
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """ Observes the number of seconds spent in a `with` block. """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels):
+        """ Returns the number of observations for some label values. """
+
+        counts = self._values.get(labels)
+        return sum(counts[:-1]) if counts else 0
+
+    def snapshot(self):
+
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+
+        return snapshot
+
+    def _copy(self, value):
+        return list(value)
+
+
+class Registry:
+    """ Collection of metrics, which can be rendered in the Prometheus text
+    format and shared between processes through a directory.
+    """
+
+    def __init__(self):
+
+        self._metrics = {}
+
+        self._pid = None
+        self._path = None
+        self._flushed_at = 0
+        self._flush_lock = threading.Lock()
+
+    def _register(self, metric):
+
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """ Creates and registers a Counter. """
+
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(),
+            buckets=DEFAULT_BUCKETS):
+        """ Creates and registers a Histogram. """
+
+        return self._register(Histogram(name, documentation, labelnames,
+            buckets))
+
+    def snapshot(self):
+        """ Returns the values of all metrics in this process. """
+
+        return {name: metric.snapshot()
+            for name, metric in self._metrics.items()}
+
+    def clear(self):
+        """ Removes all recorded values. """
+
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def _snapshot_path(self, directory):
+        """ Returns the file this process writes its snapshots to. A new file
+        is used after a fork, so that workers never share a file.
+        """
+
+        pid = os.getpid()
+        if pid != self._pid:
+
+            if self._pid is not None:
+                # Values recorded before the fork belong to the parent
+                self.clear()
+
+            self._pid = pid
+            self._path = os.path.join(directory,
+                f"metrics_{pid}_{uuid.uuid4().hex}.json")
+
+        return self._path
+
+    def flush(self, directory):
+        """ Writes a snapshot of this process's metrics to a directory. """
+
+        with self._flush_lock:
+
+            path = self._snapshot_path(directory)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "w") as snapshot_file:
+                json.dump(self.snapshot(), snapshot_file)
+
+            os.replace(temp_path, path)
+            self._flushed_at = time.monotonic()
+
+    def maybe_flush(self, directory, force=False):
+        """ Flushes metrics to a directory if they haven't been flushed in the
+        last `FLUSH_INTERVAL` seconds, without raising errors.
+        """
+
+        if directory and (force or
+                time.monotonic() - self._flushed_at > FLUSH_INTERVAL):
+            try:
+                self.flush(directory)
+            except OSError as e:
+                LOG.warning(f"Unable to write metrics to {directory}: {e}")
+
+    def collect(self, directory=None):
+        """ Returns the values of all metrics, summed over the snapshots of
+        all processes if a multiprocess directory is given.
+        """
+
+        if not directory:
+            return self.snapshot()
+
+        self.flush(directory)
+
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, "metrics_*.json")):
+            try:
+                with open(path) as snapshot_file:
+                    snapshots.append(json.load(snapshot_file))
+            except (OSError, ValueError) as e:
+                LOG.warning(f"Unable to read metrics from {path}: {e}")
+
+        return merge_snapshots(snapshots)
+
+    def render(self, directory=None):
+        """ Returns all metrics in the Prometheus text format. """
+
+        return render_snapshot(self.collect(directory))
+
+
+def merge_snapshots(snapshots):
+    """ Sums the values of metrics from several snapshots. """
+
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+
+            target = merged.setdefault(name, dict(metric, values={}))
+            for labels, value in metric["values"]:
+
+                labels = tuple(labels)
+                current = target["values"].get(labels)
+                if current is None:
+                    target["values"][labels] = value
+                elif isinstance(value, list):
+                    target["values"][labels] = [a + b
+                        for a, b in zip(current, value)]
+                else:
+                    target["values"][labels] = current + value
+
+    for metric in merged.values():
+        metric["values"] = [[list(labels), value]
+            for labels, value in metric["values"].items()]
+
+    return merged
+
+
+def render_snapshot(snapshot):
+    """ Formats a snapshot in the Prometheus text format. """
+
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+
+        labelnames = metric["labelnames"]
+        for labels, value in sorted(metric["values"]):
+
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labels)} "
+                    f"{_format_value(value)}")
+                continue
+
+            cumulative = 0
+            bounds = metric["buckets"] + [float("inf")]
+            for bound, count in zip(bounds, value[:-1]):
+
+                cumulative += count
+                bucket_labels = _format_labels(labelnames, labels,
+                    [("le", _format_value(float(bound)))])
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+
+            labels = _format_labels(labelnames, labels)
+            lines.append(f"{name}_sum{labels} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{labels} {cumulative}")
+
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+AUTHENTICATION_DURATION = REGISTRY.histogram(
+    "auth_authentication_duration_seconds",
+    "Time taken to authenticate a request, by strategy.",
+    ["strategy"],
+)
+AUTHORIZATION_DURATION = REGISTRY.histogram(
+    "auth_authorization_duration_seconds",
+    "Time taken to authorize a request, by authorizer.",
+    ["authorizer"],
+)
+UPSTREAM_DURATION = REGISTRY.histogram(
+    "auth_upstream_request_duration_seconds",
+    "Time taken by calls to upstream services.",
+    ["upstream"],
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "auth_upstream_errors_total",
+    "Number of failed calls to upstream services.",
+    ["upstream"],
+)
+VERIFY_RESPONSES = REGISTRY.counter(
+    "auth_verify_responses_total",
+    "Number of responses to requests needing authorization, by status code.",
+    ["status"],
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "auth_cache_requests_total",
+    "Number of cache lookups, by cache and result.",
+    ["cache", "result"],
+)
+
+
+@contextmanager
+def track_upstream(upstream):
+    """ Times a call to an upstream service made in a `with` block, and
+    counts it as an error if the block raises an exception. The time is also
+    added to the current request's trace.
+    """
+
+    start = time.perf_counter()
+    try:
+        yield
+
+    except Exception:
+        UPSTREAM_ERRORS.inc(upstream)
+        raise
+
+    finally:
+        duration = time.perf_counter() - start
+        UPSTREAM_DURATION.observe(duration, upstream)
+        tracing.record(f"upstream-{upstream}", duration)
+
+
+def record_cache_lookup(cache, hit):
+    """ Counts a hit or miss for a named cache. """
+
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def get_metrics_dir():
+    """ Returns the configured multiprocess metrics directory, if any. """
+
+    return get_config().metrics_dir
+
+
+@atexit.register
+def _flush_at_exit():
+
+    # Only processes which have written metrics before write them on exit
+    if REGISTRY._pid == os.getpid():
+        REGISTRY.maybe_flush(os.path.dirname(REGISTRY._path), force=True)
@@ -6,26 +6,80 @@ __copyright__ = "Copyright 2020 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 
 
+import asyncio
+import json
 import logging
+import time
 
-from authenticate.utils import is_authenticated, login, User
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.module_loading import import_string
+
+from authenticate import tracing
+from authenticate.cache import get_tiered_cache
+from authenticate.config import get_config
+from authenticate.metrics import AUTHENTICATION_DURATION
+from authenticate.utils import is_authenticated, login, User, \
+    get_auth_expiry, limit_auth_expiry
 
 
 LOG = logging.getLogger(__name__)
+TIMING_LOG = logging.getLogger("authenticate.timing")
+
+DEFAULT_AUTHENTICATION_STRATEGIES = [
+    "authenticate.oauth2.middleware.BearerTokenAuthenticationMiddleware",
+    "authenticate.cookie.middleware.CookieAuthenticationMiddleware",
+    "authenticate.oidc.middleware.OpenIDConnectAuthenticationMiddleware",
+]
+
+DEFAULT_SERVER_TIMING = {
+    # Whether to add a Server-Timing header to responses, which names
+    # internal stages and upstream services
+    "header": False,
+    # Whether to log the timings of each request to "authenticate.timing"
+    "log": False,
+}
 
 
 class AuthenticationMiddleware:
-    """ Authentication middleware which relies on a request object only. """
+    """ Authentication middleware which relies on a request object only.
+
+    Runs natively under ASGI: if the next handler is async, authentication
+    is awaited via `_aauthenticate`, which subclasses making outbound calls
+    override to avoid blocking the event loop.
+    """
+
+    CACHE_KIND = "authentication"
+
+    # Label of the strategy in metrics, defaulting to the class name
+    METRICS_LABEL = None
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
 
+        # Settings are validated when the middleware is loaded
+        get_config()
+
+        self._metrics_label = self.METRICS_LABEL or type(self).__name__
+        self._trace_stage = f"authn-{self._metrics_label}"
+
+        if asyncio.iscoroutinefunction(get_response):
+            # Tells Django that this instance should be awaited
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
     def __call__(self, request):
 
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
         # Attempt to authenticate the request with available middleware
         if not is_authenticated(request):
 
-            user_data = self._authenticate(request)
+            user_data = self._cached_authenticate(request)
             if user_data:
                 user = User(**user_data)
                 login(request, user)
@@ -33,5 +87,247 @@ class AuthenticationMiddleware:
         response = self.get_response(request)
         return response
 
+    async def __acall__(self, request):
+
+        if not is_authenticated(request):
+
+            user_data = await self._acached_authenticate(request)
+            if user_data:
+                user = User(**user_data)
+                login(request, user)
+
+        response = await self.get_response(request)
+        return response
+
+    def _get_cached_authentication(self, request):
+        """ Looks up the cached result for a request's credentials. Returns
+        the cache, the key and the cached user data, any of which may be None.
+        """
+
+        cache = get_tiered_cache(self.CACHE_KIND)
+
+        credentials = None
+        if cache:
+            credentials = self._get_credentials(request)
+
+        if credentials is None:
+            return None, None, None
+
+        key = cache.make_key(type(self).__name__, credentials)
+        entry = cache.get(key)
+        if entry is None:
+            return cache, key, None
+
+        user_data, expires_at = entry
+        if expires_at:
+            limit_auth_expiry(request, expires_at)
+
+        return cache, key, user_data
+
+    def _set_cached_authentication(self, request, cache, key, user_data):
+        """ Stores the result of authenticating a request's credentials. """
+
+        if cache and user_data:
+
+            # Never keep the result beyond the expiry of the credentials
+            ttl = None
+            expires_at = get_auth_expiry(request)
+            if expires_at:
+                ttl = expires_at - time.time()
+
+            cache.set(key, (user_data, expires_at), ttl=ttl)
+
+    def _cached_authenticate(self, request):
+        """ Authenticates a request, reusing the result for credentials which
+        have been seen recently.
+        """
+
+        with AUTHENTICATION_DURATION.time(self._metrics_label), \
+                tracing.stage(self._trace_stage):
+
+            cache, key, user_data = self._get_cached_authentication(request)
+            if user_data is None:
+
+                user_data = self._authenticate(request)
+                self._set_cached_authentication(request, cache, key,
+                    user_data)
+
+        return user_data
+
+    async def _acached_authenticate(self, request):
+        """ Async version of `_cached_authenticate`. """
+
+        with AUTHENTICATION_DURATION.time(self._metrics_label), \
+                tracing.stage(self._trace_stage):
+
+            cache, key, user_data = self._get_cached_authentication(request)
+            if user_data is None:
+
+                user_data = await self._aauthenticate(request)
+                self._set_cached_authentication(request, cache, key,
+                    user_data)
+
+        return user_data
+
+    def applies_to(self, request):
+        """ Returns True if a request carries credentials which this
+        middleware can authenticate. Middleware which can't tell without
+        authenticating the request apply to every request.
+        """
+
+        return True
+
+    def _get_credentials(self, request):
+        """ Returns the credentials presented with a request, used to cache
+        authentication results. Returns None if results can't be cached.
+        """
+
+        return None
+
     def _authenticate(self, request):
         raise NotImplementedError()
+
+    async def _aauthenticate(self, request):
+        """ Async version of `_authenticate`, which runs it in a worker thread
+        unless overridden.
+        """
+
+        return await sync_to_async(self._authenticate,
+            thread_sensitive=False)(request)
+
+
+class DispatchAuthenticationMiddleware(AuthenticationMiddleware):
+    """ Authentication middleware which runs only the authentication strategy
+    matching the credentials a request carries, in place of a chain of
+    authentication middleware which each run for every request.
+
+    Strategies are the authentication middleware classes listed by the
+    `AUTHENTICATION_STRATEGIES` setting. Those whose `applies_to` method
+    accepts a request are tried in order until one authenticates it, so that,
+    as with a chain of middleware, a request with an expired bearer token and
+    a valid account cookie is authenticated by the cookie. Requests which no
+    strategy applies to, i.e. which carry no credentials, aren't
+    authenticated at all.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+
+        strategy_paths = getattr(settings, "AUTHENTICATION_STRATEGIES",
+            DEFAULT_AUTHENTICATION_STRATEGIES)
+
+        self.strategies = [
+            import_string(path)(get_response) for path in strategy_paths
+        ]
+
+    def _get_strategies(self, request):
+        """ Returns the strategies which apply to a request, in order of
+        precedence.
+        """
+
+        return [strategy for strategy in self.strategies
+            if strategy.applies_to(request)]
+
+    def __call__(self, request):
+
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        strategies = self._get_strategies(request)
+        if strategies and not is_authenticated(request):
+
+            for strategy in strategies:
+
+                user_data = strategy._cached_authenticate(request)
+                if user_data:
+                    login(request, User(**user_data))
+                    break
+
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+
+        strategies = self._get_strategies(request)
+        if strategies and not is_authenticated(request):
+
+            for strategy in strategies:
+
+                user_data = await strategy._acached_authenticate(request)
+                if user_data:
+                    login(request, User(**user_data))
+                    break
+
+        return await self.get_response(request)
+
+
+class ServerTimingMiddleware:
+    """ Middleware which times the stages of each request, such as session
+    decoding, authentication, authorization and upstream calls.
+
+    Timings may be added to responses as a `Server-Timing` header, which
+    nginx can log as `$upstream_http_server_timing`, and logged as one JSON
+    line per request, as enabled by the `SERVER_TIMING` setting. Unused if
+    neither is enabled. Should be placed first in `MIDDLEWARE` so that the
+    total covers the rest of the middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        timing_settings = DEFAULT_SERVER_TIMING.copy()
+        timing_settings.update(getattr(settings, "SERVER_TIMING", {}))
+
+        self._header = timing_settings["header"]
+        self._log = timing_settings["log"]
+
+        # Requests aren't traced when the timings wouldn't be reported
+        if not self._header and not self._log:
+            raise MiddlewareNotUsed()
+
+        if asyncio.iscoroutinefunction(get_response):
+            # Tells Django that this instance should be awaited
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        trace, token = tracing.start_trace()
+        try:
+            response = self.get_response(request)
+        finally:
+            tracing.end_trace(token)
+
+        return self._add_timings(request, response, trace)
+
+    async def __acall__(self, request):
+
+        trace, token = tracing.start_trace()
+        try:
+            response = await self.get_response(request)
+        finally:
+            tracing.end_trace(token)
+
+        return self._add_timings(request, response, trace)
+
+    def _add_timings(self, request, response, trace):
+        """ Adds a trace's timings to a response and the timing log. """
+
+        trace.record("total", trace.elapsed())
+
+        if self._header:
+            response["Server-Timing"] = trace.server_timing()
+
+        if self._log:
+            TIMING_LOG.info(json.dumps({
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "timings": trace.milliseconds(),
+            }))
+
+        return response
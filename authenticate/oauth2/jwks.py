@@ -0,0 +1,148 @@
+""" Local validation of JWT access tokens. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import logging
+import threading
+import time
+
+import requests
+
+from authlib.jose import JsonWebKey, JsonWebToken
+from authlib.jose.errors import JoseError
+
+from authenticate import transport
+from authenticate.metrics import track_upstream
+from authenticate.oauth2.exceptions import BadAccessTokenError
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_ALGORITHMS = ["RS256"]
+DEFAULT_REFRESH_INTERVAL = 3600
+DEFAULT_MIN_REFRESH_INTERVAL = 30
+
+
+def is_jwt(access_token):
+    """ Returns True if an access token looks like a signed JWT rather than
+    an opaque token.
+    """
+
+    return access_token.count(".") == 2
+
+
+class JWKSCache:
+    """ Holds a JSON Web Key Set fetched from a remote URL.
+
+    The key set is refreshed once it is older than `refresh_interval`, or
+    when a key is requested with an unknown ID. Refreshes for unknown IDs are
+    limited to one every `min_refresh_interval` seconds.
+    """
+
+    def __init__(self, jwks_url, refresh_interval=DEFAULT_REFRESH_INTERVAL,
+            min_refresh_interval=DEFAULT_MIN_REFRESH_INTERVAL):
+
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+
+        self._key_set = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """ Fetches the key set, keeping any existing keys on failure. """
+
+        self._fetched_at = time.monotonic()
+        try:
+            with track_upstream("jwks"):
+                response = transport.request("GET", self.jwks_url)
+                response.raise_for_status()
+
+            self._key_set = JsonWebKey.import_key_set(response.json())
+            LOG.debug(f"Loaded {len(self._key_set.keys)} keys from JWKS.")
+
+        except (requests.RequestException, ValueError, JoseError) as e:
+            LOG.error(f"Failed to fetch JWKS from {self.jwks_url}: {e}")
+
+    def _refresh_if_older_than(self, max_age):
+
+        with self._lock:
+            if self._fetched_at is None or \
+                    time.monotonic() - self._fetched_at > max_age:
+                self._refresh()
+
+    def _find_key(self, kid):
+
+        if self._key_set is None:
+            return None
+
+        keys = self._key_set.keys
+        if kid is None and len(keys) == 1:
+            return keys[0]
+
+        for key in keys:
+            if key.get("kid") == kid:
+                return key
+
+    def get_key(self, kid):
+        """ Returns the key with the given ID. """
+
+        self._refresh_if_older_than(self.refresh_interval)
+
+        key = self._find_key(kid)
+        if key is None:
+
+            LOG.debug(f"Unknown key ID '{kid}', refreshing JWKS.")
+            self._refresh_if_older_than(self.min_refresh_interval)
+
+            key = self._find_key(kid)
+            if key is None:
+                raise BadAccessTokenError(f"Unknown key ID '{kid}'")
+
+        return key
+
+
+class JWTValidator:
+    """ Validates the signature and registered claims of a JWT access token.
+    """
+
+    def __init__(self, key_set, issuer=None, audience=None,
+            algorithms=None, leeway=0):
+
+        self.key_set = key_set
+        self.leeway = leeway
+
+        self._jwt = JsonWebToken(algorithms or DEFAULT_ALGORITHMS)
+        self._claims_options = {
+            "exp": {"essential": True},
+        }
+        if issuer:
+            self._claims_options["iss"] = {"essential": True, "value": issuer}
+        if audience:
+            self._claims_options["aud"] = {"essential": True, "values": [audience]}
+
+    def _load_key(self, header, payload):
+        return self.key_set.get_key(header.get("kid"))
+
+    def validate(self, access_token):
+        """ Returns the claims of a valid token.
+        Raises BadAccessTokenError if the token is not valid.
+        """
+
+        try:
+            claims = self._jwt.decode(
+                access_token,
+                self._load_key,
+                claims_options=self._claims_options
+            )
+            claims.validate(leeway=self.leeway)
+
+        except (JoseError, ValueError) as e:
+            raise BadAccessTokenError(e)
+
+        return dict(claims)
@@ -7,32 +7,158 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 
 
 import logging
+import time
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
+from authenticate.cache import TTLCache
+from authenticate.config import get_config
 from authenticate.middleware import AuthenticationMiddleware
-from authenticate.oauth2.token import parse_access_token
+from authenticate.oauth2.jwks import JWKSCache, JWTValidator, is_jwt, \
+    DEFAULT_ALGORITHMS, DEFAULT_REFRESH_INTERVAL
+from authenticate.oauth2.token import aparse_access_token, \
+    parse_access_token, token_digest
 from authenticate.oauth2.exceptions import BadAccessTokenError
+from authenticate.singleflight import AsyncSingleFlight, SingleFlight
+from authenticate.utils import limit_auth_expiry
 
 
 LOG = logging.getLogger(__name__)
 
+DEFAULT_INTROSPECTION_CACHE_SIZE = 1024
+DEFAULT_INTROSPECTION_CACHE_TTL = 0
+
 
 class BearerTokenAuthenticationMiddleware(AuthenticationMiddleware):
     """ Middleware for OAuth2 Bearer Token authentication. """
 
+    METRICS_LABEL = "bearer"
+
     AUTHORIZATION_HEADER_KEY = "HTTP_AUTHORIZATION"
 
     USERNAME_KEY = "preferred_username"
     GROUPS_KEY = "groups"
 
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+
+        self.introspection_cache = TTLCache(
+            maxsize=getattr(settings, "OAUTH2_INTROSPECTION_CACHE_SIZE",
+                DEFAULT_INTROSPECTION_CACHE_SIZE),
+            ttl=getattr(settings, "OAUTH2_INTROSPECTION_CACHE_TTL",
+                DEFAULT_INTROSPECTION_CACHE_TTL),
+            name="introspection",
+        )
+
+        self._introspection_flights = SingleFlight()
+        self._async_introspection_flights = AsyncSingleFlight()
+
+        self._introspection_fallback = getattr(settings,
+            "OAUTH2_INTROSPECTION_FALLBACK", True)
+
+        self._jwt_validator = None
+        if getattr(settings, "OAUTH2_LOCAL_VALIDATION", False):
+
+            key_set = JWKSCache(
+                settings.OAUTH_JWKS_URL,
+                refresh_interval=getattr(settings,
+                    "OAUTH2_JWKS_REFRESH_INTERVAL", DEFAULT_REFRESH_INTERVAL)
+            )
+            self._jwt_validator = JWTValidator(
+                key_set,
+                issuer=getattr(settings, "OAUTH_TOKEN_ISSUER", None),
+                audience=getattr(settings, "OAUTH_TOKEN_AUDIENCE", None),
+                algorithms=getattr(settings, "OAUTH2_JWT_ALGORITHMS",
+                    DEFAULT_ALGORITHMS),
+                leeway=getattr(settings, "OAUTH2_JWT_LEEWAY", 0)
+            )
+
+    def _get_token_data(self, access_token):
+        """ Returns the claims associated with an access token, validating
+        JWTs locally if configured and introspecting other tokens.
+        """
+
+        if self._jwt_validator:
+
+            if is_jwt(access_token):
+                return self._jwt_validator.validate(access_token)
+
+            if not self._introspection_fallback:
+                raise BadAccessTokenError("Opaque tokens are not accepted")
+
+        return self._introspect(access_token)
+
+    async def _aget_token_data(self, access_token):
+        """ Async version of `_get_token_data`. """
+
+        if self._jwt_validator:
+
+            if is_jwt(access_token):
+                # Validation may have to fetch the JWKS
+                return await sync_to_async(self._jwt_validator.validate,
+                    thread_sensitive=False)(access_token)
+
+            if not self._introspection_fallback:
+                raise BadAccessTokenError("Opaque tokens are not accepted")
+
+        return await self._aintrospect(access_token)
+
+    def _introspect(self, access_token):
+        """ Returns introspection data for an access token, using cached
+        data where the token has been seen recently.
+        """
+
+        cache_key = token_digest(access_token)
+        token_data = self.introspection_cache.get(cache_key)
+        if token_data:
+            return token_data
+
+        # Concurrent requests with the same token share one introspection
+        token_data = self._introspection_flights.do(
+            cache_key, parse_access_token, access_token)
+
+        self._cache_token_data(cache_key, token_data)
+        return token_data
+
+    async def _aintrospect(self, access_token):
+        """ Async version of `_introspect`. """
+
+        cache_key = token_digest(access_token)
+        token_data = self.introspection_cache.get(cache_key)
+        if token_data:
+            return token_data
+
+        token_data = await self._async_introspection_flights.do(
+            cache_key, aparse_access_token, access_token)
+
+        self._cache_token_data(cache_key, token_data)
+        return token_data
+
+    def _cache_token_data(self, cache_key, token_data):
+        """ Stores introspection data for a token. """
+
+        if token_data:
+
+            # Never keep the data beyond the expiry of the token itself
+            ttl = None
+            expires_at = token_data.get("exp")
+            if expires_at:
+                ttl = expires_at - time.time()
+
+            self.introspection_cache.set(cache_key, token_data, ttl=ttl)
+
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug(
+                f"Introspection cache: {self.introspection_cache.stats()}")
+
     def _parse_token_data(self, token_data):
         """ Parses an OIDC user info dictionary for relevant info. """
 
-        username_key = getattr(settings, "OAUTH2_USERNAME_KEY",
-            self.USERNAME_KEY)
-        groups_key = getattr(settings, "OAUTH2_GROUPS_KEY",
-            self.GROUPS_KEY)
+        config = get_config()
+        username_key = config.oauth2_username_key or self.USERNAME_KEY
+        groups_key = config.oauth2_groups_key or self.GROUPS_KEY
 
         LOG.debug(f"Checking token for username key '{username_key}' \
             and groups key '{groups_key}'.")
@@ -42,26 +168,67 @@ class BearerTokenAuthenticationMiddleware(AuthenticationMiddleware):
             "groups": token_data.get(groups_key),
         }
 
+    def _get_access_token(self, request):
+        """ Returns the bearer token from a request's headers, if present. """
+
+        authorization_header = request.META.get(self.AUTHORIZATION_HEADER_KEY)
+        if authorization_header and authorization_header.startswith("Bearer"):
+            return authorization_header[6:].strip()
+
+    def applies_to(self, request):
+        return self._get_access_token(request) is not None
+
+    def _get_credentials(self, request):
+        return self._get_access_token(request)
+
     def _authenticate(self, request):
         """ Checks for OAuth2 access token in the request.
         Returns User associated with the token or None. """
 
         # Try to retrieve the user id with an access token if one is present
-        authorization_header = request.META.get(self.AUTHORIZATION_HEADER_KEY)
-        if authorization_header and authorization_header.startswith("Bearer"):
+        access_token = self._get_access_token(request)
+        if access_token:
 
-            access_token = authorization_header[6:].strip()
             LOG.debug(f"Found access token: {access_token}")
 
             # Attempt to retrieve OpenID from OAuth2 access token
             token_data = None
             try:
-                token_data = parse_access_token(access_token)
+                token_data = self._get_token_data(access_token)
 
             except BadAccessTokenError:
 
                 LOG.warn(f"Failed to parse access token for request.")
                 return None
 
-            if token_data:
-                return self._parse_token_data(token_data)
+            return self._get_user_data(request, token_data)
+
+    async def _aauthenticate(self, request):
+        """ Async version of `_authenticate`. """
+
+        access_token = self._get_access_token(request)
+        if access_token:
+
+            token_data = None
+            try:
+                token_data = await self._aget_token_data(access_token)
+
+            except BadAccessTokenError:
+
+                LOG.warn(f"Failed to parse access token for request.")
+                return None
+
+            return self._get_user_data(request, token_data)
+
+    def _get_user_data(self, request, token_data):
+        """ Returns user data from the claims of a valid token, recording the
+        token's expiry on the request.
+        """
+
+        if token_data:
+
+            expires_at = token_data.get("exp")
+            if expires_at:
+                limit_auth_expiry(request, expires_at)
+
+            return self._parse_token_data(token_data)
@@ -6,23 +6,30 @@ __copyright__ = "Copyright 2020 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 
 
+import hashlib
 import logging
 import json
-import requests
 
 from django.conf import settings
 
+from authenticate import transport
+from authenticate.metrics import track_upstream
 from authenticate.oauth2.exceptions import BadAccessTokenError
 
 
 LOG = logging.getLogger(__name__)
 
 
-def parse_access_token(access_token):
-    """ Checks an access token against a token introspection endpoint and
-    returns data associated with it.
+def token_digest(access_token):
+    """ Returns a digest of an access token, suitable for use as a cache key.
     """
 
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def _introspection_request(access_token):
+    """ Returns the headers and payload of a token introspection request. """
+
     headers = {
         "content-type": "application/x-www-form-urlencoded",
         "cache-control": "no-cache",
@@ -33,17 +40,49 @@ def parse_access_token(access_token):
         "token": access_token
     }
 
-    response = requests.request(
-        "POST",
-        settings.OAUTH_TOKEN_INTROSPECT_URL,
-        data=payload,
-        headers=headers
-    )
-    user_data = json.loads(response.text)
+    return headers, payload
 
-    if response.status_code == 200:
+
+def _parse_introspection_response(status_code, text):
+    """ Returns the data from a token introspection response. """
+
+    user_data = json.loads(text)
+
+    if status_code == 200:
 
         if not user_data["active"]:
             raise BadAccessTokenError("Inactive")
 
         return user_data
+
+
+def parse_access_token(access_token):
+    """ Checks an access token against a token introspection endpoint and
+    returns data associated with it.
+    """
+
+    headers, payload = _introspection_request(access_token)
+    with track_upstream("introspection"):
+        response = transport.request(
+            "POST",
+            settings.OAUTH_TOKEN_INTROSPECT_URL,
+            data=payload,
+            headers=headers
+        )
+
+    return _parse_introspection_response(response.status_code, response.text)
+
+
+async def aparse_access_token(access_token):
+    """ Async version of `parse_access_token`. """
+
+    headers, payload = _introspection_request(access_token)
+    with track_upstream("introspection"):
+        response = await transport.arequest(
+            "POST",
+            settings.OAUTH_TOKEN_INTROSPECT_URL,
+            data=payload,
+            headers=headers
+        )
+
+    return _parse_introspection_response(response.status_code, response.text)
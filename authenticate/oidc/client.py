@@ -10,6 +10,8 @@ from authlib.common.errors import AuthlibBaseError
 from authlib.integrations.django_client import OAuth
 from django.conf import settings
 
+from authenticate.metrics import track_upstream
+
 
 class OpenIDConnectClient:
     """ A simple OpenIDConnect client wrapper. """
@@ -34,12 +36,13 @@ class OpenIDConnectClient:
 
     def get_user_info(self, request):
 
-        if self._has_state(request):
+        if self.has_state(request):
 
-            token = self._oidc_client.authorize_access_token(request)
+            with track_upstream("oidc_token"):
+                token = self._oidc_client.authorize_access_token(request)
             return self._oidc_client.parse_id_token(request, token)
 
-    def _has_state(self, request):
+    def has_state(self, request):
 
         # Check for key in session indicating that some OAuth2 state exists
         session_key = f"_{self._client_name}_authlib_state_"
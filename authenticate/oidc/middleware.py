@@ -10,10 +10,11 @@ import logging
 
 from authlib.integrations.base_client.errors import MismatchingStateError
 from authlib.common.errors import AuthlibBaseError
-from django.conf import settings
 
+from authenticate.config import get_config
 from authenticate.middleware import AuthenticationMiddleware
 from authenticate.oidc.client import OpenIDConnectClient
+from authenticate.utils import reverse_path_info
 
 
 LOG = logging.getLogger(__name__)
@@ -22,6 +23,8 @@ LOG = logging.getLogger(__name__)
 class OpenIDConnectAuthenticationMiddleware(AuthenticationMiddleware):
     """ Middleware for OpenIDConnect authentication. """
 
+    METRICS_LABEL = "oidc"
+
     USERNAME_KEY = "preferred_username"
     GROUPS_KEY = "groups"
 
@@ -30,13 +33,15 @@ class OpenIDConnectAuthenticationMiddleware(AuthenticationMiddleware):
         super().__init__(*args, **kwargs)
         self._client = OpenIDConnectClient()
 
+        # Credentials are only presented to the callback of a login flow
+        self._callback_path = reverse_path_info("callback")
+
     def _parse_user_info(self, user_info):
         """ Parses an OIDC user info dictionary for relevant info. """
 
-        username_key = getattr(settings, "OIDC_USERNAME_KEY",
-            self.USERNAME_KEY)
-        groups_key = getattr(settings, "OIDC_GROUPS_KEY",
-            self.GROUPS_KEY)
+        config = get_config()
+        username_key = config.oidc_username_key or self.USERNAME_KEY
+        groups_key = config.oidc_groups_key or self.GROUPS_KEY
 
         LOG.debug(f"Checking user info for username key '{username_key}' \
             and groups key '{groups_key}'.")
@@ -46,6 +51,9 @@ class OpenIDConnectAuthenticationMiddleware(AuthenticationMiddleware):
             "groups": user_info.get(groups_key),
         }
 
+    def applies_to(self, request):
+        return request.path_info == self._callback_path
+
     def _authenticate(self, request):
         """ Checks for OpenID Connect login credentials in the request.
         Returns a User object or None. """
@@ -65,3 +73,11 @@ class OpenIDConnectAuthenticationMiddleware(AuthenticationMiddleware):
 
         if user_info:
             return self._parse_user_info(user_info)
+
+    async def _aauthenticate(self, request):
+
+        # Only the callback of a login flow needs to query the OIDC server
+        if not self._client.has_state(request):
+            return None
+
+        return await super()._aauthenticate(request)
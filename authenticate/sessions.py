@@ -0,0 +1,143 @@
+""" Signed cookie session engine with a compact serialization of the
+authenticated user.
+
+Use by setting `SESSION_ENGINE = "authenticate.sessions"`.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import json
+import struct
+
+from django.conf import settings
+from django.contrib.sessions.backends import signed_cookies
+from django.utils.module_loading import import_string
+
+from authenticate.utils import USER_SESSION_KEY
+
+
+FORMAT_VERSION = 1
+
+# Flags recording which parts of a session are present
+HAS_USER = 0x01
+HAS_OTHER = 0x02
+
+# Separates a user's groups, which are packed into a single string
+GROUP_SEPARATOR = "\x00"
+
+_HEADER = struct.Struct("!BB")
+_VERSION_PREFIX = bytes([FORMAT_VERSION])
+_LENGTH = struct.Struct("!H")
+
+
+def _pack_string(value):
+
+    encoded = value.encode()
+    return _LENGTH.pack(len(encoded)) + encoded
+
+
+def _unpack_string(data, offset):
+
+    length, = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+
+    return data[offset:offset + length].decode(), offset + length
+
+
+def _is_packable(user_data):
+    """ Returns True if user data has the form stored by `login`. """
+
+    return (
+        isinstance(user_data, dict)
+        and user_data.keys() == {"username", "groups"}
+        and isinstance(user_data["username"], str)
+        and isinstance(user_data["groups"], list)
+        and all(isinstance(group, str) and group and
+            GROUP_SEPARATOR not in group for group in user_data["groups"])
+    )
+
+
+class CompactSessionSerializer:
+    """ Session serializer which packs the authenticated user into a binary
+    structure rather than JSON, so that sessions holding only a user are
+    small. Any other session data is stored as JSON after the user.
+
+    Sessions written by the `signed_cookies` engine, using the serializer
+    named by the `SESSION_SERIALIZER` setting, can still be loaded, so that
+    users stay logged in when switching to this engine.
+    """
+
+    def dumps(self, session):
+
+        flags = 0
+        parts = []
+
+        other = dict(session)
+        user_data = other.get(USER_SESSION_KEY)
+        if _is_packable(user_data):
+
+            del other[USER_SESSION_KEY]
+            flags |= HAS_USER
+
+            parts.append(_pack_string(user_data["username"]))
+            parts.append(_pack_string(
+                GROUP_SEPARATOR.join(user_data["groups"])))
+
+        if other:
+
+            flags |= HAS_OTHER
+            parts.append(json.dumps(other, separators=(",", ":")).encode())
+
+        return _HEADER.pack(FORMAT_VERSION, flags) + b"".join(parts)
+
+    def loads(self, data):
+
+        if data[:1] != _VERSION_PREFIX:
+            # Written by the signed_cookies engine's serializer, which starts
+            # with "{" for JSON or b"\x80" for pickle
+            return import_string(settings.SESSION_SERIALIZER)().loads(data)
+
+        _, flags = _HEADER.unpack_from(data)
+
+        session = {}
+        offset = _HEADER.size
+
+        if flags & HAS_USER:
+
+            username, offset = _unpack_string(data, offset)
+            groups, offset = _unpack_string(data, offset)
+
+            session[USER_SESSION_KEY] = {
+                "username": username,
+                "groups": groups.split(GROUP_SEPARATOR) if groups else [],
+            }
+
+        if flags & HAS_OTHER:
+            session.update(json.loads(data[offset:].decode()))
+
+        return session
+
+
+class SessionStore(signed_cookies.SessionStore):
+    """ Signed cookie session store using the CompactSessionSerializer,
+    which is only marked as modified, and so only sets a cookie, when a
+    value actually changes.
+    """
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+
+        self.serializer = CompactSessionSerializer
+
+    def __setitem__(self, key, value):
+
+        # Values changed in place are still saved when set again
+        current = self._session.get(key)
+        if current is not value and current == value:
+            return
+
+        super().__setitem__(key, value)
@@ -0,0 +1,137 @@
+""" Coalescing of concurrent identical upstream calls. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import asyncio
+import copy
+import threading
+
+
+def _raise_shared(error):
+    """ Raises a copy of an exception shared between callers, chained from
+    the original, so that each caller gets its own traceback rather than
+    extending that of one shared instance.
+    """
+
+    try:
+        shared = copy.copy(error)
+    except Exception:
+        # Exceptions which can't be rebuilt from their args are shared
+        shared = error
+
+    raise shared from error
+
+
+class _Call:
+    """ A call in progress, waited on by callers with the same key. """
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """ Ensures that only one call for a given key is in flight at a time.
+
+    Callers arriving while a call with the same key is running wait for it to
+    finish and receive its result, or have a copy of its exception raised.
+    """
+
+    def __init__(self):
+
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """ Calls `func` unless an identical call is already in flight. """
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                leader = True
+                call = self._calls[key] = _Call()
+
+        if not leader:
+
+            call.done.wait()
+            if call.error is not None:
+                _raise_shared(call.error)
+
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+
+        except Exception as e:
+            call.error = e
+            raise
+
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
+
+        return call.result
+
+
+class AsyncSingleFlight:
+    """ Ensures that only one coroutine for a given key is in flight at a
+    time within an event loop.
+
+    Callers arriving while a call with the same key is running await it and
+    receive its result, or have a copy of its exception raised.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        """ Awaits `func` unless an identical call is already in flight. """
+
+        call_key = (asyncio.get_running_loop(), key)
+
+        future = self._calls.get(call_key)
+        if future is not None:
+
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _raise_shared(e)
+
+        future = self._calls[call_key] = \
+            asyncio.get_running_loop().create_future()
+        try:
+            result = await func(*args, **kwargs)
+
+        except asyncio.CancelledError:
+
+            future.cancel()
+            raise
+
+        except Exception as e:
+
+            future.set_exception(e)
+            # Mark the exception as retrieved if nobody was waiting
+            future.exception()
+            raise
+
+        else:
+            future.set_result(result)
+
+        finally:
+            del self._calls[call_key]
+
+        return result
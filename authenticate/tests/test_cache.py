@@ -0,0 +1,237 @@
+""" Test module for caching. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import io
+import time
+
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authenticate.cache import TTLCache, TieredCache, get_tiered_cache
+from authenticate.middleware import AuthenticationMiddleware
+from authorize.middleware import AuthorizationMiddleware
+from authenticate.oauth2.middleware import BearerTokenAuthenticationMiddleware
+from authenticate.oauth2.token import token_digest
+
+
+class TTLCacheTests(SimpleTestCase):
+
+    def test_lru_eviction(self):
+        """ Test that the least recently used entry is evicted first. """
+
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_expiry(self):
+        """ Test that entries expire and count as misses. """
+
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1, ttl=0.01)
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+@override_settings(OAUTH2_INTROSPECTION_CACHE_TTL=300)
+class IntrospectionCacheTests(SimpleTestCase):
+
+    @mock.patch("authenticate.oauth2.middleware.parse_access_token")
+    def test_repeat_token(self, parse_access_token):
+        """ Test that a repeated token is only introspected once. """
+
+        parse_access_token.return_value = {
+            "active": True,
+            "exp": time.time() + 60,
+            "preferred_username": "user",
+        }
+
+        middleware = BearerTokenAuthenticationMiddleware(None)
+        middleware._introspect("token")
+        middleware._introspect("token")
+
+        parse_access_token.assert_called_once_with("token")
+        self.assertEqual(middleware.introspection_cache.stats()["hits"], 1)
+        self.assertNotIn("token", middleware.introspection_cache._data)
+        self.assertIn(token_digest("token"),
+            middleware.introspection_cache._data)
+
+    @mock.patch("authenticate.oauth2.middleware.parse_access_token")
+    def test_expired_token(self, parse_access_token):
+        """ Test that data for an expired token is not cached. """
+
+        parse_access_token.return_value = {
+            "active": True,
+            "exp": time.time() - 1,
+        }
+
+        middleware = BearerTokenAuthenticationMiddleware(None)
+        middleware._introspect("token")
+        middleware._introspect("token")
+
+        self.assertEqual(parse_access_token.call_count, 2)
+
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shared",
+    },
+}
+
+
+class CountingAuthenticationMiddleware(AuthenticationMiddleware):
+
+    calls = 0
+
+    def _get_credentials(self, request):
+        return request.META.get("HTTP_X_CREDENTIALS")
+
+    def _authenticate(self, request):
+
+        self.calls += 1
+        return {"username": "user", "groups": []}
+
+
+class CountingAuthorizationMiddleware(AuthorizationMiddleware):
+
+    calls = 0
+
+    def _is_authorized(self, request, resource):
+
+        self.calls += 1
+        return resource == "allowed"
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    AUTH_CACHE={
+        "alias": "shared",
+        "ttls": {"authentication": 60, "authorization": 60},
+    },
+)
+class TieredCacheTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        caches["shared"].clear()
+
+    def test_shared_tier(self):
+        """ Test that entries are shared through the L2 cache. """
+
+        cache = TieredCache("test", 60, 10, alias="shared")
+        other_cache = TieredCache("test", 60, 10, alias="shared")
+
+        key = cache.make_key("a", "b")
+        cache.set(key, {"value": 1})
+
+        self.assertEqual(other_cache.get(key), {"value": 1})
+
+    def test_version(self):
+        """ Test that changing the version invalidates entries. """
+
+        cache = TieredCache("test", 60, 10, alias="shared", version="1")
+        new_cache = TieredCache("test", 60, 10, alias="shared", version="2")
+
+        cache.set(cache.make_key("a"), True)
+        self.assertIsNone(new_cache.get(new_cache.make_key("a")))
+
+    def test_shared_clear(self):
+        """ Test that clearing a cache invalidates entries in other processes.
+        """
+
+        cache = TieredCache("test", 60, 10, alias="shared")
+        other_cache = TieredCache("test", 60, 10, alias="shared")
+
+        cache.set(cache.make_key("a"), True)
+        other_cache.clear()
+
+        self.assertIsNone(cache.get(TieredCache("test", 60, 10,
+            alias="shared").make_key("a")))
+
+    def test_flush_command(self):
+        """ Test that the command flushes all kinds of shared cache, including
+        those configured outside of AUTH_CACHE.
+        """
+
+        for kind in ["authorization", "saml_decision"]:
+
+            cache = TieredCache(kind, 60, 10, alias="shared")
+            cache.set(cache.make_key("a"), True)
+
+        call_command("flush_auth_cache", stdout=io.StringIO())
+
+        for kind in ["authorization", "saml_decision"]:
+
+            cache = TieredCache(kind, 60, 10, alias="shared")
+            self.assertIsNone(cache.get(cache.make_key("a")))
+
+    @override_settings(AUTH_CACHE={"ttls": {"authorization": 60}})
+    def test_flush_command_unshared(self):
+        """ Test that the command fails if other processes can't see a flush.
+        """
+
+        with self.assertRaisesRegex(CommandError, "alias"):
+            call_command("flush_auth_cache", stdout=io.StringIO())
+
+    def test_disabled_kind(self):
+        """ Test that kinds without a TTL are not cached. """
+
+        self.assertIsNone(get_tiered_cache("unknown"))
+
+    def test_authentication_results(self):
+        """ Test that authentication results are cached by credentials. """
+
+        middleware = CountingAuthenticationMiddleware(None)
+        for _ in range(2):
+            request = self.factory.get("/", HTTP_X_CREDENTIALS="credentials")
+            user_data = middleware._cached_authenticate(request)
+
+        self.assertEqual(middleware.calls, 1)
+        self.assertEqual(user_data["username"], "user")
+
+    def test_authentication_expiry(self):
+        """ Test that results for expired credentials are not cached. """
+
+        middleware = CountingAuthenticationMiddleware(None)
+        for _ in range(2):
+            request = self.factory.get("/", HTTP_X_CREDENTIALS="credentials")
+            request.auth_expires_at = time.time() - 1
+            middleware._cached_authenticate(request)
+
+        self.assertEqual(middleware.calls, 2)
+
+    def test_authorization_decisions(self):
+        """ Test that allow and deny decisions are cached. """
+
+        middleware = CountingAuthorizationMiddleware(None)
+        for resource in ["allowed", "denied"] * 2:
+
+            request = self.factory.get("/")
+            request.session = {}
+            is_authorized = middleware._cached_is_authorized(request, resource)
+
+            self.assertEqual(is_authorized, resource == "allowed")
+
+        self.assertEqual(middleware.calls, 2)
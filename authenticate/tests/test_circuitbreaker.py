@@ -0,0 +1,130 @@
+""" Test module for upstream circuit breakers. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from authenticate.circuitbreaker import CircuitBreaker, CircuitOpenError, \
+    CLOSED, HALF_OPEN, OPEN
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.upstream = mock.Mock(return_value="result")
+        self.breaker = CircuitBreaker("upstream",
+            failure_exceptions=(UpstreamError,),
+            failure_threshold=2, reset_timeout=30)
+
+        patcher = mock.patch("authenticate.circuitbreaker.time.monotonic",
+            return_value=0)
+        self.monotonic = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fail(self, count=1):
+
+        self.upstream.side_effect = UpstreamError()
+        for _ in range(count):
+            with self.assertRaises(UpstreamError):
+                self.breaker.call("key", self.upstream)
+
+        self.upstream.side_effect = None
+
+    def test_opens_after_failures(self):
+        """ Test that consecutive failures open the circuit. """
+
+        self._fail()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self._fail()
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.upstream.reset_mock()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call("key", self.upstream)
+
+        self.upstream.assert_not_called()
+
+    def test_success_resets_failures(self):
+        """ Test that only consecutive failures are counted. """
+
+        self._fail()
+        self.breaker.call("key", self.upstream)
+        self._fail()
+
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe(self):
+        """ Test that a probe is let through after the reset timeout, closing
+        the circuit on success and reopening it on failure.
+        """
+
+        self._fail(2)
+
+        self.monotonic.return_value = 31
+        self._fail()
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.monotonic.return_value = 62
+        self.assertEqual(self.breaker.call("key", self.upstream), "result")
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_single_probe(self):
+        """ Test that other calls fail fast while a probe is in flight. """
+
+        self._fail(2)
+        self.monotonic.return_value = 31
+
+        def probe():
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.call("key", self.upstream)
+
+        self.breaker.call("key", probe)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_slow_calls(self):
+        """ Test that calls slower than the latency threshold are failures.
+        """
+
+        self.breaker.latency_threshold = 1
+
+        def slow():
+            self.monotonic.return_value += 2
+            return "slow"
+
+        self.assertEqual(self.breaker.call("key", slow), "slow")
+        self.breaker.call("key", slow)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_stale_results(self):
+        """ Test that the last result is served within the grace period. """
+
+        breaker = CircuitBreaker("upstream",
+            failure_exceptions=(UpstreamError,),
+            failure_threshold=1, reset_timeout=120, grace_period=60)
+
+        breaker.call("key", self.upstream)
+
+        self.upstream.side_effect = UpstreamError()
+        self.assertEqual(breaker.call("key", self.upstream), "result")
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.call("key", self.upstream), "result")
+
+        with self.assertRaises(CircuitOpenError):
+            breaker.call("other", self.upstream)
+
+        self.monotonic.return_value = 61
+        with self.assertRaises(CircuitOpenError):
+            breaker.call("key", self.upstream)
@@ -0,0 +1,72 @@
+""" Test module for the request path configuration. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import dataclasses
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authenticate.config import get_config, meta_key
+from authenticate.utils import get_requested_resource
+
+
+class AuthConfigTests(SimpleTestCase):
+
+    def test_defaults(self):
+        """ Test that defaults are used for unset settings. """
+
+        config = get_config()
+
+        self.assertEqual(config.resource_uri_query_key, "next")
+        self.assertEqual(config.resource_uri_header_key,
+            "HTTP_X_ORIGINAL_URI")
+        self.assertIsNone(config.shared_secret)
+        self.assertIs(get_config(), config)
+
+    def test_immutable(self):
+        """ Test that the config can't be changed once built. """
+
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            get_config().resource_uri_query_key = "other"
+
+    def test_meta_key(self):
+        """ Test that header names are converted to request.META keys. """
+
+        self.assertEqual(meta_key("X-Original-URI"), "HTTP_X_ORIGINAL_URI")
+        self.assertEqual(meta_key("HTTP_X_ORIGINAL_URI"),
+            "HTTP_X_ORIGINAL_URI")
+
+    @override_settings(SECURITY_SHAREDSECRET="c2VjcmV0")
+    def test_shared_secret(self):
+        """ Test that the shared secret is decoded ahead of time. """
+
+        self.assertEqual(get_config().shared_secret, b"secret")
+
+    def test_invalid_settings(self):
+        """ Test that invalid settings are rejected. """
+
+        with override_settings(SECURITY_SHAREDSECRET="c2VjcmV"):
+            with self.assertRaises(ImproperlyConfigured):
+                get_config()
+
+        with override_settings(AUTHORIZATION_EXEMPT_FILTER="exempt_all"):
+            with self.assertRaises(ImproperlyConfigured):
+                get_config()
+
+    def test_setting_changed(self):
+        """ Test that the config is rebuilt when settings change. """
+
+        def get_request():
+            return RequestFactory().get("/verify/",
+                HTTP_X_RESOURCE="http://example.com/file.nc")
+
+        self.assertIsNone(get_requested_resource(get_request()))
+
+        with override_settings(RESOURCE_URI_HEADER_KEY="X-Resource"):
+            self.assertEqual(get_requested_resource(get_request()),
+                "http://example.com/file.nc")
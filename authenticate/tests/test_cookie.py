@@ -0,0 +1,104 @@
+""" Test module for encrypted cookie authentication. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import base64
+import time
+
+from unittest import mock
+
+from crypto_cookie.auth_tkt import SecureCookie
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authenticate.cookie.exceptions import CookieParsingError
+from authenticate.cookie.middleware import CookieAuthenticationMiddleware
+from authenticate.utils import get_auth_expiry
+
+
+SECRET = b"0123456789abcdef0123456789abcdef"
+
+
+def make_cookie(username, issued_at=None):
+    return SecureCookie(SECRET, username, "127.0.0.1",
+        time=issued_at).cookie_value()
+
+
+@override_settings(
+    ACCOUNT_COOKIE_NAME="auth_tkt",
+    SECURITY_SHAREDSECRET=base64.b64encode(SECRET).decode(),
+    COOKIE_TICKET_MAX_AGE=3600,
+)
+class CookieAuthenticationMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.factory = RequestFactory()
+        self.middleware = CookieAuthenticationMiddleware(
+            lambda request: HttpResponse("OK"))
+
+        patcher = mock.patch.object(SecureCookie, "parse_ticket",
+            wraps=SecureCookie.parse_ticket)
+        self.parse_ticket = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _authenticate(self, cookie_value):
+
+        request = self.factory.get("/verify/")
+        request.COOKIES["auth_tkt"] = cookie_value
+
+        return request, self.middleware._authenticate(request)
+
+    def test_cached_ticket(self):
+        """ Test that a cookie is only decrypted the first time it is seen.
+        """
+
+        cookie_value = make_cookie("alice")
+
+        for _ in range(3):
+            request, user_data = self._authenticate(cookie_value)
+            self.assertEqual(user_data["username"], "alice")
+
+        self.assertEqual(self.parse_ticket.call_count, 1)
+        self.assertAlmostEqual(get_auth_expiry(request), time.time() + 3600,
+            delta=5)
+
+    def test_cached_failure(self):
+        """ Test that cookies which fail to parse are cached briefly. """
+
+        for _ in range(3):
+            _, user_data = self._authenticate("bad" * 32)
+            self.assertIsNone(user_data)
+
+        self.assertEqual(self.parse_ticket.call_count, 1)
+
+        with mock.patch("time.monotonic", return_value=time.monotonic() + 6):
+            self._authenticate("bad" * 32)
+
+        self.assertEqual(self.parse_ticket.call_count, 2)
+
+    def test_cached_failure_raises_new_error(self):
+        """ Test that a cached failure raises a new exception each time,
+        rather than re-raising one whose traceback grows.
+        """
+
+        errors = []
+        for _ in range(3):
+            with self.assertRaises(CookieParsingError) as context:
+                self.middleware._parse_cookie("bad" * 32)
+            errors.append(context.exception)
+
+        self.assertEqual(len({id(error) for error in errors}), 3)
+        self.assertEqual(str(errors[1]), str(errors[0]))
+
+    def test_expired_ticket(self):
+        """ Test that tickets older than the maximum age are rejected. """
+
+        _, user_data = self._authenticate(
+            make_cookie("alice", time.time() - 7200))
+
+        self.assertIsNone(user_data)
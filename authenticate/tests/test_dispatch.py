@@ -0,0 +1,134 @@
+""" Test module for the dispatching authentication middleware. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import asyncio
+
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authenticate.middleware import DispatchAuthenticationMiddleware
+from authenticate.utils import get_user
+
+
+class StubSession(dict):
+    """ Session which counts how often it is read. """
+
+    reads = 0
+
+    def get(self, *args):
+
+        self.reads += 1
+        return super().get(*args)
+
+
+@override_settings(
+    ACCOUNT_COOKIE_NAME="auth_tkt",
+    SECURITY_SHAREDSECRET="c2VjcmV0",
+)
+class DispatchAuthenticationMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.factory = RequestFactory()
+        self.middleware = DispatchAuthenticationMiddleware(
+            lambda request: HttpResponse("OK"))
+
+        # Replace each strategy's authentication with one naming the strategy
+        self.mocks = {}
+        for name, strategy in zip(["bearer", "cookie", "oidc"],
+                self.middleware.strategies):
+
+            patcher = mock.patch.object(strategy, "_authenticate",
+                return_value={"username": name, "groups": []})
+            self.mocks[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _assert_dispatched(self, request, strategy):
+
+        request.session = StubSession()
+        self.middleware(request)
+
+        for name, authenticate in self.mocks.items():
+            self.assertEqual(authenticate.called, name == strategy, name)
+
+        self.assertEqual(get_user(request).username, strategy)
+
+    def test_bearer_token(self):
+        """ Test that bearer tokens are passed to the bearer strategy. """
+
+        self._assert_dispatched(self.factory.get("/verify/",
+            HTTP_AUTHORIZATION="Bearer token"), "bearer")
+
+    def test_cookie(self):
+        """ Test that account cookies are passed to the cookie strategy. """
+
+        request = self.factory.get("/verify/")
+        request.COOKIES["auth_tkt"] = "ticket"
+
+        self._assert_dispatched(request, "cookie")
+
+    def test_fall_through(self):
+        """ Test that a request carrying several credentials falls through to
+        the next strategy if one fails, and stops at the first that succeeds.
+        """
+
+        self.mocks["bearer"].return_value = None
+
+        request = self.factory.get("/verify/",
+            HTTP_AUTHORIZATION="Bearer stale")
+        request.COOKIES["auth_tkt"] = "ticket"
+        request.session = StubSession()
+
+        self.middleware(request)
+
+        self.mocks["bearer"].assert_called_once()
+        self.mocks["cookie"].assert_called_once()
+        self.mocks["oidc"].assert_not_called()
+        self.assertEqual(get_user(request).username, "cookie")
+
+    def test_callback(self):
+        """ Test that only login callbacks are passed to the OIDC strategy.
+        """
+
+        self._assert_dispatched(self.factory.get("/login/callback/"), "oidc")
+
+    def test_no_credentials(self):
+        """ Test that requests without credentials skip authentication. """
+
+        request = self.factory.get("/verify/")
+        request.session = StubSession()
+
+        self.middleware(request)
+
+        self.assertEqual(request.session.reads, 0)
+        for authenticate in self.mocks.values():
+            authenticate.assert_not_called()
+
+    def test_async(self):
+        """ Test that strategies are dispatched under ASGI. """
+
+        async def get_response(request):
+            return HttpResponse("OK")
+
+        with override_settings(AUTHENTICATION_STRATEGIES=[
+                "authenticate.cookie.middleware."
+                "CookieAuthenticationMiddleware"]):
+            middleware = DispatchAuthenticationMiddleware(get_response)
+
+        cookie, = middleware.strategies
+        request = self.factory.get("/verify/")
+        request.COOKIES["auth_tkt"] = "ticket"
+        request.session = StubSession()
+
+        with mock.patch.object(cookie, "_parse_ticket",
+                return_value=({"username": "cookie", "groups": []}, None)):
+            asyncio.run(middleware(request))
+
+        self.assertEqual(get_user(request).username, "cookie")
@@ -0,0 +1,120 @@
+""" Test module for local JWT validation. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import time
+
+from unittest import mock
+
+from authlib.jose import JsonWebKey, RSAKey, jwt
+from django.test import SimpleTestCase, override_settings
+
+from authenticate.oauth2.exceptions import BadAccessTokenError
+from authenticate.oauth2.middleware import BearerTokenAuthenticationMiddleware
+
+
+ISSUER = "https://issuer.example.com"
+AUDIENCE = "auth-service"
+
+
+def generate_key(kid):
+
+    private_key = JsonWebKey.generate_key("RSA", 2048, is_private=True)
+    public_key = dict(RSAKey.import_key(private_key.get_public_key()),
+        kty="RSA", kid=kid)
+
+    return private_key, public_key
+
+
+def jwks_response(*public_keys):
+
+    response = mock.Mock()
+    response.json.return_value = {"keys": list(public_keys)}
+    return response
+
+
+@override_settings(
+    OAUTH2_LOCAL_VALIDATION=True,
+    OAUTH2_INTROSPECTION_FALLBACK=False,
+    OAUTH_JWKS_URL="https://issuer.example.com/jwks",
+    OAUTH_TOKEN_ISSUER=ISSUER,
+    OAUTH_TOKEN_AUDIENCE=AUDIENCE,
+)
+class LocalValidationTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.private_key, self.public_key = generate_key("key-1")
+
+        patcher = mock.patch("authenticate.oauth2.jwks.transport.request")
+        self.request = patcher.start()
+        self.request.return_value = jwks_response(self.public_key)
+        self.addCleanup(patcher.stop)
+
+        self.middleware = BearerTokenAuthenticationMiddleware(None)
+
+    def _token(self, private_key=None, kid="key-1", **claims):
+
+        payload = {
+            "iss": ISSUER,
+            "aud": AUDIENCE,
+            "exp": int(time.time()) + 60,
+            "preferred_username": "user",
+            "groups": ["group"],
+        }
+        payload.update(claims)
+
+        header = {"alg": "RS256", "kid": kid}
+        return jwt.encode(header, payload, private_key or self.private_key) \
+            .decode()
+
+    def test_valid_token(self):
+        """ Test that a valid token is mapped to user data. """
+
+        token_data = self.middleware._get_token_data(self._token())
+        user_data = self.middleware._parse_token_data(token_data)
+
+        self.assertEqual(user_data["username"], "user")
+        self.assertEqual(user_data["groups"], ["group"])
+
+    def test_invalid_claims(self):
+        """ Test that bad claims are rejected. """
+
+        for claims in ({"exp": int(time.time()) - 60},
+                {"nbf": int(time.time()) + 60},
+                {"iss": "https://other.example.com"},
+                {"aud": "other-service"}):
+
+            with self.assertRaises(BadAccessTokenError):
+                self.middleware._get_token_data(self._token(**claims))
+
+    def test_bad_signature(self):
+        """ Test that a token signed with another key is rejected. """
+
+        other_key, _ = generate_key("key-1")
+        with self.assertRaises(BadAccessTokenError):
+            self.middleware._get_token_data(self._token(private_key=other_key))
+
+    def test_unknown_key_refresh(self):
+        """ Test that an unknown key ID causes the JWKS to be refetched. """
+
+        self.middleware._get_token_data(self._token())
+
+        new_key, new_public_key = generate_key("key-2")
+        self.request.return_value = jwks_response(new_public_key)
+        self.middleware._jwt_validator.key_set.min_refresh_interval = 0
+
+        token = self._token(private_key=new_key, kid="key-2")
+        self.middleware._get_token_data(token)
+
+        self.assertEqual(self.request.call_count, 2)
+
+    def test_opaque_token(self):
+        """ Test that opaque tokens are rejected without a fallback. """
+
+        with self.assertRaises(BadAccessTokenError):
+            self.middleware._get_token_data("opaque-token")
@@ -0,0 +1,140 @@
+""" Test module for the metrics registry. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import tempfile
+
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from auth_service.views import MetricsView
+from authenticate.cache import TTLCache
+from authenticate.metrics import CACHE_REQUESTS, UPSTREAM_ERRORS, \
+    VERIFY_RESPONSES, Registry, track_upstream
+from authenticate.utils import USER_SESSION_KEY, User
+from authorize.middleware import LoginAuthorizationMiddleware
+
+
+class RegistryTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.registry = Registry()
+        self.counter = self.registry.counter("test_total", "Test counter.",
+            ["result"])
+        self.histogram = self.registry.histogram("test_seconds",
+            "Test histogram.", buckets=[0.1, 1])
+
+    def test_render(self):
+        """ Test that metrics are rendered in the Prometheus text format. """
+
+        self.counter.inc("ok")
+        self.counter.inc("ok", amount=2)
+        self.histogram.observe(0.05)
+        self.histogram.observe(0.5)
+        self.histogram.observe(5)
+
+        self.assertEqual(self.registry.render(), "\n".join([
+            "# HELP test_seconds Test histogram.",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{le="0.1"} 1',
+            'test_seconds_bucket{le="1"} 2',
+            'test_seconds_bucket{le="+Inf"} 3',
+            "test_seconds_sum 5.55",
+            "test_seconds_count 3",
+            "# HELP test_total Test counter.",
+            "# TYPE test_total counter",
+            'test_total{result="ok"} 3',
+        ]) + "\n")
+
+    def test_multiprocess(self):
+        """ Test that metrics from several processes are summed. """
+
+        other = Registry()
+        other.counter("test_total", "Test counter.", ["result"]).inc("ok")
+        other.histogram("test_seconds", "Test histogram.",
+            buckets=[0.1, 1]).observe(0.5)
+
+        self.counter.inc("ok")
+        self.counter.inc("error")
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            other.flush(directory)
+            snapshot = self.registry.collect(directory)
+
+        self.assertEqual(sorted(snapshot["test_total"]["values"]),
+            [[["error"], 1], [["ok"], 2]])
+        self.assertEqual(snapshot["test_seconds"]["values"],
+            [[[], [0, 1, 0, 0.5]]])
+
+    def test_track_upstream(self):
+        """ Test that failed upstream calls are counted as errors. """
+
+        errors = UPSTREAM_ERRORS.get("test")
+        with self.assertRaises(ValueError):
+            with track_upstream("test"):
+                raise ValueError()
+
+        self.assertEqual(UPSTREAM_ERRORS.get("test"), errors + 1)
+
+    def test_cache_lookups(self):
+        """ Test that lookups in named caches are counted. """
+
+        cache = TTLCache(maxsize=10, ttl=60, name="test")
+        hits = CACHE_REQUESTS.get("test", "hit")
+        misses = CACHE_REQUESTS.get("test", "miss")
+
+        cache.get("key")
+        cache.set("key", "value")
+        cache.get("key")
+
+        self.assertEqual(CACHE_REQUESTS.get("test", "hit"), hits + 1)
+        self.assertEqual(CACHE_REQUESTS.get("test", "miss"), misses + 1)
+
+
+class MetricsViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    @override_settings(METRICS_MULTIPROCESS_DIR=None)
+    def test_verify_responses(self):
+        """ Test that verify outcomes are counted by status code. """
+
+        denied = VERIFY_RESPONSES.get("401")
+
+        request = self.factory.get("/verify/")
+        request.session = SessionStore()
+        LoginAuthorizationMiddleware(lambda request: HttpResponse())(request)
+
+        self.assertEqual(VERIFY_RESPONSES.get("401"), denied + 1)
+
+        response = MetricsView.as_view()(self.factory.get("/metrics/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            f'auth_verify_responses_total{{status="401"}} {denied + 1}',
+            response.content.decode())
+        self.assertIn('auth_authorization_duration_seconds_count'
+            '{authorizer="login"}', response.content.decode())
+
+    @override_settings(METRICS_MULTIPROCESS_DIR=None)
+    def test_chained_authorizers(self):
+        """ Test that a response passing through several authorization
+        middleware is counted once.
+        """
+
+        allowed = VERIFY_RESPONSES.get("200")
+
+        request = self.factory.get("/verify/")
+        request.session = SessionStore()
+        request.session[USER_SESSION_KEY] = User("alice")._asdict()
+        LoginAuthorizationMiddleware(LoginAuthorizationMiddleware(
+            lambda request: HttpResponse()))(request)
+
+        self.assertEqual(VERIFY_RESPONSES.get("200"), allowed + 1)
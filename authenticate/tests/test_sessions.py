@@ -0,0 +1,166 @@
+""" Test module for the compact signed cookie session engine. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+from django.conf import settings
+from django.contrib.sessions.backends import signed_cookies
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.serializers import JSONSerializer
+from django.core import signing
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authenticate.sessions import CompactSessionSerializer, SessionStore
+from authenticate.utils import USER_SESSION_KEY, User, login
+
+
+USER_DATA = {"username": "user", "groups": ["badc", "cmip6"]}
+
+
+class CompactSessionSerializerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.serializer = CompactSessionSerializer()
+
+    def test_round_trip(self):
+        """ Test that sessions are loaded as they were dumped. """
+
+        for session in [
+                {},
+                {USER_SESSION_KEY: USER_DATA},
+                {USER_SESSION_KEY: USER_DATA, "resource_uri": "/file.nc"},
+                {USER_SESSION_KEY: {"username": "user", "groups": []}},
+                {USER_SESSION_KEY: {"username": "user", "groups": [""]}},
+                {USER_SESSION_KEY: {"username": None, "groups": None}},
+                {"resource_uri": "/file.nc"}]:
+
+            data = self.serializer.dumps(session)
+            self.assertEqual(self.serializer.loads(data), session)
+
+    def test_compact(self):
+        """ Test that users are packed into less space than JSON. """
+
+        session = {USER_SESSION_KEY: USER_DATA}
+
+        self.assertLess(len(self.serializer.dumps(session)),
+            len(JSONSerializer().dumps(session)) / 2)
+
+    def test_json_sessions(self):
+        """ Test that sessions written as JSON can still be loaded. """
+
+        session = {USER_SESSION_KEY: USER_DATA}
+
+        self.assertEqual(
+            self.serializer.loads(JSONSerializer().dumps(session)), session)
+
+    def test_unknown_version(self):
+        """ Test that sessions in an unknown format are rejected. """
+
+        with self.assertRaises(ValueError):
+            self.serializer.loads(b"\x09\x00")
+
+
+@override_settings(SESSION_ENGINE="authenticate.sessions")
+class SessionStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _get_response(self, session_key=None):
+        """ Logs a user in during a request and returns the response. """
+
+        def view(request):
+            login(request, User(**USER_DATA))
+            return HttpResponse("OK")
+
+        request = self.factory.get("/verify/")
+        if session_key:
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+
+        return SessionMiddleware(view)(request)
+
+    def test_cookie(self):
+        """ Test that the session cookie is signed and loads the user. """
+
+        response = self._get_response()
+        session_key = response.cookies[settings.SESSION_COOKIE_NAME].value
+
+        self.assertEqual(SessionStore(session_key)[USER_SESSION_KEY],
+            USER_DATA)
+
+        with self.assertRaises(signing.BadSignature):
+            signing.loads(session_key[:-1] + "x",
+                salt="django.contrib.sessions.backends.signed_cookies",
+                serializer=CompactSessionSerializer)
+
+    def test_unchanged_user(self):
+        """ Test that no cookie is set when the user hasn't changed. """
+
+        response = self._get_response()
+        session_key = response.cookies[settings.SESSION_COOKIE_NAME].value
+
+        response = self._get_response(session_key)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_unchanged_value(self):
+        """ Test that setting an unchanged value doesn't modify a session. """
+
+        session = SessionStore()
+        session["resource_uri"] = "/file.nc"
+        session_key = session._get_session_key()
+
+        session = SessionStore(session_key)
+        session["resource_uri"] = "/file.nc"
+        self.assertFalse(session.modified)
+
+        session["resource_uri"] = "/other.nc"
+        self.assertTrue(session.modified)
+
+    def test_signed_cookies_session(self):
+        """ Test that a cookie written by the signed_cookies engine is loaded,
+        and is rewritten in the compact format once changed.
+        """
+
+        old_session = signed_cookies.SessionStore()
+        old_session[USER_SESSION_KEY] = USER_DATA
+        old_session["resource_uri"] = "/file.nc" * 20
+        old_key = old_session._get_session_key()
+
+        session = SessionStore(old_key)
+        self.assertEqual(dict(session.items()), dict(old_session.items()))
+
+        session["resource_uri"] = "/other.nc"
+        session_key = session._get_session_key()
+        self.assertNotEqual(session_key, old_key)
+
+        session = SessionStore(session_key)
+        self.assertEqual(session[USER_SESSION_KEY], USER_DATA)
+        self.assertEqual(session["resource_uri"], "/other.nc")
+
+    def test_signed_cookies_login(self):
+        """ Test that a user logged in with a signed_cookies cookie stays
+        logged in without the cookie being rewritten.
+        """
+
+        old_session = signed_cookies.SessionStore()
+        old_session[USER_SESSION_KEY] = USER_DATA
+
+        response = self._get_response(old_session._get_session_key())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    @override_settings(SESSION_SERIALIZER=
+        "django.contrib.sessions.serializers.PickleSerializer")
+    def test_signed_cookies_serializer(self):
+        """ Test that cookies written with the configured SESSION_SERIALIZER
+        are loaded.
+        """
+
+        old_session = signed_cookies.SessionStore()
+        old_session[USER_SESSION_KEY] = USER_DATA
+
+        session = SessionStore(old_session._get_session_key())
+        self.assertEqual(session[USER_SESSION_KEY], USER_DATA)
@@ -0,0 +1,152 @@
+""" Test module for single-flight call coalescing. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import asyncio
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from authenticate.oauth2.middleware import BearerTokenAuthenticationMiddleware
+from authenticate.singleflight import AsyncSingleFlight, SingleFlight
+
+
+BURST_SIZE = 20
+
+
+def burst(func, *args):
+    """ Runs a function from many threads at once and returns the results or
+    raised exceptions.
+    """
+
+    barrier = threading.Barrier(BURST_SIZE)
+
+    def call():
+        barrier.wait()
+        try:
+            return func(*args)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=BURST_SIZE) as executor:
+        futures = [executor.submit(call) for _ in range(BURST_SIZE)]
+        return [future.result() for future in futures]
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.flights = SingleFlight()
+        self.calls = 0
+
+    def _slow_upstream(self, value):
+
+        self.calls += 1
+        time.sleep(0.2)
+        return value
+
+    def _failing_upstream(self):
+
+        self.calls += 1
+        time.sleep(0.2)
+        raise ValueError("Upstream error")
+
+    def test_burst_shares_result(self):
+        """ Test that a burst of identical calls makes one upstream call. """
+
+        results = burst(self.flights.do, "key", self._slow_upstream, "result")
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ["result"] * BURST_SIZE)
+
+    def test_burst_shares_exception(self):
+        """ Test that all waiting callers receive the upstream exception. """
+
+        results = burst(self.flights.do, "key", self._failing_upstream)
+
+        self.assertEqual(self.calls, 1)
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+            self.assertEqual(str(result), "Upstream error")
+
+        # Each caller gets its own exception, chained from the original
+        self.assertEqual(len({id(result) for result in results}), BURST_SIZE)
+        originals = {id(result.__cause__) for result in results
+            if result.__cause__ is not None}
+        self.assertEqual(len(originals), 1)
+
+    def test_distinct_keys(self):
+        """ Test that calls with different keys are not coalesced. """
+
+        burst(lambda: self.flights.do(threading.get_ident(),
+            self._slow_upstream, None))
+
+        self.assertEqual(self.calls, BURST_SIZE)
+
+    def test_sequential_calls(self):
+        """ Test that a finished call is not reused. """
+
+        self.flights.do("key", self._slow_upstream, 1)
+        self.flights.do("key", self._slow_upstream, 2)
+
+        self.assertEqual(self.calls, 2)
+
+
+class AsyncSingleFlightTests(SimpleTestCase):
+
+    def test_burst_shares_exception(self):
+        """ Test that awaiting callers each receive a copy of the upstream
+        exception.
+        """
+
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def failing_upstream():
+            calls.append(None)
+            await asyncio.sleep(0.05)
+            raise ValueError("Upstream error")
+
+        async def run():
+            return await asyncio.gather(
+                *(flights.do("key", failing_upstream) for _ in range(5)),
+                return_exceptions=True)
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(calls), 1)
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+        self.assertEqual(len({id(result) for result in results}), 5)
+
+
+class IntrospectionBurstTests(SimpleTestCase):
+
+    @mock.patch("authenticate.oauth2.middleware.parse_access_token")
+    def test_token_burst(self, parse_access_token):
+        """ Test that a burst of requests with one token makes one
+        introspection call, even with caching disabled.
+        """
+
+        def introspect(access_token):
+            time.sleep(0.2)
+            return {"active": True, "preferred_username": "user"}
+
+        parse_access_token.side_effect = introspect
+
+        middleware = BearerTokenAuthenticationMiddleware(None)
+        middleware.introspection_cache.maxsize = 0
+        results = burst(middleware._introspect, "token")
+
+        parse_access_token.assert_called_once_with("token")
+        for result in results:
+            self.assertEqual(result["preferred_username"], "user")
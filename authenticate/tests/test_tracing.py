@@ -0,0 +1,116 @@
+""" Test module for request stage timings. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import asyncio
+import json
+
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authenticate import tracing
+from authenticate.middleware import ServerTimingMiddleware
+from authenticate.utils import USER_SESSION_KEY, User
+from authorize.middleware import LoginAuthorizationMiddleware
+
+
+def upstream_view(request):
+
+    tracing.record("upstream-opa", 0.002)
+    return HttpResponse()
+
+
+async def async_upstream_view(request):
+    return upstream_view(request)
+
+
+class ServerTimingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _request(self):
+
+        request = self.factory.get("/verify/",
+            {"next": "http://data.example.com/file.nc"})
+        request.session = SessionStore()
+        request.session[USER_SESSION_KEY] = User("alice", ["badc"])._asdict()
+
+        return request
+
+    def _stages(self, response):
+
+        return [timing.split(";")[0]
+            for timing in response["Server-Timing"].split(", ")]
+
+    @override_settings(SERVER_TIMING={"header": True})
+    def test_header(self):
+        """ Test that each stage is timed in the Server-Timing header. """
+
+        middleware = ServerTimingMiddleware(
+            LoginAuthorizationMiddleware(upstream_view))
+        response = middleware(self._request())
+
+        self.assertEqual(self._stages(response),
+            ["session", "authz-login", "upstream-opa", "total"])
+        self.assertIn("upstream-opa;dur=2.000", response["Server-Timing"])
+
+    @override_settings(SERVER_TIMING={"header": True})
+    def test_async(self):
+        """ Test that stages are timed when running under ASGI. """
+
+        middleware = ServerTimingMiddleware(
+            LoginAuthorizationMiddleware(async_upstream_view))
+        response = asyncio.run(middleware(self._request()))
+
+        self.assertEqual(self._stages(response),
+            ["session", "authz-login", "upstream-opa", "total"])
+
+    def test_unused_by_default(self):
+        """ Test that the middleware is unused unless the header or log is
+        enabled.
+        """
+
+        with self.assertRaises(MiddlewareNotUsed):
+            ServerTimingMiddleware(upstream_view)
+
+    @override_settings(SERVER_TIMING={"header": False, "log": True})
+    def test_log(self):
+        """ Test that timings can be logged instead. """
+
+        middleware = ServerTimingMiddleware(upstream_view)
+        with self.assertLogs("authenticate.timing") as logs:
+            response = middleware(self._request())
+
+        self.assertNotIn("Server-Timing", response)
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["status"], 200)
+        self.assertEqual(line["timings"]["upstream-opa"], 2.0)
+
+    def test_no_trace(self):
+        """ Test that stages outside a trace aren't recorded. """
+
+        with tracing.stage("session"):
+            pass
+
+        self.assertIs(tracing.stage("session"), tracing._NULL_STAGE)
+
+    def test_repeated_stage(self):
+        """ Test that a stage which ran more than once is described with its
+        count.
+        """
+
+        trace = tracing.Trace()
+        trace.record("upstream-opa", 0.002)
+        trace.record("upstream-opa", 0.003)
+        trace.record("total", 0.006)
+
+        self.assertEqual(trace.server_timing(),
+            'upstream-opa;dur=5.000;desc="2 calls", total;dur=6.000')
@@ -0,0 +1,111 @@
+""" Test module for the app's utility functions. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import copy
+import pickle
+
+from django.test import RequestFactory, SimpleTestCase
+
+from authenticate.middleware import DispatchAuthenticationMiddleware
+from authenticate.utils import USER_SESSION_KEY, User, get_user, login
+from authorize.middleware import LoginAuthorizationMiddleware
+from authorize.views import VerifyView
+
+
+class StubSession(dict):
+    """ Session which counts how often the user is read from it. """
+
+    user_reads = 0
+
+    def get(self, key, *args):
+
+        if key == USER_SESSION_KEY:
+            self.user_reads += 1
+
+        return super().get(key, *args)
+
+
+class UserTests(SimpleTestCase):
+
+    def test_user(self):
+        """ Test that users are immutable and hold groups in a frozenset. """
+
+        user = User("user", ["b", "a", "a"])
+
+        self.assertEqual(user.groups, frozenset(["a", "b"]))
+        self.assertEqual(user, User("user", ["a", "b"]))
+        self.assertEqual(user._asdict(), {"username": "user",
+            "groups": ["a", "b"]})
+
+        with self.assertRaises(AttributeError):
+            user.username = "other"
+
+        with self.assertRaises(AttributeError):
+            user.email = "user@example.com"
+
+    def test_pickle_and_copy(self):
+        """ Test that users can be pickled and copied. """
+
+        user = User("user", ["a", "b"])
+
+        for copied in [pickle.loads(pickle.dumps(user)),
+                copy.copy(user), copy.deepcopy(user)]:
+            self.assertEqual(copied, user)
+            self.assertIsInstance(copied.groups, frozenset)
+
+    def test_missing_groups(self):
+        """ Test that users may be created without groups. """
+
+        self.assertEqual(User("user", None).groups, frozenset())
+
+    def test_group_claim_types(self):
+        """ Test that a string groups claim is a single group, None entries
+        are dropped and groups of mixed types can be serialized.
+        """
+
+        self.assertEqual(User("user", "admin").groups, frozenset(["admin"]))
+
+        user = User("user", ["b", None, 1])
+        self.assertEqual(user.groups, frozenset(["b", 1]))
+        self.assertEqual(user._asdict()["groups"], [1, "b"])
+
+
+class RequestUserTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_session_read_once(self):
+        """ Test that the session is read once for a verify request. """
+
+        request = self.factory.get("/verify/",
+            {"next": "http://data.example.com/file.nc"})
+        request.session = StubSession()
+        request.session[USER_SESSION_KEY] = User("user", ["a"])._asdict()
+
+        handler = DispatchAuthenticationMiddleware(
+            LoginAuthorizationMiddleware(VerifyView.as_view()))
+
+        response = handler(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Remote-User"], "user")
+        self.assertEqual(request.session.user_reads, 1)
+
+    def test_login(self):
+        """ Test that logging in replaces the request's user. """
+
+        request = self.factory.get("/verify/")
+        request.session = StubSession()
+
+        self.assertIsNone(get_user(request))
+
+        login(request, User("user", ["a"]))
+
+        self.assertEqual(get_user(request).username, "user")
+        self.assertEqual(request.session.user_reads, 1)
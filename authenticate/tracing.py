@@ -0,0 +1,128 @@
+""" Timing of the stages of a request, for the `Server-Timing` header.
+
+A trace is only active while a request passes through the
+`ServerTimingMiddleware`. Stages timed outside a trace cost a context
+variable lookup.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import contextvars
+import time
+
+
+_current_trace = contextvars.ContextVar("auth_trace", default=None)
+
+
+class Trace:
+    """ Durations of the named stages of a request. Stages with the same name
+    are added together, and the number of times each ran is counted.
+    """
+
+    __slots__ = ("started", "stages", "counts")
+
+    def __init__(self):
+
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+
+    def record(self, name, duration):
+        """ Adds a number of seconds to a stage. """
+
+        self.stages[name] = self.stages.get(name, 0) + duration
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def elapsed(self):
+        """ Returns the number of seconds since the trace started. """
+
+        return time.perf_counter() - self.started
+
+    def milliseconds(self):
+        """ Returns the duration of each stage in milliseconds. """
+
+        return {name: round(duration * 1000, 3)
+            for name, duration in self.stages.items()}
+
+    def server_timing(self):
+        """ Returns the stages formatted as a `Server-Timing` header. Stages
+        which ran more than once are described with their count.
+        """
+
+        timings = []
+        for name, duration in self.stages.items():
+
+            timing = f"{name};dur={duration * 1000:.3f}"
+            if self.counts[name] > 1:
+                timing += f';desc="{self.counts[name]} calls"'
+
+            timings.append(timing)
+
+        return ", ".join(timings)
+
+
+class _Stage:
+
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.trace.record(self.name, time.perf_counter() - self.start)
+
+
+class _NullStage:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    """ Returns a context manager timing a stage of the current request. """
+
+    trace = _current_trace.get()
+    if trace is None:
+        return _NULL_STAGE
+
+    return _Stage(trace, name)
+
+
+def record(name, duration):
+    """ Adds a number of seconds to a stage of the current request. """
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(name, duration)
+
+
+def start_trace():
+    """ Starts a trace for the current request. Returns the trace and a token
+    to pass to `end_trace`.
+    """
+
+    trace = Trace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    """ Ends the trace started with a token. """
+
+    _current_trace.reset(token)
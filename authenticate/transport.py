@@ -0,0 +1,145 @@
+""" Shared HTTP transport for outbound auth calls. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import asyncio
+import logging
+import threading
+import weakref
+
+import httpx
+import requests
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_OUTBOUND_HTTP = {
+    # Number of per-host connection pools to keep
+    "pool_connections": 10,
+    # Maximum number of keep-alive connections in each pool
+    "pool_maxsize": 10,
+    # Seconds to wait for a connection and for response data respectively
+    "connect_timeout": 3.05,
+    "read_timeout": 10,
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+# Async clients are bound to the event loop they were created in
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_transport_settings():
+    """ Returns outbound HTTP settings with defaults filled in. """
+
+    transport_settings = DEFAULT_OUTBOUND_HTTP.copy()
+    transport_settings.update(getattr(settings, "OUTBOUND_HTTP", {}))
+
+    return transport_settings
+
+
+def build_session(pool_connections, pool_maxsize, **kwargs):
+    """ Builds a requests session with pooled keep-alive connections. """
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def get_session():
+    """ Returns the session shared by all outbound calls in this process. """
+
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+
+                transport_settings = get_transport_settings()
+                LOG.debug(f"Creating outbound HTTP session: {transport_settings}")
+                _session = build_session(**transport_settings)
+
+    return _session
+
+
+def reset_session():
+    """ Closes the shared session so that it is rebuilt on next use. """
+
+    global _session
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def request(method, url, **kwargs):
+    """ Sends a request over the shared session, applying the configured
+    timeouts unless the caller provides its own.
+    """
+
+    if "timeout" not in kwargs:
+        transport_settings = get_transport_settings()
+        kwargs["timeout"] = (
+            transport_settings["connect_timeout"],
+            transport_settings["read_timeout"],
+        )
+
+    return get_session().request(method, url, **kwargs)
+
+
+def build_async_client(pool_maxsize, connect_timeout, read_timeout,
+        verify=True, cert=None, **kwargs):
+    """ Builds an async HTTP client with pooled keep-alive connections. """
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=pool_maxsize,
+            max_keepalive_connections=pool_maxsize,
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        verify=verify,
+        cert=cert,
+    )
+
+
+def get_async_client(verify=True, cert=None):
+    """ Returns the async client shared by outbound calls made from the
+    running event loop with the given certificate options.
+    """
+
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+
+    client = clients.get((verify, cert))
+    if client is None:
+
+        transport_settings = get_transport_settings()
+        LOG.debug(f"Creating async outbound HTTP client: {transport_settings}")
+        client = clients[(verify, cert)] = build_async_client(
+            verify=verify, cert=cert, **transport_settings)
+
+    return client
+
+
+async def arequest(method, url, verify=True, cert=None, **kwargs):
+    """ Sends a request without blocking the event loop, over a client shared
+    by calls with the same certificate options.
+    """
+
+    client = get_async_client(verify=verify, cert=cert)
+    return await client.request(method, url, **kwargs)
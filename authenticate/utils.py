@@ -8,8 +8,12 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 
 import logging
 
-from collections import namedtuple
-from django.conf import settings
+from django.urls import get_script_prefix, reverse
+
+from authenticate import tracing
+from authenticate.config import get_config, \
+    DEFAULT_RESOURCE_URI_QUERY_KEY, DEFAULT_RESOURCE_URI_HEADER_KEY, \
+    DEFAULT_RESOURCE_URI_SESSION_KEY
 
 
 LOG = logging.getLogger(__name__)
@@ -20,26 +24,102 @@ USER_PROPERTIES = [
     "groups",
 ]
 
-DEFAULT_RESOURCE_URI_QUERY_KEY = "next"
-DEFAULT_RESOURCE_URI_HEADER_KEY = "HTTP_X_ORIGINAL_URI"
-DEFAULT_RESOURCE_URI_SESSION_KEY = "resource_uri"
+AUTH_EXPIRY_ATTRIBUTE = "auth_expires_at"
+
+# Request attributes holding values resolved once per request
+USER_ATTRIBUTE = "_auth_user"
+RESOURCE_ATTRIBUTE = "_auth_requested_resource"
+
+_UNSET = object()
+
+
+def _normalize_groups(groups):
+    """ Returns groups as a frozenset. A single group name given as a string
+    is treated as one group, and None entries are dropped.
+    """
+
+    if not groups:
+        return frozenset()
+
+    if isinstance(groups, str):
+        groups = (groups,)
+
+    return frozenset(group for group in groups if group is not None)
+
+
+class User:
+    """ An authenticated user. Immutable, with groups held in a frozenset for
+    fast membership tests.
+    """
+
+    __slots__ = USER_PROPERTIES
 
+    def __init__(self, username, groups=None):
 
-User = namedtuple("User", USER_PROPERTIES)
+        object.__setattr__(self, "username", username)
+        object.__setattr__(self, "groups", _normalize_groups(groups))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    __delattr__ = __setattr__
+
+    def __reduce__(self):
+        # Rebuilt through __init__, since attributes can't be set afterwards
+        return (type(self), (self.username, self.groups))
+
+    def __eq__(self, other):
+
+        if not isinstance(other, User):
+            return NotImplemented
+
+        return self.username == other.username and self.groups == other.groups
+
+    def __hash__(self):
+        return hash((self.username, self.groups))
+
+    def __repr__(self):
+        return f"User(username={self.username!r}, groups={self.groups!r})"
+
+    def _asdict(self):
+        """ Returns the user's data in a form which can be serialized. """
+
+        return {
+            "username": self.username,
+            # Groups from token claims may mix types, e.g. numeric IDs
+            "groups": sorted(self.groups, key=str),
+        }
 
 
 def login(request, user):
-    """ Stores a user's data in the request session. """
+    """ Stores a user's data in the request session. The session isn't
+    modified if it already holds the same user.
+    """
+
+    if get_user(request) != user:
+        request.session[USER_SESSION_KEY] = user._asdict()
 
-    request.session[USER_SESSION_KEY] = user._asdict()
+    setattr(request, USER_ATTRIBUTE, user)
 
 
 def get_user(request):
-    """ Gets the stored user from the request session. """
+    """ Gets the stored user from the request session. The session is only
+    read the first time a request's user is looked up.
+    """
 
-    user_data = request.session.get(USER_SESSION_KEY)
-    if user_data:
-        return User(**user_data)
+    user = getattr(request, USER_ATTRIBUTE, _UNSET)
+    if user is _UNSET:
+
+        user = None
+        with tracing.stage("session"):
+            user_data = request.session.get(USER_SESSION_KEY)
+
+        if user_data:
+            user = User(**user_data)
+
+        setattr(request, USER_ATTRIBUTE, user)
+
+    return user
 
 
 def is_authenticated(request):
@@ -50,13 +130,43 @@ def is_authenticated(request):
     return bool(get_user(request))
 
 
+def limit_auth_expiry(request, expires_at):
+    """ Records that the credentials presented with a request are valid until
+    no later than `expires_at`, a Unix timestamp.
+    """
+
+    current = getattr(request, AUTH_EXPIRY_ATTRIBUTE, None)
+    if current is None or expires_at < current:
+        setattr(request, AUTH_EXPIRY_ATTRIBUTE, expires_at)
+
+
+def get_auth_expiry(request):
+    """ Returns the time at which a request's credentials expire, if known.
+    """
+
+    return getattr(request, AUTH_EXPIRY_ATTRIBUTE, None)
+
+
 def get_requested_resource(request):
     """ Return a reverse-proxy-originating resource URL from the request.
+    The URL is only looked up the first time it is requested.
     """
 
+    resource_uri = getattr(request, RESOURCE_ATTRIBUTE, _UNSET)
+    if resource_uri is _UNSET:
+
+        resource_uri = _find_requested_resource(request)
+        setattr(request, RESOURCE_ATTRIBUTE, resource_uri)
+
+    return resource_uri
+
+
+def _find_requested_resource(request):
+
+    config = get_config()
+
     # Attempt to get the URL from the request query
-    query_key = getattr(settings, "RESOURCE_URI_QUERY_KEY",
-        DEFAULT_RESOURCE_URI_QUERY_KEY)
+    query_key = config.resource_uri_query_key
     resource_uri = request.GET.get(query_key, None)
 
     if resource_uri:
@@ -66,8 +176,7 @@ def get_requested_resource(request):
         LOG.debug(f"No resource URI from query '{query_key}', checking headers...")
 
         # Attempt to get the resource URL from the request header
-        header_key = getattr(settings, "RESOURCE_URI_HEADER_KEY",
-            DEFAULT_RESOURCE_URI_HEADER_KEY)
+        header_key = config.resource_uri_header_key
         resource_uri = request.META.get(header_key, None)
 
         if resource_uri:
@@ -83,8 +192,7 @@ def get_stored_resource(request):
     """
 
     # Attempt to get the resource URL from the session
-    session_key = getattr(settings, "RESOURCE_URI_SESSION_KEY",
-        DEFAULT_RESOURCE_URI_SESSION_KEY)
+    session_key = get_config().resource_uri_session_key
     resource_uri = request.session.get(session_key, None)
 
     return resource_uri
@@ -95,6 +203,20 @@ def save_resource(request, resource_uri):
     """
 
     # Save next URL to session to be picked up by the callback
-    session_key = getattr(settings, "RESOURCE_URI_SESSION_KEY",
-        DEFAULT_RESOURCE_URI_SESSION_KEY)
+    session_key = get_config().resource_uri_session_key
     request.session[session_key] = resource_uri
+
+
+def reverse_path_info(viewname, urlconf=None):
+    """ Returns the path of a URL name without the script prefix, for
+    comparison with `request.path_info`. `reverse` includes the prefix, e.g.
+    when `FORCE_SCRIPT_NAME` is set.
+    """
+
+    path = reverse(viewname, urlconf=urlconf)
+
+    prefix = get_script_prefix()
+    if path.startswith(prefix):
+        path = "/" + path[len(prefix):]
+
+    return path
@@ -0,0 +1,102 @@
+""" ACL authorization middleware. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from authorize.middleware import AuthorizationMiddleware
+from authenticate.utils import get_user
+from .exceptions import ACLConfigurationError
+from .rules import AccessControlList
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_RELOAD_INTERVAL = 5
+
+
+class ACLAuthorizationMiddleware(AuthorizationMiddleware):
+    """ Middleware for handling authorization against in-process group/prefix
+    rules, loaded from the `ACL_RULES_FILE` or `ACL_RULES` settings.
+    """
+
+    # Lookups are cheaper than the decision cache
+    CACHE_KIND = None
+
+    METRICS_LABEL = "acl"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+
+        self._rules_file = getattr(settings, "ACL_RULES_FILE", None)
+        self._reload_interval = getattr(settings, "ACL_RELOAD_INTERVAL",
+            DEFAULT_RELOAD_INTERVAL)
+
+        self._reload_lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._modified_at = None
+
+        if self._rules_file:
+            self._modified_at = os.stat(self._rules_file).st_mtime
+            self._acl = AccessControlList.from_file(self._rules_file)
+        else:
+            self._acl = AccessControlList(getattr(settings, "ACL_RULES", []))
+
+        LOG.debug(f"Loaded {len(self._acl)} ACL prefixes")
+
+    def _reload(self):
+        """ Reloads the rules file if it has changed since it was loaded. """
+
+        try:
+            modified_at = os.stat(self._rules_file).st_mtime
+            if modified_at != self._modified_at:
+
+                self._acl = AccessControlList.from_file(self._rules_file)
+                self._modified_at = modified_at
+
+                LOG.info(f"Reloaded {len(self._acl)} ACL prefixes from "
+                    f"{self._rules_file}")
+
+        except (OSError, ACLConfigurationError) as e:
+            LOG.error(f"Failed to reload ACL rules, keeping old rules: {e}")
+
+    def _get_acl(self):
+        """ Returns the current rules, checking the rules file for changes at
+        most once per reload interval.
+        """
+
+        if self._rules_file:
+
+            now = time.monotonic()
+            if now - self._checked_at > self._reload_interval and \
+                    self._reload_lock.acquire(blocking=False):
+
+                try:
+                    self._checked_at = now
+                    self._reload()
+                finally:
+                    self._reload_lock.release()
+
+        return self._acl
+
+    def _is_authorized(self, request, resource):
+
+        groups = ()
+
+        user = get_user(request)
+        if user:
+            groups = user.groups
+
+        return self._get_acl().is_authorized(resource, request.method, groups)
+
+    async def _ais_authorized(self, request, resource):
+        return self._is_authorized(request, resource)
@@ -0,0 +1,95 @@
+""" Access control lists built from group/prefix rules. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import yaml
+
+from .exceptions import ACLConfigurationError
+from .trie import PathTrie, has_dot_segments, url_segments
+
+
+ANY_METHOD = "*"
+DEFAULT_METHODS = ["GET", "HEAD"]
+
+
+class AccessControlList:
+    """ Authorizes access to resources by the groups of a user.
+
+    Each rule grants members of some groups access to URLs under a prefix of
+    host and path segments, e.g.
+
+        {"prefix": "data.example.com/badc/cmip6", "groups": ["cmip6"]}
+
+    Rules may list the `methods` they apply to, by default GET and HEAD, or
+    "*" for any method. Access is decided by the longest prefix with rules
+    matching a URL; URLs with no matching prefix are denied, as are URLs with
+    "." or ".." path segments, which the server may resolve to a path outside
+    the matching prefix.
+    """
+
+    def __init__(self, rules):
+
+        self._trie = PathTrie()
+        for rule in rules:
+
+            try:
+                segments = url_segments(rule["prefix"])
+                groups = frozenset(rule["groups"])
+                methods = rule.get("methods", DEFAULT_METHODS)
+
+            except (KeyError, TypeError, ValueError) as e:
+                raise ACLConfigurationError(f"Invalid ACL rule {rule}: {e}")
+
+            method_groups = self._trie.setdefault(segments, {})
+            for method in methods:
+                method = method.upper()
+                method_groups[method] = \
+                    method_groups.get(method, frozenset()) | groups
+
+    @classmethod
+    def from_file(cls, path):
+        """ Loads rules from a YAML or JSON file containing a list of rules.
+        """
+
+        try:
+            with open(path) as rules_file:
+                rules = yaml.safe_load(rules_file)
+
+        except (OSError, yaml.YAMLError) as e:
+            raise ACLConfigurationError(f"Failed to read ACL file {path}: {e}")
+
+        if not isinstance(rules, list):
+            raise ACLConfigurationError(f"ACL file {path} must contain a list")
+
+        return cls(rules)
+
+    def __len__(self):
+        return len(self._trie)
+
+    def is_authorized(self, resource, method, groups):
+        """ Returns True if any of the groups may access the resource using
+        the given method.
+        """
+
+        if not resource or not groups:
+            return False
+
+        segments = url_segments(resource)
+        if has_dot_segments(segments):
+            return False
+
+        method_groups = self._trie.longest_match(segments)
+        if not method_groups:
+            return False
+
+        for key in (method, ANY_METHOD):
+
+            allowed_groups = method_groups.get(key)
+            if allowed_groups and not allowed_groups.isdisjoint(groups):
+                return True
+
+        return False
@@ -0,0 +1,98 @@
+""" Prefix trie over URL path segments. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+from urllib.parse import unquote, urlsplit
+
+
+DOT_SEGMENTS = frozenset((".", ".."))
+
+
+def url_segments(url):
+    """ Splits a URL into its host and percent-decoded path segments. The
+    scheme, port, query and fragment are ignored. URLs may be given without a
+    scheme, e.g. "host.example.com/path".
+    """
+
+    if "://" not in url:
+        url = f"//{url}"
+
+    parts = urlsplit(url)
+
+    segments = [parts.hostname or ""]
+    segments.extend(
+        segment for segment in unquote(parts.path).split("/") if segment)
+
+    return segments
+
+
+def has_dot_segments(segments):
+    """ Returns True if any path segment is "." or "..". """
+
+    return not DOT_SEGMENTS.isdisjoint(segments[1:])
+
+
+class _Node:
+
+    __slots__ = ("children", "value")
+
+    def __init__(self):
+
+        self.children = {}
+        self.value = None
+
+
+class PathTrie:
+    """ Maps sequences of path segments to values, supporting longest prefix
+    lookups in time proportional to the depth of the path.
+    """
+
+    def __init__(self):
+
+        self._root = _Node()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def setdefault(self, segments, default):
+        """ Returns the value stored for a prefix, storing `default` first if
+        there is none.
+        """
+
+        node = self._root
+        for segment in segments:
+
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _Node()
+
+            node = child
+
+        if node.value is None:
+            node.value = default
+            self._size += 1
+
+        return node.value
+
+    def longest_match(self, segments):
+        """ Returns the value stored for the longest prefix of `segments`, or
+        None if no prefix has a value.
+        """
+
+        node = self._root
+        match = node.value
+        for segment in segments:
+
+            node = node.children.get(segment)
+            if node is None:
+                break
+
+            if node.value is not None:
+                match = node.value
+
+        return match
@@ -0,0 +1,149 @@
+""" Compiled rules for exempting requests from authorization. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import logging
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import NoReverseMatch, get_resolver
+
+from authenticate.utils import reverse_path_info
+
+
+LOG = logging.getLogger(__name__)
+
+RULE_KEYS = ("path", "prefix", "regex")
+
+
+class _RuleGroup:
+    """ Exemption rules sharing the same set of methods. """
+
+    __slots__ = ("paths", "prefixes", "regexes")
+
+    def __init__(self):
+
+        self.paths = set()
+        self.prefixes = []
+        self.regexes = []
+
+    def compile(self):
+
+        self.paths = frozenset(self.paths)
+        self.prefixes = tuple(sorted(set(self.prefixes)))
+
+        try:
+            # A single alternation is cheaper than trying each regex in turn
+            self.regexes = (re.compile("|".join(
+                f"(?:{regex})" for regex in self.regexes)),) \
+                if self.regexes else ()
+
+        except re.error:
+            # Regexes may not combine, e.g. if they share group names
+            self.regexes = tuple(re.compile(regex) for regex in self.regexes)
+
+        return self
+
+    def matches(self, path):
+
+        return (
+            path in self.paths
+            or (self.prefixes and path.startswith(self.prefixes))
+            or any(regex.match(path) for regex in self.regexes)
+        )
+
+
+class ExemptionMatcher:
+    """ Matches requests against exemption rules compiled ahead of time.
+
+    Each rule is a dict with one of the keys:
+
+    * `path`: an exact request path, e.g. "/health/"
+    * `prefix`: a path prefix, e.g. "/static/"
+    * `regex`: a regular expression matched from the start of the path
+
+    and optionally `methods`, a list of the HTTP methods the rule applies to.
+    A rule with only `methods` exempts every request with those methods.
+    """
+
+    def __init__(self, rules=()):
+
+        groups = {}
+        for rule in rules:
+
+            keys = [key for key in RULE_KEYS if key in rule]
+            if len(keys) > 1 or not (keys or "methods" in rule):
+                raise ImproperlyConfigured(
+                    f"Exemption rule {rule} needs one of {RULE_KEYS}")
+
+            methods = rule.get("methods")
+            if methods is not None:
+                methods = frozenset(method.upper() for method in methods)
+
+            group = groups.setdefault(methods, _RuleGroup())
+            if not keys:
+                group.prefixes.append("/")
+
+            elif keys[0] == "path":
+                group.paths.add(rule["path"])
+
+            elif keys[0] == "prefix":
+                group.prefixes.append(rule["prefix"])
+
+            else:
+                try:
+                    re.compile(rule["regex"])
+                except re.error as e:
+                    raise ImproperlyConfigured(
+                        f"Invalid exemption regex {rule['regex']!r}: {e}")
+
+                group.regexes.append(rule["regex"])
+
+        # Rules for any method are checked first
+        self._groups = sorted(
+            ((methods, group.compile()) for methods, group in groups.items()),
+            key=lambda item: item[0] is not None)
+
+    def matches(self, method, path):
+        """ Returns True if a request with the given method and path is
+        exempt.
+        """
+
+        for methods, group in self._groups:
+            if (methods is None or method in methods) and group.matches(path):
+                return True
+
+        return False
+
+
+def url_name_rules(url_names, urlconf=None):
+    """ Converts URL names into exemption rules for their paths, so that
+    requests can be matched without resolving their URLs.
+    """
+
+    rules = []
+    resolver = None
+
+    for name in url_names:
+
+        try:
+            rules.append({"path": reverse_path_info(name, urlconf=urlconf)})
+            continue
+
+        except NoReverseMatch:
+            pass
+
+        # Fall back to the regex of a pattern which takes arguments
+        resolver = resolver or get_resolver(urlconf)
+        possibilities = resolver.reverse_dict.getlist(name)
+        if not possibilities:
+            LOG.warning(f"Exempt URL name {name} does not match any URL")
+
+        for _, pattern, _, _ in possibilities:
+            rules.append({"regex": f"/{pattern}"})
+
+    return rules
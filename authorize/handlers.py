@@ -0,0 +1,199 @@
+""" Lightweight WSGI and ASGI handlers for the verify endpoint.
+
+Each nginx `auth_request` subrequest only needs the session, the
+authentication and authorization middleware and the verify view. These
+handlers serve the verify endpoint with only that middleware, without
+resolving its URL, and pass every other request on to the full Django
+application.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import logging
+
+import django
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.asgi import get_asgi_application
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.wsgi import get_wsgi_application
+from django.urls import ResolverMatch
+from django.utils.module_loading import import_string
+
+from authenticate.middleware import AuthenticationMiddleware, \
+    ServerTimingMiddleware
+from authenticate.utils import reverse_path_info
+from authorize.middleware import AuthorizationMiddleware
+from authorize.views import VerifyView
+
+
+LOG = logging.getLogger(__name__)
+
+VERIFY_MIDDLEWARE_BASES = (
+    ServerTimingMiddleware,
+    SessionMiddleware,
+    AuthenticationMiddleware,
+    AuthorizationMiddleware,
+)
+
+
+def get_verify_middleware():
+    """ Returns the middleware run for verify requests: the
+    `VERIFY_MIDDLEWARE` setting if given, otherwise the timing, session,
+    authentication and authorization middleware from `MIDDLEWARE`.
+    """
+
+    verify_middleware = getattr(settings, "VERIFY_MIDDLEWARE", None)
+    if verify_middleware is not None:
+        return list(verify_middleware)
+
+    return [
+        path for path in settings.MIDDLEWARE
+        if issubclass(import_string(path), VERIFY_MIDDLEWARE_BASES)
+    ]
+
+
+class VerifyHandlerMixin:
+    """ Django request handler which serves only the verify view, through
+    the middleware given by `get_verify_middleware`.
+    """
+
+    def load_middleware(self, is_async=False):
+        """ Builds the middleware chain as Django's BaseHandler does, from
+        the verify middleware rather than `MIDDLEWARE`.
+        """
+
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        self._verify_match = ResolverMatch(VerifyView.as_view(), (), {},
+            url_name="verify")
+
+        get_response = self._get_response_async if is_async \
+            else self._get_response
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = is_async
+
+        for middleware_path in reversed(get_verify_middleware()):
+
+            middleware = import_string(middleware_path)
+            middleware_is_async = getattr(middleware, "async_capable", False)
+            if not handler_is_async and \
+                    getattr(middleware, "sync_capable", True):
+                middleware_is_async = False
+
+            try:
+                adapted_handler = self.adapt_method_mode(
+                    middleware_is_async, handler, handler_is_async,
+                    debug=settings.DEBUG, name=f"middleware {middleware_path}",
+                )
+                mw_instance = middleware(adapted_handler)
+
+            except MiddlewareNotUsed:
+                continue
+
+            if mw_instance is None:
+                raise ImproperlyConfigured(
+                    f"Middleware factory {middleware_path} returned None.")
+
+            if hasattr(mw_instance, "process_view"):
+                self._view_middleware.insert(0,
+                    self.adapt_method_mode(is_async, mw_instance.process_view))
+
+            if hasattr(mw_instance, "process_exception"):
+                self._exception_middleware.append(
+                    self.adapt_method_mode(False,
+                        mw_instance.process_exception))
+
+            handler = convert_exception_to_response(mw_instance)
+            handler_is_async = middleware_is_async
+
+        LOG.debug(f"Verify middleware: {get_verify_middleware()}")
+
+        self._middleware_chain = self.adapt_method_mode(is_async, handler,
+            handler_is_async)
+
+    def resolve_request(self, request):
+
+        request.resolver_match = self._verify_match
+        return self._verify_match
+
+
+class VerifyWSGIHandler(VerifyHandlerMixin, WSGIHandler):
+    pass
+
+
+class VerifyASGIHandler(VerifyHandlerMixin, ASGIHandler):
+    pass
+
+
+class VerifyWSGIApplication:
+    """ WSGI application which serves the verify endpoint with a
+    VerifyWSGIHandler and everything else with the full application.
+    """
+
+    def __init__(self, application=None):
+
+        self.application = application or get_wsgi_application()
+        self.verify_handler = VerifyWSGIHandler()
+        self.verify_path = reverse_path_info("verify")
+
+    def __call__(self, environ, start_response):
+
+        if environ.get("PATH_INFO") == self.verify_path:
+            return self.verify_handler(environ, start_response)
+
+        return self.application(environ, start_response)
+
+
+class VerifyASGIApplication:
+    """ ASGI application which serves the verify endpoint with a
+    VerifyASGIHandler and everything else with the full application.
+    """
+
+    def __init__(self, application=None):
+
+        self.application = application or get_asgi_application()
+        self.verify_handler = VerifyASGIHandler()
+        self.verify_path = reverse_path_info("verify")
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] == "http":
+
+            path = scope["path"]
+            root_path = scope.get("root_path", "")
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+
+            if path == self.verify_path:
+                return await self.verify_handler(scope, receive, send)
+
+        return await self.application(scope, receive, send)
+
+
+def get_verify_wsgi_application():
+    """ Returns a WSGI application with a fast path for verify requests, in
+    place of Django's `get_wsgi_application`.
+    """
+
+    django.setup(set_prefix=False)
+    return VerifyWSGIApplication()
+
+
+def get_verify_asgi_application():
+    """ Returns an ASGI application with a fast path for verify requests, in
+    place of Django's `get_asgi_application`.
+    """
+
+    django.setup(set_prefix=False)
+    return VerifyASGIApplication()
@@ -6,60 +6,296 @@ __copyright__ = "Copyright 2020 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 
 
+import asyncio
 import logging
+import time
 
-from django.conf import settings
+from asgiref.sync import sync_to_async
 from django.http import HttpResponse
-from django.urls import resolve
+from django.utils.cache import patch_vary_headers
 
-from authenticate.utils import is_authenticated, get_requested_resource
+from authenticate import tracing
+from authenticate.cache import get_tiered_cache
+from authenticate.config import get_config
+from authenticate.metrics import AUTHORIZATION_DURATION, REGISTRY, \
+    VERIFY_RESPONSES, get_metrics_dir
+from authenticate.utils import is_authenticated, get_requested_resource, \
+    get_user, get_auth_expiry
+from .exemptions import ExemptionMatcher, url_name_rules
 
 
 LOG = logging.getLogger(__name__)
 
+# Request attribute holding the outermost authorization middleware handling
+# the request, which alone counts its response in metrics
+OUTERMOST_ATTRIBUTE = "_auth_outermost_authorizer"
+
 
 class AuthorizationMiddleware:
-    """ Middleware for handling authorization of requests. """
+    """ Middleware for handling authorization of requests.
+
+    Runs natively under ASGI: if the next handler is async, decisions are
+    awaited via `_ais_authorized`, which subclasses making outbound calls
+    override to avoid blocking the event loop.
+    """
+
+    EXEMPT_URLS = ["home", "login", "callback", "metrics"]
+
+    CACHE_KIND = "authorization"
 
-    EXEMPT_URLS = ["home", "login", "callback"]
+    # Label of the authorizer in metrics, defaulting to the class name
+    METRICS_LABEL = None
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
 
+        self._metrics_label = self.METRICS_LABEL or type(self).__name__
+        self._trace_stage = f"authz-{self._metrics_label}"
+
+        # Exempt URL names are turned into paths once, rather than
+        # resolving the URL of every request
+        self._exemptions = ExemptionMatcher(
+            url_name_rules(self.EXEMPT_URLS) +
+            list(get_config().authorization_exempt_rules)
+        )
+
+        if asyncio.iscoroutinefunction(get_response):
+            # Tells Django that this instance should be awaited
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
     def __call__(self, request):
 
-        exempt = False
-        url_name = resolve(request.path_info).url_name
-        if url_name in self.EXEMPT_URLS:
-            exempt = True
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
 
-        elif hasattr(settings, "AUTHORIZATION_EXEMPT_FILTER"):
-            exempt = settings.AUTHORIZATION_EXEMPT_FILTER(request)
+        if self._is_exempt(request):
+            return self.get_response(request)
 
-        if not exempt:
+        if not hasattr(request, OUTERMOST_ATTRIBUTE):
+            setattr(request, OUTERMOST_ATTRIBUTE, self)
 
-            # Get the requested resource and save it
-            resource = get_requested_resource(request)
+        # Get the requested resource and save it
+        resource = get_requested_resource(request)
 
-            if not self._is_authorized(request, resource):
-                if is_authenticated(request):
-                    # Logged in but cannot access the resource
-                    return HttpResponse("Unauthorized", status=403)
-                else:
-                    # Cannot access the resource but not logged in yet
-                    return HttpResponse("Unauthenticated", status=401)
+        is_authorized = self._cached_is_authorized(request, resource)
+        if not is_authorized:
+            return self._finish_response(request,
+                self._denied_response(request), False)
 
-            LOG.debug("Request authorised")
+        LOG.debug("Request authorised")
 
         response = self.get_response(request)
+        return self._finish_response(request, response, True)
+
+    async def __acall__(self, request):
+
+        if self._is_exempt(request):
+            return await self.get_response(request)
+
+        if not hasattr(request, OUTERMOST_ATTRIBUTE):
+            setattr(request, OUTERMOST_ATTRIBUTE, self)
+
+        resource = get_requested_resource(request)
+
+        is_authorized = await self._acached_is_authorized(request, resource)
+        if not is_authorized:
+            return self._finish_response(request,
+                self._denied_response(request), False)
+
+        LOG.debug("Request authorised")
+
+        response = await self.get_response(request)
+        return self._finish_response(request, response, True)
+
+    def _is_exempt(self, request):
+        """ Returns True if a request doesn't need to be authorized. """
+
+        if self._exemptions.matches(request.method, request.path_info):
+            return True
+
+        exempt_filter = get_config().authorization_exempt_filter
+        if exempt_filter is not None:
+            return exempt_filter(request)
+
+        return False
+
+    def _denied_response(self, request):
+        """ Returns the response for a request which isn't authorized. """
+
+        if is_authenticated(request):
+            # Logged in but cannot access the resource
+            return HttpResponse("Unauthorized", status=403)
+        else:
+            # Cannot access the resource but not logged in yet
+            return HttpResponse("Unauthenticated", status=401)
+
+    def _decision_ttl(self, request, is_authorized):
+        """ Returns the number of seconds for which a decision may be reused,
+        or None if the authorizer doesn't limit it.
+        """
+
+        cache = None
+        if self.CACHE_KIND:
+            cache = get_tiered_cache(self.CACHE_KIND)
+
+        if cache:
+            return cache.ttl_for("allow" if is_authorized else "deny")
+
+    def _finish_response(self, request, response, is_authorized):
+        """ Records the outcome of an authorized or denied request and adds
+        caching headers to its response. The outcome is only counted by the
+        outermost authorization middleware, so that chained authorizers count
+        each response once.
+        """
+
+        if getattr(request, OUTERMOST_ATTRIBUTE, None) is self:
+            VERIFY_RESPONSES.inc(str(response.status_code))
+            REGISTRY.maybe_flush(get_metrics_dir())
+
+        return self._add_cache_headers(request, response, is_authorized)
+
+    def _add_cache_headers(self, request, response, is_authorized):
+        """ Adds headers telling nginx how long it may cache a response to
+        an `auth_request` subrequest, if enabled by `VERIFY_RESPONSE_CACHE`.
+
+        The lifetime is limited by the expiry of the credentials presented
+        and by the authorizer's own decision lifetime. Responses which set
+        cookies, or which can't safely be reused, are marked uncacheable.
+        """
+
+        config = get_config()
+        if is_authorized:
+            ttl = config.verify_cache_allow_ttl
+        else:
+            ttl = config.verify_cache_deny_ttl
+
+        if not ttl:
+            return response
+
+        decision_ttl = self._decision_ttl(request, is_authorized)
+        if decision_ttl is not None:
+            ttl = min(ttl, decision_ttl)
+
+        expires_at = get_auth_expiry(request)
+        if expires_at:
+            ttl = min(ttl, int(expires_at - time.time()))
+
+        session = getattr(request, "session", None)
+        if response.cookies or getattr(session, "modified", False) or \
+                (is_authorized and response.status_code != 200):
+            ttl = 0
+
+        if ttl > 0:
+            response["X-Accel-Expires"] = str(ttl)
+            response["Cache-Control"] = f"private, max-age={ttl}"
+        else:
+            response["X-Accel-Expires"] = "0"
+            response["Cache-Control"] = "no-store"
+
+        patch_vary_headers(response, config.verify_cache_vary)
         return response
 
+    def _get_decision_key(self, request, resource):
+        """ Returns the values which an authorization decision depends on. """
+
+        username = None
+        groups = ()
+
+        user = get_user(request)
+        if user:
+            username = user.username
+            groups = tuple(sorted(user.groups))
+
+        return (type(self).__name__, request.method, resource, username, groups)
+
+    def _get_cached_decision(self, request, resource):
+        """ Looks up a cached decision for a request. Returns the cache, the
+        key and the cached decision, any of which may be None.
+        """
+
+        cache = None
+        if self.CACHE_KIND:
+            cache = get_tiered_cache(self.CACHE_KIND)
+
+        if cache is None:
+            return None, None, None
+
+        key = cache.make_key(*self._get_decision_key(request, resource))
+        return cache, key, cache.get(key)
+
+    def _set_cached_decision(self, cache, key, is_authorized):
+        """ Stores a decision with the lifetime for its outcome. """
+
+        if cache:
+            decision = "allow" if is_authorized else "deny"
+            cache.set(key, is_authorized, ttl=cache.ttl_for(decision))
+
+    def _cached_is_authorized(self, request, resource):
+        """ Checks authorization for a request, reusing recent decisions. """
+
+        with AUTHORIZATION_DURATION.time(self._metrics_label), \
+                tracing.stage(self._trace_stage):
+
+            cache, key, is_authorized = self._get_cached_decision(request,
+                resource)
+            if is_authorized is None:
+
+                is_authorized = self._is_authorized(request, resource)
+                self._set_cached_decision(cache, key, is_authorized)
+
+        return is_authorized
+
+    async def _acached_is_authorized(self, request, resource):
+        """ Async version of `_cached_is_authorized`. """
+
+        with AUTHORIZATION_DURATION.time(self._metrics_label), \
+                tracing.stage(self._trace_stage):
+
+            cache, key, is_authorized = self._get_cached_decision(request,
+                resource)
+            if is_authorized is None:
+
+                is_authorized = await self._ais_authorized(request, resource)
+                self._set_cached_decision(cache, key, is_authorized)
+
+        return is_authorized
+
+    def flush_decision_cache(self):
+        """ Invalidates cached decisions made by this kind of middleware. """
+
+        cache = None
+        if self.CACHE_KIND:
+            cache = get_tiered_cache(self.CACHE_KIND)
+
+        if cache:
+            LOG.info(f"Flushing {self.CACHE_KIND} decision cache")
+            cache.clear()
+
     def _is_authorized(self, request, resource):
         raise NotImplementedError()
 
+    async def _ais_authorized(self, request, resource):
+        """ Async version of `_is_authorized`, which runs it in a worker
+        thread unless overridden.
+        """
+
+        return await sync_to_async(self._is_authorized,
+            thread_sensitive=False)(request, resource)
+
 
 class LoginAuthorizationMiddleware(AuthorizationMiddleware):
     """ Simple middleware that authorizes any authenticated user. """
 
+    # Decisions are cheap to make and depend only on the session
+    CACHE_KIND = None
+
+    METRICS_LABEL = "login"
+
     def _is_authorized(self, request, resource):
         return is_authenticated(request)
+
+    async def _ais_authorized(self, request, resource):
+        return self._is_authorized(request, resource)
@@ -0,0 +1,102 @@
+""" OPA REST API client. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import logging
+
+import httpx
+import requests
+
+from authenticate import transport
+from authenticate.metrics import track_upstream
+from .exceptions import OPAAuthorizationError
+
+
+LOG = logging.getLogger(__name__)
+
+
+class OPAClient:
+    """ Queries an OPA server's data API over the shared outbound transport.
+
+    Accepts the same connection options as the `OPA_SERVER` setting.
+    """
+
+    def __init__(self, host="localhost", port=8181, version="v1", ssl=False,
+            cert=None, headers=None, **kwargs):
+
+        host = host.strip()
+        if not host.startswith(("http://", "https://")):
+            scheme = "https://" if ssl else "http://"
+            host = f"{scheme}{host}"
+
+        self.root_url = f"{host}:{port}/{version}"
+        self._headers = headers or {}
+
+        # A certificate bundle is used to verify the server when using SSL
+        self._verify = cert if ssl and cert else True
+
+    def _rule_url(self, package_path, rule_name=None):
+        """ Returns the data API URL of a package or rule. """
+
+        path = package_path.replace(".", "/")
+        if rule_name:
+            path = f"{path}/{rule_name}"
+
+        return f"{self.root_url}/data/{path}"
+
+    def check_policy_rule(self, input_data, package_path, rule_name=None,
+            provenance=False):
+        """ Evaluates a policy rule for some input and returns the decoded
+        OPA response. If `provenance` is set, the response includes the
+        revisions of the policy bundles in use.
+        """
+
+        url = self._rule_url(package_path, rule_name)
+        try:
+            with track_upstream("opa"):
+                response = transport.request(
+                    "POST",
+                    url,
+                    json={"input": input_data},
+                    params={"provenance": "true"} if provenance else None,
+                    headers=self._headers,
+                    verify=self._verify
+                )
+                response.raise_for_status()
+
+            return response.json()
+
+        except (requests.RequestException, ValueError) as e:
+
+            LOG.error(f"OPA query error for {url}: {e}")
+            raise OPAAuthorizationError(
+                "Error when querying the OPA server.") from e
+
+    async def acheck_policy_rule(self, input_data, package_path,
+            rule_name=None, provenance=False):
+        """ Async version of `check_policy_rule`. """
+
+        url = self._rule_url(package_path, rule_name)
+        try:
+            with track_upstream("opa"):
+                response = await transport.arequest(
+                    "POST",
+                    url,
+                    json={"input": input_data},
+                    params={"provenance": "true"} if provenance else None,
+                    headers=self._headers,
+                    verify=self._verify
+                )
+                response.raise_for_status()
+
+            return response.json()
+
+        except (httpx.HTTPError, ValueError) as e:
+
+            LOG.error(f"OPA query error for {url}: {e}")
+            raise OPAAuthorizationError(
+                "Error when querying the OPA server.") from e
@@ -9,28 +9,188 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 import logging
 
 from django.conf import settings
-from opa_client.opa import OpaClient
 
 from authorize.middleware import AuthorizationMiddleware
+from authenticate.cache import TTLCache
+from authenticate.circuitbreaker import CircuitOpenError, \
+    get_circuit_breaker
+from authenticate.singleflight import AsyncSingleFlight, SingleFlight
 from authenticate.utils import get_user
+from .client import OPAClient
 from .exceptions import OPAAuthorizationError
+from .prefetch import PrefixIndex
 
 
 LOG = logging.getLogger(__name__)
 
+DEFAULT_PREFETCH_TTL = 300
+DEFAULT_PREFETCH_SIZE = 1024
+
 
 class OPAAuthorizationMiddleware(AuthorizationMiddleware):
     """ Middleware for handling authorization via an OPA server. """
 
+    # Decisions are cached by user, groups, resource and action
+    CACHE_KIND = "opa"
+
+    METRICS_LABEL = "opa"
+
     def __init__(self, *args):
         super().__init__(*args)
 
         opa_settings = getattr(settings, "OPA_SERVER", {})
-        self._client = OpaClient(**opa_settings)
+        self._client = OPAClient(**opa_settings)
         self._package_path = opa_settings.get("package_path")
         self._rule_name = opa_settings.get("rule_name")
 
-    def _is_authorized(self, request, resource):
+        self._flights = SingleFlight()
+        self._async_flights = AsyncSingleFlight()
+        self._breaker = get_circuit_breaker(self._client.root_url,
+            failure_exceptions=(OPAAuthorizationError,))
+
+        # Optional rule returning the resource prefixes a subject may access
+        self._prefetch_rule = opa_settings.get("prefetch_rule")
+        self._prefix_indexes = TTLCache(
+            maxsize=opa_settings.get("prefetch_size", DEFAULT_PREFETCH_SIZE),
+            ttl=opa_settings.get("prefetch_ttl", DEFAULT_PREFETCH_TTL),
+        )
+
+        # Bundle revisions reported by OPA, used to detect policy changes
+        self._policy_revisions = None
+
+    def _check_policy_revisions(self, permission):
+        """ Flushes cached decisions if OPA reports a change in the revisions
+        of its policy bundles.
+        """
+
+        provenance = permission.get("provenance", {})
+        revisions = {
+            name: bundle.get("revision")
+            for name, bundle in provenance.get("bundles", {}).items()
+        }
+
+        if revisions != self._policy_revisions:
+
+            if self._policy_revisions is not None:
+                LOG.info(f"OPA policy revisions changed to: {revisions}")
+                self.flush_decision_cache()
+                self._prefix_indexes.clear()
+
+            self._policy_revisions = revisions
+
+    def _prefetch_query(self, subject):
+        """ Returns the arguments of a query for all of the resource prefixes
+        a subject is allowed or denied access to.
+        """
+
+        return {
+            "input_data": {"subject": subject},
+            "package_path": self._package_path,
+            "rule_name": self._prefetch_rule,
+            "provenance": True,
+        }
+
+    def _build_prefix_index(self, subject, permission):
+        """ Builds a prefix index from the result of a prefetch query. """
+
+        self._check_policy_revisions(permission)
+
+        prefix_index = PrefixIndex.from_result(permission.get("result"))
+        LOG.debug(f"Prefetched {len(prefix_index)} prefixes for {subject}")
+
+        return prefix_index
+
+    def _prefetch(self, subject):
+        """ Queries OPA for all of the resource prefixes a subject is allowed
+        or denied access to.
+        """
+
+        permission = self._client.check_policy_rule(
+            **self._prefetch_query(subject))
+        return self._build_prefix_index(subject, permission)
+
+    async def _aprefetch(self, subject):
+        """ Async version of `_prefetch`. """
+
+        permission = await self._client.acheck_policy_rule(
+            **self._prefetch_query(subject))
+        return self._build_prefix_index(subject, permission)
+
+    def _get_prefix_index(self, subject_key, subject):
+        """ Returns the prefetched prefix index for a subject, fetching it if
+        it is missing or has expired.
+        """
+
+        prefix_index = self._prefix_indexes.get(subject_key)
+        if prefix_index is None:
+
+            key = ("prefetch",) + subject_key
+            try:
+                prefix_index = self._flights.do(key,
+                    self._breaker.call, key, self._prefetch, subject)
+
+            except (OPAAuthorizationError, CircuitOpenError):
+
+                LOG.warning(f"Failed to prefetch permissions for {subject}")
+                return None
+
+            self._prefix_indexes.set(subject_key, prefix_index)
+
+        return prefix_index
+
+    async def _aget_prefix_index(self, subject_key, subject):
+        """ Async version of `_get_prefix_index`. """
+
+        prefix_index = self._prefix_indexes.get(subject_key)
+        if prefix_index is None:
+
+            key = ("prefetch",) + subject_key
+            try:
+                prefix_index = await self._async_flights.do(key,
+                    self._breaker.acall, key, self._aprefetch, subject)
+
+            except (OPAAuthorizationError, CircuitOpenError):
+
+                LOG.warning(f"Failed to prefetch permissions for {subject}")
+                return None
+
+            self._prefix_indexes.set(subject_key, prefix_index)
+
+        return prefix_index
+
+    def _decision_query(self, check_data):
+        """ Returns the arguments of a query for an authorization decision.
+        """
+
+        return {
+            "input_data": check_data,
+            "package_path": self._package_path,
+            "rule_name": self._rule_name,
+            "provenance": True,
+        }
+
+    def _query_decision(self, check_data):
+        """ Queries OPA for an authorization decision. """
+
+        permission = self._client.check_policy_rule(
+            **self._decision_query(check_data))
+        self._check_policy_revisions(permission)
+
+        return permission.get("result", False)
+
+    async def _aquery_decision(self, check_data):
+        """ Async version of `_query_decision`. """
+
+        permission = await self._client.acheck_policy_rule(
+            **self._decision_query(check_data))
+        self._check_policy_revisions(permission)
+
+        return permission.get("result", False)
+
+    def _get_subject(self, request):
+        """ Returns the user, action, subject and a hashable key for the
+        subject of a request.
+        """
 
         user = get_user(request)
 
@@ -40,15 +200,45 @@ class OPAAuthorizationMiddleware(AuthorizationMiddleware):
         }
         action = action_map[request.method]
 
-        LOG.debug(f"Querying OPA authz server for resource: {resource}")
-
         subject = None
+        subject_key = (None, ())
         if user:
+            groups = sorted(user.groups)
+            subject_key = (user.username, tuple(groups))
             subject = {
                 "user": user.username,
-                "groups": user.groups
+                "groups": groups
             }
 
+        return user, action, subject, subject_key
+
+    def _query_failed(self, user, error):
+        """ Logs a failed query and raises an OPAAuthorizationError. """
+
+        username = user.username if user else "anonymous"
+        LOG.info(f"Authorization failed for user: {username}")
+
+        if isinstance(error, CircuitOpenError):
+            raise OPAAuthorizationError(
+                "The OPA server is unavailable.") from error
+        raise error
+
+    def _is_authorized(self, request, resource):
+
+        user, action, subject, subject_key = self._get_subject(request)
+
+        LOG.debug(f"Querying OPA authz server for resource: {resource}")
+
+        # Answer locally if the resource is covered by prefetched prefixes
+        if self._prefetch_rule:
+
+            prefix_index = self._get_prefix_index(subject_key, subject)
+            if prefix_index is not None:
+
+                is_authorized = prefix_index.lookup(resource, action)
+                if is_authorized is not None:
+                    return is_authorized
+
         check_data = {
             "resource": resource,
             "subject": subject,
@@ -58,17 +248,55 @@ class OPAAuthorizationMiddleware(AuthorizationMiddleware):
         # Check authorization for resource
         is_authorized = False
         try:
-            permission = self._client.check_policy_rule(
-                input_data=check_data,
-                package_path=self._package_path,
-                rule_name=self._rule_name
+            # Identical concurrent queries share one OPA request, which is
+            # not sent while the OPA server is failing
+            key = (resource, action) + subject_key
+            is_authorized = self._flights.do(
+                key,
+                self._breaker.call,
+                key,
+                self._query_decision,
+                check_data
             )
-            is_authorized = permission.get("result", False)
 
-        except OPAAuthorizationError as e:
+        except (OPAAuthorizationError, CircuitOpenError) as e:
+            self._query_failed(user, e)
+
+        return is_authorized
+
+    async def _ais_authorized(self, request, resource):
+
+        user, action, subject, subject_key = self._get_subject(request)
+
+        LOG.debug(f"Querying OPA authz server for resource: {resource}")
+
+        if self._prefetch_rule:
+
+            prefix_index = await self._aget_prefix_index(subject_key, subject)
+            if prefix_index is not None:
+
+                is_authorized = prefix_index.lookup(resource, action)
+                if is_authorized is not None:
+                    return is_authorized
+
+        check_data = {
+            "resource": resource,
+            "subject": subject,
+            "action": action
+        }
+
+        is_authorized = False
+        try:
+            key = (resource, action) + subject_key
+            is_authorized = await self._async_flights.do(
+                key,
+                self._breaker.acall,
+                key,
+                self._aquery_decision,
+                check_data
+            )
 
-            username = user.username if user else "anonymous"
-            LOG.info(f"Authorization failed for user: {username}")
-            raise e
+        except (OPAAuthorizationError, CircuitOpenError) as e:
+            self._query_failed(user, e)
 
         return is_authorized
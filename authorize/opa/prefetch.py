@@ -0,0 +1,110 @@
+""" Local index of OPA decisions prefetched for a subject. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+from urllib.parse import unquote, urlsplit
+
+
+ANY_ACTION = "*"
+DOT_SEGMENTS = frozenset((".", ".."))
+
+
+def _resource_key(resource):
+    """ Returns a normalized key for a resource URL: its lower-cased scheme,
+    host and port, followed by its percent-decoded, non-empty path segments.
+    The query and fragment are ignored. Returns None for resources with "."
+    or ".." path segments, which the server may resolve outside a prefix.
+    """
+
+    parts = urlsplit(resource)
+    segments = [segment for segment in unquote(parts.path).split("/")
+        if segment]
+
+    if not DOT_SEGMENTS.isdisjoint(segments):
+        return None
+
+    return (parts.scheme.lower(), parts.hostname or "", parts.port,
+        *segments)
+
+
+def _candidate_prefixes(key):
+    """ Yields the prefixes of a resource key at each path segment boundary,
+    longest first.
+    """
+
+    for length in range(len(key), 2, -1):
+        yield key[:length]
+
+
+class PrefixIndex:
+    """ Answers authorization queries for one subject from a set of allowed
+    and denied resource prefixes.
+
+    Built from the result of an OPA prefetch rule, which is expected to have
+    the form:
+
+        {
+            "allow": [{"prefix": "https://host/data/", "actions": ["Read"]}],
+            "deny": [{"prefix": "https://host/data/private/", "actions": ["*"]}]
+        }
+
+    Prefixes and resources are compared after percent-decoding their paths,
+    lower-casing their scheme and host and dropping empty path segments, so
+    that a prefix matches a resource at a path segment boundary however the
+    URL is encoded. The longest matching prefix with an entry for the action
+    decides; a deny entry overrides an allow entry for the same prefix.
+    Resources with "." or ".." path segments are never answered from the
+    index.
+    """
+
+    def __init__(self, allow=(), deny=()):
+
+        self._prefixes = {}
+        for is_allowed, entries in ((True, allow), (False, deny)):
+            for entry in entries:
+
+                prefix = _resource_key(entry["prefix"])
+                if prefix is None:
+                    continue
+
+                actions = self._prefixes.setdefault(prefix, {})
+                for action in entry.get("actions", [ANY_ACTION]):
+                    actions[action] = actions.get(action, True) and is_allowed
+
+    @classmethod
+    def from_result(cls, result):
+        """ Builds an index from a prefetch rule result. """
+
+        result = result or {}
+        return cls(allow=result.get("allow", []), deny=result.get("deny", []))
+
+    def __len__(self):
+        return len(self._prefixes)
+
+    def lookup(self, resource, action):
+        """ Returns True or False if the index covers a resource and action,
+        or None if OPA has to be queried.
+        """
+
+        if not resource:
+            return None
+
+        key = _resource_key(resource)
+        if key is None:
+            return None
+
+        for prefix in _candidate_prefixes(key):
+
+            actions = self._prefixes.get(prefix)
+            if actions is None:
+                continue
+
+            decisions = {actions.get(action), actions.get(ANY_ACTION)}
+            if False in decisions:
+                return False
+            if True in decisions:
+                return True
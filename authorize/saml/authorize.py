@@ -6,34 +6,102 @@ __copyright__ = "Copyright 2020 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 
 
+import io
 import logging
 
+from datetime import datetime
+from uuid import uuid4
+
+from asgiref.sync import sync_to_async
 from ndg.saml.saml2.binding.soap.client.requestbase import RequestResponseError
 from ndg.saml.saml2.binding.soap.client.authzdecisionquery import \
-    AuthzDecisionQuerySslSOAPBinding
-from ndg.saml.saml2.core import AuthzDecisionQuery, DecisionType
+    AuthzDecisionQuerySOAPBinding, AuthzDecisionQuerySslSOAPBinding
+from ndg.saml.saml2.core import Action, AuthzDecisionQuery, DecisionType
+from ndg.soap.client import SOAPClientError
 from OpenSSL.SSL import Error as OpenSSLError
 
-from authorize.saml.query_builder import QueryBuilder
+from authenticate.cache import TieredCache, get_cache_settings
+from authenticate.circuitbreaker import CircuitOpenError, \
+    get_circuit_breaker
+from authenticate.metrics import track_upstream
+from authenticate.singleflight import AsyncSingleFlight, SingleFlight
+from authorize.saml.query_builder import ISSUER, NAMEID_FORMAT, \
+    QueryBuilder
 from authorize.saml.exceptions import SamlAuthorizationError
+from authorize.saml.template import QueryTemplate, parse_decisions
 
 
 LOG = logging.getLogger(__name__)
 
 CLOCK_SKEW_TOLERANCE = 1000
 
+DECISION_CACHE_KIND = "saml_decision"
+DEFAULT_DECISION_CACHE_SIZE = 1024
+# Decisions aren't cached unless lifetimes are given
+DEFAULT_PERMIT_TTL = 0
+DEFAULT_DENY_TTL = 0
+
 
 class SAMLAuthorizer:
-    """ Sends and parses SAML Authorization decision queries. """
+    """ Sends and parses SAML Authorization decision queries.
+
+    PERMIT and DENY decisions are cached for `permit_ttl` and `deny_ttl`
+    seconds respectively, keyed on the user, resource and action.
+    INDETERMINATE decisions are never cached. The decision cache is a
+    TieredCache, so it's shared between processes and flushed along with the
+    other auth caches if AUTH_CACHE gives an alias.
 
-    def __init__(self, service_uri):
+    If a `soap_client` such as a PooledSOAPClient is given, queries are sent
+    with it rather than over a new SSL connection for each query. With
+    `use_templates`, such a client is sent pre-serialized queries and its
+    responses are parsed for decisions only, bypassing the SAML object model.
+    """
+
+    def __init__(self, service_uri, cache_size=DEFAULT_DECISION_CACHE_SIZE,
+            permit_ttl=DEFAULT_PERMIT_TTL, deny_ttl=DEFAULT_DENY_TTL,
+            soap_client=None, use_templates=False):
 
         self.service_uri = service_uri
 
-        client_binding = AuthzDecisionQuerySslSOAPBinding()
+        self._decision_cache = None
+        if max(permit_ttl, deny_ttl) > 0:
+
+            cache_settings = get_cache_settings()
+            self._decision_cache = TieredCache(
+                DECISION_CACHE_KIND,
+                {"allow": permit_ttl, "deny": deny_ttl},
+                cache_size,
+                alias=cache_settings["alias"],
+                version=cache_settings["version"]
+            )
+
+        self._permit_ttl = permit_ttl
+        self._deny_ttl = deny_ttl
+
+        if soap_client:
+
+            # The client handles SSL itself, so the plain binding is used
+            client_binding = AuthzDecisionQuerySOAPBinding()
+            soap_client.httpHeader.update(client_binding.client.httpHeader)
+            soap_client.responseEnvelopeClass = \
+                client_binding.client.responseEnvelopeClass
+            client_binding.client = soap_client
+
+        else:
+            client_binding = AuthzDecisionQuerySslSOAPBinding()
+
         client_binding.clockSkewTolerance = CLOCK_SKEW_TOLERANCE
         self.client_binding = client_binding
 
+        self._query_template = None
+        if soap_client and use_templates:
+            self._query_template = QueryTemplate(ISSUER, NAMEID_FORMAT)
+
+        self._flights = SingleFlight()
+        self._async_flights = AsyncSingleFlight()
+        self._breaker = get_circuit_breaker(service_uri,
+            failure_exceptions=(SamlAuthorizationError,))
+
     def _parse_authorization_response(self, response):
         """ Parse an authorization decision response. """
 
@@ -44,29 +112,181 @@ class SAMLAuthorizer:
 
         return decisions[0]
 
-    def is_authorized(self, resource, user_identifier, groups=None):
-        """ Get an authorization decision for a resource. """
+    def _query_decision_from_template(self, resource, user_identifier,
+            action):
+        """ Sends a pre-serialized authorization decision query and returns
+        the decision.
+        """
 
-        if not resource:
-            return True
+        query_id = str(uuid4())
+        query = self._query_template.render(query_id, datetime.utcnow(),
+            user_identifier, resource, action)
+
+        try:
 
-        query = QueryBuilder.build_query(AuthzDecisionQuery, user_identifier)
+            with track_upstream("saml"):
+                response = self.client_binding.client.post(self.service_uri,
+                    query)
+            return parse_decisions(io.BytesIO(response), query_id)[0]
+
+        except SOAPClientError as e:
+
+            LOG.error(f"SOAP query error for {user_identifier}: {e}")
+            raise SamlAuthorizationError("Error when querying the \
+                authorization service.")
+
+    async def _aquery_decision(self, resource, user_identifier, action):
+        """ Async version of `_query_decision`. Queries are only sent without
+        blocking when using templates, otherwise they are sent from a worker
+        thread.
+        """
+
+        if not self._query_template:
+            return await sync_to_async(self._query_decision,
+                thread_sensitive=False)(resource, user_identifier, action)
+
+        query_id = str(uuid4())
+        query = self._query_template.render(query_id, datetime.utcnow(),
+            user_identifier, resource, action)
+
+        try:
+
+            with track_upstream("saml"):
+                response = await self.client_binding.client.apost(
+                    self.service_uri, query)
+            return parse_decisions(io.BytesIO(response), query_id)[0]
+
+        except SOAPClientError as e:
+
+            LOG.error(f"SOAP query error for {user_identifier}: {e}")
+            raise SamlAuthorizationError("Error when querying the \
+                authorization service.")
+
+    def _query_decision(self, resource, user_identifier, action):
+        """ Sends an authorization decision query and returns the decision.
+        """
+
+        if self._query_template:
+            return self._query_decision_from_template(resource,
+                user_identifier, action)
+
+        query = QueryBuilder.build_query(AuthzDecisionQuery, user_identifier,
+            action)
         query.resource = resource
 
-        decision = None
         try:
 
-            response = self.client_binding.send(query, uri=self.service_uri)
-            decision = self._parse_authorization_response(response)
+            with track_upstream("saml"):
+                response = self.client_binding.send(query,
+                    uri=self.service_uri)
+            return self._parse_authorization_response(response)
 
-        except (RequestResponseError, OpenSSLError) as e:
+        except (RequestResponseError, SOAPClientError, OpenSSLError) as e:
 
             LOG.error(f"SOAP query error for {user_identifier}: {e}")
             raise SamlAuthorizationError("Error when querying the \
                 authorization service.")
 
+    def cache_info(self):
+        """ Returns a dictionary describing the decision cache's usage in
+        this process, or None if decisions aren't cached.
+        """
+
+        if self._decision_cache:
+            return self._decision_cache.stats()
+
+    def clear_cache(self):
+        """ Removes all cached decisions. """
+
+        if self._decision_cache:
+            self._decision_cache.clear()
+
+    def _get_cached_decision(self, key):
+        """ Returns a cached decision for a user, resource and action, or None
+        if there isn't one.
+        """
+
+        if self._decision_cache:
+            return self._decision_cache.get(
+                self._decision_cache.make_key(*key))
+
+    def is_authorized(self, resource, user_identifier, groups=None,
+            action=Action.READ_ACTION):
+        """ Get an authorization decision for a resource. """
+
+        if not resource:
+            return True
+
+        key = (user_identifier, resource, action)
+        is_authorized = self._get_cached_decision(key)
+        if is_authorized is not None:
+            return is_authorized
+
+        # Identical concurrent queries share one SOAP request, which is not
+        # sent while the authorization service is failing
+        try:
+            decision = self._flights.do(
+                key,
+                self._breaker.call,
+                key,
+                self._query_decision,
+                resource,
+                user_identifier,
+                action
+            )
+
+        except CircuitOpenError as e:
+            raise SamlAuthorizationError("The authorization service is "
+                "unavailable.") from e
+
+        return self._cache_decision(key, decision)
+
+    async def ais_authorized(self, resource, user_identifier, groups=None,
+            action=Action.READ_ACTION):
+        """ Async version of `is_authorized`. """
+
+        if not resource:
+            return True
+
+        key = (user_identifier, resource, action)
+        is_authorized = self._get_cached_decision(key)
+        if is_authorized is not None:
+            return is_authorized
+
+        try:
+            decision = await self._async_flights.do(
+                key,
+                self._breaker.acall,
+                key,
+                self._aquery_decision,
+                resource,
+                user_identifier,
+                action
+            )
+
+        except CircuitOpenError as e:
+            raise SamlAuthorizationError("The authorization service is "
+                "unavailable.") from e
+
+        return self._cache_decision(key, decision)
+
+    def decision_ttl(self, is_authorized):
+        """ Returns the number of seconds for which a decision is cached. """
+
+        return self._permit_ttl if is_authorized else self._deny_ttl
+
+    def _cache_decision(self, key, decision):
+        """ Caches a PERMIT or DENY decision and returns whether access is
+        authorized. Raises a SamlAuthorizationError for other decisions.
+        """
+
         if decision == DecisionType.INDETERMINATE:
             raise SamlAuthorizationError("Received indeterminate decision"
                 " from the authorization service.")
 
-        return decision == DecisionType.PERMIT
+        is_authorized = decision == DecisionType.PERMIT
+        if self._decision_cache:
+            self._decision_cache.set(self._decision_cache.make_key(*key),
+                is_authorized, ttl=self.decision_ttl(is_authorized))
+
+        return is_authorized
@@ -12,7 +12,10 @@ from django.conf import settings
 
 from authorize.middleware import AuthorizationMiddleware
 from authorize.saml import SAMLAuthorizer
+from authorize.saml.authorize import DEFAULT_DECISION_CACHE_SIZE, \
+    DEFAULT_DENY_TTL, DEFAULT_PERMIT_TTL
 from authorize.saml.exceptions import SamlAuthorizationError
+from authorize.saml.transport import DEFAULT_SAML_TRANSPORT, PooledSOAPClient
 from authenticate.utils import get_user
 
 
@@ -22,13 +25,33 @@ LOG = logging.getLogger(__name__)
 class SAMLAuthorizationMiddleware(AuthorizationMiddleware):
     """ Middleware for handling authorization via a SAML query. """
 
+    METRICS_LABEL = "saml"
+
     def __init__(self, *args):
         super().__init__(*args)
 
+        transport_settings = DEFAULT_SAML_TRANSPORT.copy()
+        transport_settings.update(getattr(settings, "SAML_TRANSPORT", {}))
+
+        soap_client = None
+        if transport_settings["pooled"]:
+            soap_client = PooledSOAPClient(**transport_settings)
+
         self._saml_authorizer = SAMLAuthorizer(
-            service_uri=settings.AUTHORIZATION_SERVICE_URL
+            service_uri=settings.AUTHORIZATION_SERVICE_URL,
+            cache_size=getattr(settings, "SAML_DECISION_CACHE_SIZE",
+                DEFAULT_DECISION_CACHE_SIZE),
+            permit_ttl=getattr(settings, "SAML_PERMIT_CACHE_TTL",
+                DEFAULT_PERMIT_TTL),
+            deny_ttl=getattr(settings, "SAML_DENY_CACHE_TTL",
+                DEFAULT_DENY_TTL),
+            soap_client=soap_client,
+            use_templates=getattr(settings, "SAML_QUERY_TEMPLATES", False),
         )
 
+    def _decision_ttl(self, request, is_authorized):
+        return self._saml_authorizer.decision_ttl(is_authorized)
+
     def _is_authorized(self, request, resource):
 
         user_identifier = None
@@ -59,3 +82,28 @@ class SAMLAuthorizationMiddleware(AuthorizationMiddleware):
             raise e
 
         return is_authorized
+
+    async def _ais_authorized(self, request, resource):
+
+        user_identifier = None
+        groups = []
+
+        user = get_user(request)
+        if user:
+            user_identifier = user.username
+            groups = user.groups
+
+        LOG.debug(f"Querying authorization for resource: {resource}")
+
+        try:
+            return await self._saml_authorizer.ais_authorized(
+                resource=resource,
+                user_identifier=user_identifier,
+                groups=groups
+            )
+
+        except SamlAuthorizationError as e:
+
+            username = user.username if user else "anonymous"
+            LOG.info(f"Authorization failed for user: {username}")
+            raise e
@@ -22,7 +22,8 @@ class QueryBuilder(object):
     """ Helper class for building SAML queries. """
 
     @staticmethod
-    def build_query(query_class, user_identifier=None):
+    def build_query(query_class, user_identifier=None,
+            action_value=Action.READ_ACTION):
         """ Builds a SAML query. """
 
         query = query_class()
@@ -40,7 +41,7 @@ class QueryBuilder(object):
         query.subject.nameID.format = NAMEID_FORMAT
 
         action = Action()
-        action.value = Action.READ_ACTION
+        action.value = action_value
         query.actions.append(action)
 
         if user_identifier:
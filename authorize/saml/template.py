@@ -0,0 +1,123 @@
+""" Pre-serialized SAML queries and streaming response parsing. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+
+from authorize.saml.exceptions import SamlAuthorizationError
+
+
+SOAP_ENVELOPE_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+SAML_PROTOCOL_NS = "urn:oasis:names:tc:SAML:2.0:protocol"
+SAML_ASSERTION_NS = "urn:oasis:names:tc:SAML:2.0:assertion"
+
+X509_SUBJECT_FORMAT = \
+    "urn:oasis:names:tc:SAML:1.1:nameid-format:X509SubjectName"
+ACTION_NAMESPACE = "urn:oasis:names:tc:SAML:1.0:action:rwedc-negation"
+SUCCESS_STATUS = "urn:oasis:names:tc:SAML:2.0:status:Success"
+
+RESPONSE_TAG = f"{{{SAML_PROTOCOL_NS}}}Response"
+STATUS_CODE_TAG = f"{{{SAML_PROTOCOL_NS}}}StatusCode"
+DECISION_STATEMENT_TAG = f"{{{SAML_ASSERTION_NS}}}AuthzDecisionStatement"
+FAULT_TAG = f"{{{SOAP_ENVELOPE_NS}}}Fault"
+
+
+def _format_literal(value):
+    """ Escapes a fixed value for inclusion in a format string. """
+
+    return value.replace("{", "{{").replace("}", "}}")
+
+
+class QueryTemplate:
+    """ SOAP envelope for an AuthzDecisionQuery, serialized once with only
+    the query ID, issue instant, subject, resource and action left to fill
+    in for each query.
+    """
+
+    def __init__(self, issuer, nameid_format):
+
+        issuer = _format_literal(escape(issuer))
+        issuer_format = quoteattr(X509_SUBJECT_FORMAT)
+        nameid_format = _format_literal(quoteattr(nameid_format))
+
+        self._format = (
+            f'<SOAP-ENV:Envelope xmlns:SOAP-ENV="{SOAP_ENVELOPE_NS}">'
+            '<SOAP-ENV:Header/>'
+            '<SOAP-ENV:Body>'
+            f'<samlp:AuthzDecisionQuery xmlns:samlp="{SAML_PROTOCOL_NS}" '
+            f'xmlns:saml="{SAML_ASSERTION_NS}" ID={{query_id}} '
+            'IssueInstant={issue_instant} Version="2.0" Resource={resource}>'
+            f'<saml:Issuer Format={issuer_format}>{issuer}</saml:Issuer>'
+            '<saml:Subject>'
+            f'<saml:NameID Format={nameid_format}>{{subject}}</saml:NameID>'
+            '</saml:Subject>'
+            f'<saml:Action Namespace="{ACTION_NAMESPACE}">{{action}}'
+            '</saml:Action>'
+            '</samlp:AuthzDecisionQuery>'
+            '</SOAP-ENV:Body>'
+            '</SOAP-ENV:Envelope>'
+        )
+
+    def render(self, query_id, issue_instant, subject, resource, action):
+        """ Returns the serialized query envelope as bytes. """
+
+        return self._format.format(
+            query_id=quoteattr(query_id),
+            issue_instant=quoteattr(f"{issue_instant.isoformat()}Z"),
+            subject=escape(subject or ""),
+            resource=quoteattr(resource),
+            action=escape(action),
+        ).encode()
+
+
+def parse_decisions(source, query_id=None):
+    """ Returns the decisions of the AuthzDecisionStatements in a SOAP
+    response, read from a file-like `source` without building the SAML object
+    model. Raises a SamlAuthorizationError if the response is a fault, is not
+    successful or is not a response to `query_id`.
+    """
+
+    in_response_to = None
+    status = None
+    decisions = []
+
+    try:
+        for _, elem in ElementTree.iterparse(source, events=("start",)):
+
+            tag = elem.tag
+            if tag == DECISION_STATEMENT_TAG:
+                decisions.append(elem.get("Decision"))
+
+            elif tag == STATUS_CODE_TAG and status is None:
+                # The first status code is the top-level one
+                status = elem.get("Value")
+
+            elif tag == RESPONSE_TAG:
+                in_response_to = elem.get("InResponseTo")
+
+            elif tag == FAULT_TAG:
+                raise SamlAuthorizationError("Received a SOAP fault from "
+                    "the authorization service.")
+
+    except ElementTree.ParseError as e:
+        raise SamlAuthorizationError(
+            f"Failed to parse authorization response: {e}") from e
+
+    if status != SUCCESS_STATUS:
+        raise SamlAuthorizationError(
+            f"Authorization response status was {status!r}.")
+
+    if query_id is not None and in_response_to != query_id:
+        raise SamlAuthorizationError(f"Authorization response is for query "
+            f"{in_response_to!r}, not {query_id!r}.")
+
+    if not decisions:
+        raise SamlAuthorizationError(
+            "Authorization response contained no decisions.")
+
+    return decisions
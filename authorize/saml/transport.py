@@ -0,0 +1,132 @@
+""" Pooled HTTP transport for SAML SOAP queries. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import io
+import logging
+
+import httpx
+import requests
+
+from ndg.soap.client import HTTPException, SOAPClientError, \
+    SOAPParseError, SOAPResponseError, UrlLib2SOAPClient, UrlLib2SOAPResponse
+
+from authenticate import transport
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_SAML_TRANSPORT = {
+    # Send queries over a pool of keep-alive connections, or set up a new
+    # connection for each query with the ndg-saml pyOpenSSL binding
+    "pooled": False,
+    # Maximum number of keep-alive connections to the authorization service
+    "pool_maxsize": 10,
+    # Seconds to wait for a connection and for response data respectively
+    "connect_timeout": 3.05,
+    "read_timeout": 10,
+    # Verify the service's certificate, or a CA bundle to verify it with
+    "verify": True,
+    # Optional client certificate, or (certificate, key) paths
+    "cert": None,
+}
+
+
+class PooledSOAPClient(UrlLib2SOAPClient):
+    """ SOAP client which sends requests over a pool of keep-alive
+    connections, so that TCP connections and TLS sessions are reused between
+    queries rather than set up for each one.
+
+    Used in place of the client of an ndg-saml SOAP binding.
+    """
+
+    def __init__(self, pool_maxsize=10, connect_timeout=3.05, read_timeout=10,
+            verify=True, cert=None, **kwargs):
+        super().__init__()
+
+        self.session = transport.build_session(pool_connections=1,
+            pool_maxsize=pool_maxsize)
+
+        self._timeouts = (connect_timeout, read_timeout)
+        self._verify = verify
+        self._cert = cert
+
+    def post(self, url, data):
+        """ Posts a serialized SOAP envelope and returns the response body.
+        """
+
+        try:
+            response = self.session.post(
+                url,
+                data=data,
+                headers=dict(self.httpHeader),
+                timeout=self._timeouts,
+                verify=self._verify,
+                cert=self._cert
+            )
+
+        except requests.RequestException as e:
+            raise SOAPClientError(f"Request to [{url}] failed: {e}") from e
+
+        self._check_response(url, response.status_code, response.reason,
+            response.headers)
+        return response.content
+
+    async def apost(self, url, data):
+        """ Async version of `post`, sent over the shared async client. """
+
+        try:
+            response = await transport.arequest(
+                "POST",
+                url,
+                content=data,
+                headers=dict(self.httpHeader),
+                timeout=httpx.Timeout(self._timeouts[1],
+                    connect=self._timeouts[0]),
+                verify=self._verify,
+                cert=self._cert
+            )
+
+        except httpx.HTTPError as e:
+            raise SOAPClientError(f"Request to [{url}] failed: {e}") from e
+
+        self._check_response(url, response.status_code,
+            response.reason_phrase, response.headers)
+        return response.content
+
+    def _check_response(self, url, status_code, reason, headers):
+        """ Raises an exception if a response is not a successful SOAP
+        response.
+        """
+
+        if status_code != requests.codes.ok:
+            raise HTTPException(f"Response for request to [{url}] is: "
+                f"{status_code} {reason}")
+
+        content_type = headers.get("Content-Type", "")
+        if not any(accepted in content_type
+                for accepted in self.RESPONSE_CONTENT_TYPES):
+            raise SOAPResponseError(f"Expecting {self.RESPONSE_CONTENT_TYPES}"
+                f" response type; got {content_type!r} for request to [{url}]")
+
+    def send(self, soapRequest):
+        """ Sends a SOAP request and parses the response envelope. """
+
+        content = self.post(soapRequest.url,
+            soapRequest.envelope.serialize())
+
+        soap_response = UrlLib2SOAPResponse()
+        soap_response.envelope = self.responseEnvelopeClass()
+
+        try:
+            soap_response.envelope.parse(io.BytesIO(content))
+
+        except Exception as e:
+            raise SOAPParseError(f"{type(e)} type error raised parsing "
+                f"response for request to [{soapRequest.url}]: {e}") from e
+
+        return soap_response
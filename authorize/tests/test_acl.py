@@ -0,0 +1,125 @@
+""" Test module for ACL authorization. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import json
+import os
+import tempfile
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authenticate.utils import USER_SESSION_KEY
+from authorize.acl.middleware import ACLAuthorizationMiddleware
+from authorize.acl.rules import AccessControlList
+
+
+RULES = [
+    {"prefix": "data.example.com/badc", "groups": ["badc"]},
+    {"prefix": "data.example.com/badc/restricted", "groups": ["admin"]},
+    {"prefix": "data.example.com/upload", "groups": ["badc"], "methods": ["*"]},
+]
+
+
+class AccessControlListTests(SimpleTestCase):
+
+    def setUp(self):
+        self.acl = AccessControlList(RULES)
+
+    def test_longest_match(self):
+        """ Test that the longest matching prefix decides. """
+
+        self.assertTrue(self.acl.is_authorized(
+            "https://data.example.com/badc/file.nc", "GET", ["badc"]))
+        self.assertFalse(self.acl.is_authorized(
+            "https://data.example.com/badc/restricted/file.nc", "GET",
+            ["badc"]))
+        self.assertTrue(self.acl.is_authorized(
+            "https://data.example.com/badc/restricted/file.nc", "GET",
+            ["admin"]))
+
+    def test_segment_boundary(self):
+        """ Test that prefixes only match whole path segments. """
+
+        self.assertFalse(self.acl.is_authorized(
+            "https://data.example.com/badcfoo/file.nc", "GET", ["badc"]))
+        self.assertFalse(self.acl.is_authorized(
+            "https://other.example.com/badc/file.nc", "GET", ["badc"]))
+
+    def test_dot_segments(self):
+        """ Test that resources with dot segments, which may resolve outside
+        a prefix, are denied.
+        """
+
+        for resource in [
+            "https://data.example.com/badc/../upload/file.nc",
+            "https://data.example.com/badc/%2e%2e/upload/file.nc",
+            "https://data.example.com/badc/%2E%2E%2Fupload/file.nc",
+            "https://data.example.com/badc/./file.nc",
+        ]:
+            self.assertFalse(self.acl.is_authorized(resource, "GET",
+                ["badc"]), resource)
+
+        self.assertTrue(self.acl.is_authorized(
+            "https://data.example.com/badc/file%2Enc", "GET", ["badc"]))
+
+    def test_methods(self):
+        """ Test that rules only apply to their methods. """
+
+        self.assertFalse(self.acl.is_authorized(
+            "https://data.example.com/badc/file.nc", "PUT", ["badc"]))
+        self.assertTrue(self.acl.is_authorized(
+            "https://data.example.com/upload/file.nc", "PUT", ["badc"]))
+
+
+class ACLMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.factory = RequestFactory()
+
+        rules_file = tempfile.NamedTemporaryFile("w", suffix=".json",
+            delete=False)
+        self.addCleanup(os.unlink, rules_file.name)
+
+        with rules_file:
+            json.dump(RULES[:1], rules_file)
+
+        self.rules_file = rules_file.name
+
+    def _is_authorized(self, middleware, resource):
+
+        request = self.factory.get("/verify/")
+        request.session = {
+            USER_SESSION_KEY: {"username": "user", "groups": ["admin"]},
+        }
+
+        return middleware._is_authorized(request, resource)
+
+    def test_reload(self):
+        """ Test that rules are reloaded when the rules file changes, and
+        kept when the new file is invalid.
+        """
+
+        resource = "https://data.example.com/badc/restricted/file.nc"
+
+        with override_settings(ACL_RULES_FILE=self.rules_file,
+                ACL_RELOAD_INTERVAL=-1):
+            middleware = ACLAuthorizationMiddleware(None)
+
+        self.assertFalse(self._is_authorized(middleware, resource))
+
+        with open(self.rules_file, "w") as rules_file:
+            json.dump(RULES, rules_file)
+        os.utime(self.rules_file, (0, 0))
+
+        self.assertTrue(self._is_authorized(middleware, resource))
+
+        with open(self.rules_file, "w") as rules_file:
+            rules_file.write("{")
+        os.utime(self.rules_file, (1, 1))
+
+        self.assertTrue(self._is_authorized(middleware, resource))
@@ -0,0 +1,89 @@
+""" Test module for the verify response caching headers. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import time
+
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authenticate.utils import USER_SESSION_KEY, User, limit_auth_expiry
+from authorize.middleware import LoginAuthorizationMiddleware
+
+
+@override_settings(VERIFY_RESPONSE_CACHE={"allow": 300, "deny": 10})
+class CacheHeaderTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.factory = RequestFactory()
+        self.middleware = LoginAuthorizationMiddleware(
+            lambda request: HttpResponse())
+
+    def _request(self, user=None):
+
+        request = self.factory.get("/verify/",
+            {"next": "http://data.example.com/file.nc"})
+        request.session = SessionStore()
+        if user:
+            request.session[USER_SESSION_KEY] = user._asdict()
+            request.session.modified = False
+
+        return request
+
+    def test_allowed(self):
+        """ Test that allowed responses are cacheable for the allow TTL. """
+
+        response = self.middleware(self._request(User("alice", ["badc"])))
+
+        self.assertEqual(response["X-Accel-Expires"], "300")
+        self.assertEqual(response["Cache-Control"], "private, max-age=300")
+        self.assertEqual(response["Vary"],
+            "Authorization, Cookie, X-Original-Uri")
+
+    def test_denied(self):
+        """ Test that denied responses are cacheable for the deny TTL. """
+
+        response = self.middleware(self._request())
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["X-Accel-Expires"], "10")
+
+    def test_auth_expiry(self):
+        """ Test that responses aren't cached beyond credential expiry. """
+
+        request = self._request(User("alice", ["badc"]))
+        limit_auth_expiry(request, time.time() + 60.5)
+        response = self.middleware(request)
+
+        self.assertEqual(response["X-Accel-Expires"], "60")
+
+        request = self._request(User("alice", ["badc"]))
+        limit_auth_expiry(request, time.time() - 1)
+        response = self.middleware(request)
+
+        self.assertEqual(response["X-Accel-Expires"], "0")
+        self.assertEqual(response["Cache-Control"], "no-store")
+
+    def test_modified_session(self):
+        """ Test that responses which update the session aren't cached. """
+
+        request = self._request(User("alice", ["badc"]))
+        request.session.modified = True
+        response = self.middleware(request)
+
+        self.assertEqual(response["Cache-Control"], "no-store")
+
+    @override_settings(VERIFY_RESPONSE_CACHE={})
+    def test_disabled(self):
+        """ Test that no headers are added unless enabled. """
+
+        response = self.middleware(self._request(User("alice", ["badc"])))
+
+        self.assertNotIn("X-Accel-Expires", response)
+        self.assertNotIn("Cache-Control", response)
@@ -0,0 +1,114 @@
+""" Test module for authorization exemption rules. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import set_script_prefix
+
+from authorize.exemptions import ExemptionMatcher, url_name_rules
+from authorize.middleware import LoginAuthorizationMiddleware
+
+
+class ExemptionMatcherTests(SimpleTestCase):
+
+    def test_rules(self):
+        """ Test matching of exact paths, prefixes and regexes. """
+
+        matcher = ExemptionMatcher([
+            {"path": "/health/"},
+            {"prefix": "/static/"},
+            {"regex": r"/public/\w+\.png$"},
+        ])
+
+        self.assertTrue(matcher.matches("GET", "/health/"))
+        self.assertFalse(matcher.matches("GET", "/health/check/"))
+        self.assertTrue(matcher.matches("GET", "/static/site.css"))
+        self.assertTrue(matcher.matches("GET", "/public/logo.png"))
+        self.assertFalse(matcher.matches("GET", "/public/logo.png.txt"))
+        self.assertFalse(matcher.matches("GET", "/verify/"))
+
+    def test_methods(self):
+        """ Test that rules only apply to their methods. """
+
+        matcher = ExemptionMatcher([
+            {"prefix": "/static/", "methods": ["get", "HEAD"]},
+            {"methods": ["OPTIONS"]},
+        ])
+
+        self.assertTrue(matcher.matches("HEAD", "/static/site.css"))
+        self.assertFalse(matcher.matches("POST", "/static/site.css"))
+        self.assertTrue(matcher.matches("OPTIONS", "/verify/"))
+
+    def test_invalid_rules(self):
+        """ Test that invalid rules are rejected when compiled. """
+
+        for rule in [{}, {"path": "/a", "prefix": "/b"}, {"regex": "("}]:
+            with self.assertRaises(ImproperlyConfigured):
+                ExemptionMatcher([rule])
+
+    def test_url_name_rules(self):
+        """ Test that URL names are converted to their paths. """
+
+        self.assertEqual(url_name_rules(["home", "callback", "unknown"]),
+            [{"path": "/"}, {"path": "/login/callback/"}])
+
+    def test_url_name_rules_script_prefix(self):
+        """ Test that paths are relative to the script prefix, as request
+        paths are matched by `path_info`.
+        """
+
+        set_script_prefix("/auth/")
+        self.addCleanup(set_script_prefix, "/")
+
+        self.assertEqual(url_name_rules(["home", "callback"]),
+            [{"path": "/"}, {"path": "/login/callback/"}])
+
+
+class ExemptionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _get_response(self, path, method="GET"):
+
+        request = self.factory.generic(method, path)
+        request.session = {}
+
+        middleware = LoginAuthorizationMiddleware(
+            lambda request: HttpResponse("OK"))
+        return middleware(request)
+
+    def test_exempt_urls(self):
+        """ Test that exempt URLs are matched without resolving them. """
+
+        with mock.patch("django.urls.resolvers.URLResolver.resolve") as \
+                resolve:
+            self.assertEqual(self._get_response("/login/").status_code, 200)
+            self.assertEqual(self._get_response("/verify/").status_code, 401)
+
+        resolve.assert_not_called()
+
+    @override_settings(AUTHORIZATION_EXEMPT_RULES=[
+        {"prefix": "/static/", "methods": ["GET"]}])
+    def test_exempt_rules(self):
+        """ Test that configured rules exempt requests. """
+
+        self.assertEqual(self._get_response("/static/a.css").status_code, 200)
+        self.assertEqual(
+            self._get_response("/static/a.css", "POST").status_code, 401)
+
+    @override_settings(AUTHORIZATION_EXEMPT_FILTER=lambda request:
+        request.path_info == "/verify/")
+    def test_exempt_filter(self):
+        """ Test that the exemption filter is used as a fallback. """
+
+        self.assertEqual(self._get_response("/verify/").status_code, 200)
+        self.assertEqual(self._get_response("/other/").status_code, 401)
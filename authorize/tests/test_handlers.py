@@ -0,0 +1,139 @@
+""" Test module for the verify endpoint handlers. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import asyncio
+
+from django.conf import settings
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import set_script_prefix
+
+from authenticate.utils import USER_SESSION_KEY, User
+from authorize.handlers import VerifyASGIApplication, \
+    VerifyWSGIApplication, get_verify_middleware
+
+
+def session_cookie(user):
+
+    session = SessionStore()
+    session[USER_SESSION_KEY] = user._asdict()
+
+    return f"{settings.SESSION_COOKIE_NAME}={session._get_session_key()}"
+
+
+class VerifyHandlerTests(SimpleTestCase):
+
+    def setUp(self):
+
+        # As in Django's test client, requests don't touch the database
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+        self.factory = RequestFactory()
+        self.full_application = WSGIHandler()
+        self.application = VerifyWSGIApplication(self.full_application)
+
+    def _get_response(self, application, path, **extra):
+
+        environ = self.factory.get(path, **extra).environ
+        response = {}
+
+        def start_response(status, headers):
+            response["status"] = int(status.split()[0])
+            response["headers"] = dict(headers)
+
+        response["body"] = b"".join(application(environ, start_response))
+        return response
+
+    def assertSameResponse(self, path, **extra):
+        """ Asserts that the full application and the verify handler give
+        the same status, body and verify headers.
+        """
+
+        expected = self._get_response(self.full_application, path, **extra)
+        response = self._get_response(self.application, path, **extra)
+
+        self.assertEqual(response["status"], expected["status"])
+        self.assertEqual(response["body"], expected["body"])
+        self.assertEqual(response["headers"].get("X-Remote-User"),
+            expected["headers"].get("X-Remote-User"))
+
+        return response
+
+    def test_verify_middleware(self):
+        """ Test that only session and auth middleware run for verify. """
+
+        self.assertEqual(get_verify_middleware(), [
+            "django.contrib.sessions.middleware.SessionMiddleware",
+            "authenticate.oauth2.middleware."
+            "BearerTokenAuthenticationMiddleware",
+            "authorize.middleware.LoginAuthorizationMiddleware",
+        ])
+
+    def test_unauthenticated(self):
+        """ Test that unauthenticated requests are refused. """
+
+        response = self.assertSameResponse("/verify/",
+            data={"next": "http://data.example.com/file.nc"})
+        self.assertEqual(response["status"], 401)
+
+    def test_authenticated(self):
+        """ Test that authenticated requests are verified. """
+
+        response = self.assertSameResponse("/verify/",
+            data={"next": "http://data.example.com/file.nc"},
+            HTTP_COOKIE=session_cookie(User("alice", ["badc"])))
+
+        self.assertEqual(response["status"], 200)
+        self.assertEqual(response["headers"]["X-Remote-User"], "alice")
+
+    def test_other_paths(self):
+        """ Test that other requests are passed to the full application. """
+
+        response = self._get_response(self.application, "/verify")
+        self.assertEqual(response["status"], 301)
+
+    def test_script_prefix(self):
+        """ Test that verify requests take the fast path when the script
+        prefix is set at startup, e.g. by `FORCE_SCRIPT_NAME`.
+        """
+
+        set_script_prefix("/auth/")
+        self.addCleanup(set_script_prefix, "/")
+
+        application = VerifyWSGIApplication(self.full_application)
+        self.assertEqual(application.verify_path, "/verify/")
+
+    def test_asgi(self):
+        """ Test that the ASGI application serves verify requests. """
+
+        application = VerifyASGIApplication(object())
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        cookie = session_cookie(User("alice", ["badc"]))
+        asyncio.run(application({
+            "type": "http",
+            "method": "GET",
+            "path": "/verify/",
+            "query_string": b"next=http://data.example.com/file.nc",
+            "headers": [(b"cookie", cookie.encode())],
+        }, receive, send))
+
+        start = messages[0]
+        self.assertEqual(start["status"], 200)
+        self.assertIn((b"X-Remote-User", b"alice"), start["headers"])
@@ -0,0 +1,374 @@
+""" Test module for OPA authorization. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import asyncio
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authenticate.utils import USER_SESSION_KEY
+from authorize.opa.exceptions import OPAAuthorizationError
+from authorize.opa.middleware import OPAAuthorizationMiddleware
+from authorize.opa.prefetch import PrefixIndex
+
+
+OPA_SERVER = {
+    "host": "localhost",
+    "port": 8181,
+    "package_path": "authz",
+    "rule_name": "allow",
+}
+
+
+def opa_response(result, revision="1"):
+
+    return {
+        "result": result,
+        "provenance": {"bundles": {"authz": {"revision": revision}}},
+    }
+
+
+@override_settings(
+    OPA_SERVER=OPA_SERVER,
+    AUTH_CACHE={"ttls": {"opa": {"allow": 60, "deny": 0}}},
+)
+class OPADecisionCacheTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.factory = RequestFactory()
+        self.middleware = OPAAuthorizationMiddleware(None)
+        self.addCleanup(self.middleware.flush_decision_cache)
+
+        patcher = mock.patch.object(self.middleware._client,
+            "check_policy_rule")
+        self.check_policy_rule = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _is_authorized(self, resource, username="user"):
+
+        request = self.factory.get("/verify/")
+        request.session = {
+            USER_SESSION_KEY: {"username": username, "groups": ["group"]},
+        }
+
+        return self.middleware._cached_is_authorized(request, resource)
+
+    def test_allow_cached(self):
+        """ Test that allow decisions are reused. """
+
+        self.check_policy_rule.return_value = opa_response(True)
+
+        self.assertTrue(self._is_authorized("/data/file"))
+        self.assertTrue(self._is_authorized("/data/file"))
+        self.assertEqual(self.check_policy_rule.call_count, 1)
+
+        self._is_authorized("/data/file", username="other")
+        self.assertEqual(self.check_policy_rule.call_count, 2)
+
+    def test_deny_ttl(self):
+        """ Test that deny decisions use their own TTL. """
+
+        self.check_policy_rule.return_value = opa_response(False)
+
+        self.assertFalse(self._is_authorized("/data/file"))
+        self.assertFalse(self._is_authorized("/data/file"))
+        self.assertEqual(self.check_policy_rule.call_count, 2)
+
+    def test_policy_change(self):
+        """ Test that a new policy revision flushes cached decisions. """
+
+        self.check_policy_rule.return_value = opa_response(True, "1")
+        self._is_authorized("/data/file")
+
+        self.check_policy_rule.return_value = opa_response(True, "2")
+        self._is_authorized("/data/other")
+        self._is_authorized("/data/file")
+
+        self.assertEqual(self.check_policy_rule.call_count, 3)
+
+
+class PrefixIndexTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.index = PrefixIndex.from_result({
+            "allow": [
+                {"prefix": "https://host/data/", "actions": ["Read"]},
+                {"prefix": "https://host/data/shared", "actions": ["*"]},
+            ],
+            "deny": [
+                {"prefix": "https://host/data/private/", "actions": ["*"]},
+            ],
+        })
+
+    def test_longest_prefix(self):
+        """ Test that the longest matching prefix decides. """
+
+        self.assertTrue(self.index.lookup("https://host/data/a/b", "Read"))
+        self.assertFalse(self.index.lookup("https://host/data/private/a",
+            "Read"))
+        self.assertTrue(self.index.lookup("https://host/data/shared/a",
+            "Write"))
+
+    def test_uncovered(self):
+        """ Test that resources and actions outside the index are unknown. """
+
+        self.assertIsNone(self.index.lookup("https://host/data/a", "Write"))
+        self.assertIsNone(self.index.lookup("https://host/database", "Read"))
+        self.assertIsNone(self.index.lookup("https://other/data/a", "Read"))
+
+    def test_dot_segments(self):
+        """ Test that resources with dot segments are left to OPA. """
+
+        self.assertIsNone(self.index.lookup(
+            "https://host/data/../private/x", "Read"))
+        self.assertIsNone(self.index.lookup(
+            "https://host/data/%2e%2e/private/x", "Read"))
+        self.assertIsNone(self.index.lookup(
+            "https://host/data/shared/./a", "Write"))
+
+    def test_encoded_paths(self):
+        """ Test that prefixes are matched however a resource is encoded, so
+        that deny entries can't be bypassed.
+        """
+
+        for resource in [
+            "https://host/data/priv%61te/x",
+            "https://host/data//private/x",
+            "https://host/data/private%2Fx",
+            "HTTPS://HOST/data/private/x",
+        ]:
+            self.assertFalse(self.index.lookup(resource, "Read"), resource)
+
+        self.assertTrue(self.index.lookup("https://host//data/a?b=c", "Read"))
+
+    def test_no_resource(self):
+        """ Test that requests without a resource are left to OPA. """
+
+        self.assertIsNone(self.index.lookup(None, "Read"))
+        self.assertIsNone(self.index.lookup("", "Read"))
+
+
+@override_settings(OPA_SERVER=dict(OPA_SERVER, prefetch_rule="permissions"))
+class OPAPrefetchTests(SimpleTestCase):
+
+    def setUp(self):
+
+        self.factory = RequestFactory()
+        self.middleware = OPAAuthorizationMiddleware(None)
+
+        patcher = mock.patch.object(self.middleware._client,
+            "check_policy_rule")
+        self.check_policy_rule = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _is_authorized(self, resource):
+
+        request = self.factory.get("/verify/")
+        request.session = {
+            USER_SESSION_KEY: {"username": "user", "groups": ["group"]},
+        }
+
+        return self.middleware._is_authorized(request, resource)
+
+    def test_prefetched_prefixes(self):
+        """ Test that resources under prefetched prefixes are answered with a
+        single OPA query.
+        """
+
+        self.check_policy_rule.return_value = opa_response({
+            "allow": [{"prefix": "https://host/data/", "actions": ["Read"]}],
+        })
+
+        for i in range(100):
+            self.assertTrue(self._is_authorized(f"https://host/data/{i}.nc"))
+
+        self.check_policy_rule.assert_called_once()
+        self.assertEqual(
+            self.check_policy_rule.call_args[1]["rule_name"], "permissions")
+
+    def test_uncovered_resource(self):
+        """ Test that OPA is queried for resources outside the prefixes. """
+
+        self.check_policy_rule.side_effect = [
+            opa_response({"allow": []}),
+            opa_response(True),
+        ]
+
+        self.assertTrue(self._is_authorized("https://host/other"))
+        self.assertEqual(
+            self.check_policy_rule.call_args[1]["rule_name"], "allow")
+
+
+class StubOPAHandler(BaseHTTPRequestHandler):
+    """ Answers OPA queries with the server's configured decision, after an
+    optional delay or with an error status.
+    """
+
+    def do_POST(self):
+
+        self.server.requests += 1
+        self.rfile.read(int(self.headers["Content-Length"]))
+
+        time.sleep(self.server.delay)
+
+        body = json.dumps(opa_response(self.server.result)).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubOPAServer(ThreadingHTTPServer):
+
+    request_queue_size = 128
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubOPAHandler)
+
+        self.requests = 0
+        self.delay = 0
+        self.status = 200
+        self.result = True
+
+
+class StubOPAServerMixin:
+
+    def _start_server(self, **settings):
+
+        self.server = StubOPAServer()
+
+        thread = threading.Thread(target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        opa_server = dict(OPA_SERVER, host="127.0.0.1",
+            port=self.server.server_port)
+        settings = override_settings(OPA_SERVER=opa_server, **settings)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class OPACircuitBreakerTests(StubOPAServerMixin, SimpleTestCase):
+
+    def setUp(self):
+
+        self._start_server(
+            CIRCUIT_BREAKER={
+                "failure_threshold": 2,
+                "latency_threshold": 0.1,
+                "reset_timeout": 0.3,
+                "grace_period": 60,
+            },
+        )
+
+        self.factory = RequestFactory()
+        self.middleware = OPAAuthorizationMiddleware(None)
+
+    def _is_authorized(self, resource):
+
+        request = self.factory.get("/verify/")
+        request.session = {
+            USER_SESSION_KEY: {"username": "user", "groups": ["group"]},
+        }
+
+        return self.middleware._is_authorized(request, resource)
+
+    def test_errors(self):
+        """ Test that the circuit opens on errors, serving stale decisions
+        while open, and closes once the server recovers.
+        """
+
+        self.assertTrue(self._is_authorized("/data/file"))
+
+        self.server.status = 500
+        self.assertTrue(self._is_authorized("/data/file"))
+        self.assertTrue(self._is_authorized("/data/file"))
+        self.assertEqual(self.server.requests, 3)
+
+        # The open circuit fails fast without querying the server
+        self.assertTrue(self._is_authorized("/data/file"))
+        with self.assertRaises(OPAAuthorizationError):
+            self._is_authorized("/data/other")
+        self.assertEqual(self.server.requests, 3)
+
+        self.server.status = 200
+        self.server.result = False
+        time.sleep(0.3)
+
+        self.assertFalse(self._is_authorized("/data/file"))
+        self.assertEqual(self.server.requests, 4)
+
+    def test_slow_responses(self):
+        """ Test that the circuit opens when the server is slow. """
+
+        self.server.delay = 0.15
+        self.assertTrue(self._is_authorized("/data/file"))
+        self.assertTrue(self._is_authorized("/data/file"))
+        self.assertEqual(self.server.requests, 2)
+
+        started = time.monotonic()
+        with self.assertRaises(OPAAuthorizationError):
+            self._is_authorized("/data/other")
+
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertEqual(self.server.requests, 2)
+
+
+class OPAAsyncTests(StubOPAServerMixin, SimpleTestCase):
+
+    def setUp(self):
+
+        self._start_server(CIRCUIT_BREAKER={"failure_threshold": 0})
+
+        async def get_response(request):
+            return HttpResponse("Authorized")
+
+        self.factory = RequestFactory()
+        self.middleware = OPAAuthorizationMiddleware(get_response)
+
+    def test_concurrent_queries(self):
+        """ Test that queries are awaited concurrently under ASGI. """
+
+        self.server.delay = 0.2
+
+        async def verify(resource):
+
+            request = self.factory.get("/verify/", {"next": resource})
+            request.session = {
+                USER_SESSION_KEY: {"username": "user", "groups": ["group"]},
+            }
+
+            return await self.middleware(request)
+
+        async def verify_all():
+            return await asyncio.gather(
+                *(verify(f"/data/{i}") for i in range(50)))
+
+        self.assertTrue(asyncio.iscoroutinefunction(self.middleware))
+
+        started = time.monotonic()
+        responses = asyncio.run(verify_all())
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual({response.status_code for response in responses},
+            {200})
+        self.assertEqual(self.server.requests, 50)
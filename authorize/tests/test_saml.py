@@ -0,0 +1,178 @@
+""" Test module for SAML query templates, response parsing and transport.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import io
+
+from datetime import datetime
+from xml.etree import ElementTree
+
+from django.test import SimpleTestCase
+from ndg.soap.client import HTTPException, SOAPResponseError
+
+from authorize.saml.exceptions import SamlAuthorizationError
+from authorize.saml.template import SAML_ASSERTION_NS, SAML_PROTOCOL_NS, \
+    SOAP_ENVELOPE_NS, SUCCESS_STATUS, QueryTemplate, parse_decisions
+from authorize.saml.transport import PooledSOAPClient
+
+
+NAMESPACES = {
+    "soap": SOAP_ENVELOPE_NS,
+    "samlp": SAML_PROTOCOL_NS,
+    "saml": SAML_ASSERTION_NS,
+}
+
+
+def make_response(decisions=("Permit",), status=SUCCESS_STATUS,
+        in_response_to="query-1"):
+
+    statements = "".join(
+        f'<saml:Assertion><saml:AuthzDecisionStatement Decision="{decision}" '
+        'Resource="http://data.example.com/file.nc"/></saml:Assertion>'
+        for decision in decisions
+    )
+    return io.BytesIO((
+        f'<SOAP-ENV:Envelope xmlns:SOAP-ENV="{SOAP_ENVELOPE_NS}">'
+        '<SOAP-ENV:Body>'
+        f'<samlp:Response xmlns:samlp="{SAML_PROTOCOL_NS}" '
+        f'xmlns:saml="{SAML_ASSERTION_NS}" InResponseTo="{in_response_to}">'
+        f'<samlp:Status><samlp:StatusCode Value="{status}"/></samlp:Status>'
+        f'{statements}'
+        '</samlp:Response>'
+        '</SOAP-ENV:Body>'
+        '</SOAP-ENV:Envelope>'
+    ).encode())
+
+
+class QueryTemplateTests(SimpleTestCase):
+
+    def setUp(self):
+        self.template = QueryTemplate("/O=Site/CN=Issuer {1}",
+            "urn:example:nameid-format")
+
+    def test_render(self):
+        """ Test that values are filled in to a well-formed query. """
+
+        envelope = ElementTree.fromstring(self.template.render("query-1",
+            datetime(2026, 1, 2, 3, 4, 5), "alice",
+            "http://data.example.com/file.nc?a=1&b=2", "Read"))
+
+        query = envelope.find("soap:Body/samlp:AuthzDecisionQuery",
+            NAMESPACES)
+        self.assertEqual(query.get("ID"), "query-1")
+        self.assertEqual(query.get("IssueInstant"), "2026-01-02T03:04:05Z")
+        self.assertEqual(query.get("Resource"),
+            "http://data.example.com/file.nc?a=1&b=2")
+
+        self.assertEqual(query.find("saml:Issuer", NAMESPACES).text,
+            "/O=Site/CN=Issuer {1}")
+        name_id = query.find("saml:Subject/saml:NameID", NAMESPACES)
+        self.assertEqual(name_id.text, "alice")
+        self.assertEqual(name_id.get("Format"), "urn:example:nameid-format")
+        self.assertEqual(query.find("saml:Action", NAMESPACES).text, "Read")
+
+    def test_render_escapes_values(self):
+        """ Test that markup in values is escaped rather than injected. """
+
+        envelope = ElementTree.fromstring(self.template.render('"><x/>',
+            datetime(2026, 1, 2), "<saml:NameID>bob</saml:NameID>",
+            'http://host/"><x/>', "Read</saml:Action>"))
+
+        query = envelope.find("soap:Body/samlp:AuthzDecisionQuery",
+            NAMESPACES)
+        self.assertEqual(query.get("ID"), '"><x/>')
+        self.assertEqual(query.get("Resource"), 'http://host/"><x/>')
+        self.assertEqual(
+            query.find("saml:Subject/saml:NameID", NAMESPACES).text,
+            "<saml:NameID>bob</saml:NameID>")
+        self.assertEqual(query.find("saml:Action", NAMESPACES).text,
+            "Read</saml:Action>")
+
+
+class ParseDecisionsTests(SimpleTestCase):
+
+    def test_decisions(self):
+        """ Test that the decisions of all statements are returned. """
+
+        self.assertEqual(parse_decisions(
+            make_response(["Permit", "Deny"]), "query-1"), ["Permit", "Deny"])
+
+    def test_fault(self):
+        """ Test that a SOAP fault raises an error. """
+
+        fault = io.BytesIO((
+            f'<SOAP-ENV:Envelope xmlns:SOAP-ENV="{SOAP_ENVELOPE_NS}">'
+            '<SOAP-ENV:Body><SOAP-ENV:Fault>'
+            '<faultcode>SOAP-ENV:Server</faultcode>'
+            '<faultstring>Internal error</faultstring>'
+            '</SOAP-ENV:Fault></SOAP-ENV:Body>'
+            '</SOAP-ENV:Envelope>'
+        ).encode())
+
+        with self.assertRaisesRegex(SamlAuthorizationError, "fault"):
+            parse_decisions(fault, "query-1")
+
+    def test_unsuccessful_status(self):
+        """ Test that a response without a success status raises an error.
+        """
+
+        response = make_response(
+            status="urn:oasis:names:tc:SAML:2.0:status:Responder")
+
+        with self.assertRaisesRegex(SamlAuthorizationError, "Responder"):
+            parse_decisions(response, "query-1")
+
+    def test_in_response_to_mismatch(self):
+        """ Test that a response to another query raises an error. """
+
+        with self.assertRaisesRegex(SamlAuthorizationError, "query-2"):
+            parse_decisions(make_response(in_response_to="query-2"),
+                "query-1")
+
+    def test_no_decisions(self):
+        """ Test that a response without decisions raises an error. """
+
+        with self.assertRaisesRegex(SamlAuthorizationError, "no decisions"):
+            parse_decisions(make_response(decisions=[]), "query-1")
+
+    def test_malformed(self):
+        """ Test that a malformed response raises an error. """
+
+        with self.assertRaisesRegex(SamlAuthorizationError, "parse"):
+            parse_decisions(io.BytesIO(b"<SOAP-ENV:Envelope"), "query-1")
+
+
+class PooledSOAPClientTests(SimpleTestCase):
+
+    URL = "https://authz.example.com/soap"
+
+    def setUp(self):
+        self.client = PooledSOAPClient()
+
+    def test_successful_response(self):
+        """ Test that a successful XML response is accepted. """
+
+        self.client._check_response(self.URL, 200, "OK",
+            {"Content-Type": "text/xml; charset=utf-8"})
+
+    def test_error_status(self):
+        """ Test that an unsuccessful HTTP status raises an error. """
+
+        with self.assertRaisesRegex(HTTPException, "500 Internal"):
+            self.client._check_response(self.URL, 500,
+                "Internal Server Error", {"Content-Type": "text/xml"})
+
+    def test_unexpected_content_type(self):
+        """ Test that a response which isn't XML raises an error. """
+
+        with self.assertRaisesRegex(SOAPResponseError, "text/html"):
+            self.client._check_response(self.URL, 200, "OK",
+                {"Content-Type": "text/html"})
+
+        with self.assertRaises(SOAPResponseError):
+            self.client._check_response(self.URL, 200, "OK", {})
@@ -8,17 +8,16 @@ __license__ = "BSD - see LICENSE file in top-level directory"
 
 import logging
 
-from django.conf import settings
 from django.http import HttpResponse
 from django.views.generic import View
 
+from authenticate.config import get_config, \
+    DEFAULT_REMOTE_USER_RESPONSE_HEADER_KEY
 from authenticate.utils import get_user
 
 
 LOG = logging.getLogger(__name__)
 
-DEFAULT_REMOTE_USER_RESPONSE_HEADER_KEY = "X-Remote-User"
-
 
 class VerifyView(View):
     """ View for checking the authorizing of a request.
@@ -37,8 +36,7 @@ class VerifyView(View):
         user = get_user(request)
         if user:
 
-            header_key = getattr(settings, "REMOTE_USER_RESPONSE_HEADER_KEY",
-                DEFAULT_REMOTE_USER_RESPONSE_HEADER_KEY)
+            header_key = get_config().remote_user_response_header_key
             LOG.debug(f"Saving user {user.username} to response: {header_key}")
             response[header_key] = user.username
 
@@ -0,0 +1,4 @@
+""" Benchmarks for the app, run as modules, e.g.
+
+    python -m benchmarks.bench_acl
+"""
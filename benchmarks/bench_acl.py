@@ -0,0 +1,59 @@
+""" Benchmark of ACL lookup cost against the number of rules. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import random
+import timeit
+
+from authorize.acl.rules import AccessControlList
+
+
+RULE_COUNTS = [1000, 10000, 100000]
+
+
+def make_rules(count):
+    """ Generates rules for datasets nested three levels deep. """
+
+    return [
+        {
+            "prefix": f"data.example.com/archive/project{i % 100}/dataset{i}",
+            "groups": [f"group{i % 1000}"],
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    for count in RULE_COUNTS:
+
+        acl = AccessControlList(make_rules(count))
+        resources = [
+            f"https://data.example.com/archive/project{i % 100}/dataset{i}"
+            "/year/month/file.nc"
+            for i in random.sample(range(count), 1000)
+        ]
+        groups = ["group1", "group2"]
+
+        def lookup():
+            for resource in resources:
+                acl.is_authorized(resource, "GET", groups)
+
+        runs = max(args.lookups // len(resources), 1)
+        elapsed = timeit.timeit(lookup, number=runs)
+        per_lookup = elapsed / (runs * len(resources)) * 1e6
+
+        print(f"{count:>7} rules: {per_lookup:.2f} us per lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+""" Load test comparing verify requests in flight per worker under WSGI and
+ASGI.
+
+Each request is authorized by the OPA middleware against a local stub OPA
+server which waits before answering, standing in for a slow upstream. The
+WSGI worker is given a fixed number of threads, as a threaded gunicorn worker
+would be, while the ASGI worker serves all requests from one event loop.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import asyncio
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import django
+
+from django.conf import settings
+
+from .stubs import stub_opa_server
+
+
+def configure(opa_port, concurrency):
+
+    settings.configure(
+        SECRET_KEY="benchmark",
+        ALLOWED_HOSTS=["*"],
+        ROOT_URLCONF="auth_service.urls",
+        INSTALLED_APPS=["django.contrib.sessions", "authenticate"],
+        MIDDLEWARE=[
+            "django.contrib.sessions.middleware.SessionMiddleware",
+            "authorize.opa.middleware.OPAAuthorizationMiddleware",
+        ],
+        SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies",
+        OPA_SERVER={
+            "host": "127.0.0.1",
+            "port": opa_port,
+            "package_path": "authz",
+            "rule_name": "allow",
+        },
+        OUTBOUND_HTTP={"pool_maxsize": concurrency},
+        CIRCUIT_BREAKER={"failure_threshold": 0},
+    )
+    django.setup()
+
+
+def run_wsgi(requests, threads):
+    """ Serves requests from a pool of threads and returns requests per
+    second.
+    """
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+
+    def verify(i):
+
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": "/verify/",
+            "QUERY_STRING": f"next=/data/{i}",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "wsgi.input": BytesIO(),
+            "wsgi.url_scheme": "http",
+        }
+
+        statuses = []
+        handler(environ, lambda status, headers: statuses.append(status))
+        return statuses[0]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        statuses = list(executor.map(verify, range(requests)))
+
+    elapsed = time.perf_counter() - started
+    assert all(status.startswith("200") for status in statuses), statuses[0]
+
+    return requests / elapsed
+
+
+def run_asgi(requests, concurrency):
+    """ Serves requests from one event loop, with up to `concurrency` in
+    flight at once, and returns requests per second.
+    """
+
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+
+    async def verify(i, semaphore):
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/verify/",
+            "query_string": f"next=/data/{i}".encode(),
+            "headers": [],
+            "server": ("localhost", 80),
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        async with semaphore:
+            await handler(scope, receive, send)
+
+        return messages[0]["status"]
+
+    async def verify_all():
+
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(
+            *(verify(i, semaphore) for i in range(requests)))
+
+    started = time.perf_counter()
+    statuses = asyncio.run(verify_all())
+
+    elapsed = time.perf_counter() - started
+    assert set(statuses) == {200}, statuses[0]
+
+    return requests / elapsed
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8,
+        help="Threads in the WSGI worker")
+    parser.add_argument("--concurrency", type=int, default=500,
+        help="Requests in flight in the ASGI worker")
+    parser.add_argument("--delay", type=float, default=0.5,
+        help="Seconds the stub OPA server waits before responding")
+    args = parser.parse_args()
+
+    with stub_opa_server(delay=args.delay) as server:
+
+        configure(server.server_port, max(args.threads, args.concurrency))
+
+        for name, run, workers in [
+                ("WSGI", run_wsgi, args.threads),
+                ("ASGI", run_asgi, args.concurrency)]:
+
+            rps = run(args.requests, workers)
+
+            # By Little's law, the mean number of requests in flight
+            in_flight = rps * args.delay
+            print(f"{name}: {rps:.0f} requests per second, "
+                f"{in_flight:.0f} requests in flight")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+""" Microbenchmark of the per-request cost of reading settings, comparing
+lookups on Django's settings object with the precomputed AuthConfig.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import codecs
+import timeit
+
+import django
+
+from django.conf import settings
+
+from authenticate.config import get_config
+
+
+def configure():
+
+    settings.configure(
+        SECRET_KEY="benchmark",
+        SECURITY_SHAREDSECRET="c2hhcmVkIHNlY3JldCBmb3IgYmVuY2htYXJraW5n",
+        ACCOUNT_COOKIE_NAME="auth_tkt",
+    )
+    django.setup()
+
+
+def read_settings():
+    """ The settings read by a verify request, looked up as they were before
+    AuthConfig.
+    """
+
+    return (
+        getattr(settings, "RESOURCE_URI_QUERY_KEY", "next"),
+        getattr(settings, "RESOURCE_URI_HEADER_KEY", "HTTP_X_ORIGINAL_URI"),
+        getattr(settings, "RESOURCE_URI_SESSION_KEY", "resource_uri"),
+        getattr(settings, "REMOTE_USER_RESPONSE_HEADER_KEY",
+            "X-Remote-User"),
+        getattr(settings, "OAUTH2_USERNAME_KEY", "preferred_username"),
+        getattr(settings, "OAUTH2_GROUPS_KEY", "groups"),
+        settings.ACCOUNT_COOKIE_NAME,
+        codecs.decode(settings.SECURITY_SHAREDSECRET.encode(), "base64"),
+        hasattr(settings, "AUTHORIZATION_EXEMPT_FILTER"),
+    )
+
+
+def read_config():
+    """ The same settings read from AuthConfig. """
+
+    config = get_config()
+    return (
+        config.resource_uri_query_key,
+        config.resource_uri_header_key,
+        config.resource_uri_session_key,
+        config.remote_user_response_header_key,
+        config.oauth2_username_key,
+        config.oauth2_groups_key,
+        config.account_cookie_name,
+        config.shared_secret,
+        config.authorization_exempt_filter,
+    )
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    configure()
+
+    for name, func in [
+            ("settings", read_settings),
+            ("AuthConfig", read_config)]:
+
+        elapsed = timeit.timeit(func, number=args.number)
+        print(f"{name:>10}: {elapsed / args.number * 1e9:.0f} ns per request")
+
+
+if __name__ == "__main__":
+    main()
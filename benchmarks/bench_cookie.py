@@ -0,0 +1,69 @@
+""" Benchmark of cookie authentication throughput, with and without the
+parsed ticket cache.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import base64
+import itertools
+import os
+import timeit
+
+import django
+
+from django.conf import settings
+
+
+SECRET = os.urandom(32)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100,
+        help="Number of distinct cookies to authenticate")
+    args = parser.parse_args()
+
+    settings.configure(
+        SECRET_KEY="benchmark",
+        ACCOUNT_COOKIE_NAME="auth_tkt",
+        SECURITY_SHAREDSECRET=base64.b64encode(SECRET).decode(),
+    )
+    django.setup()
+
+    from crypto_cookie.auth_tkt import SecureCookie
+    from django.test import RequestFactory, override_settings
+    from authenticate.cookie.middleware import CookieAuthenticationMiddleware
+
+    factory = RequestFactory()
+    requests = []
+    for i in range(args.users):
+
+        request = factory.get("/verify/")
+        request.COOKIES["auth_tkt"] = SecureCookie(SECRET, f"user-{i}",
+            "127.0.0.1").cookie_value()
+        requests.append(request)
+
+    for name, cache_size in [("uncached", 0), ("cached", 1024)]:
+
+        with override_settings(COOKIE_TICKET_CACHE_SIZE=cache_size):
+            middleware = CookieAuthenticationMiddleware(lambda request: None)
+
+        cycle = itertools.cycle(requests)
+
+        def authenticate():
+            return middleware._authenticate(next(cycle))
+
+        elapsed = timeit.timeit(authenticate, number=args.number)
+        print(f"{name:>8}: {args.number / elapsed:.0f} authentications "
+            "per second")
+
+
+if __name__ == "__main__":
+    main()
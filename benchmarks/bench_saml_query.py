@@ -0,0 +1,88 @@
+""" Microbenchmarks of SAML query building and response parsing, comparing
+the ndg-saml object model with pre-serialized templates and streaming parsing.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import io
+import timeit
+
+from datetime import datetime
+from uuid import uuid4
+
+from ndg.saml.saml2.core import Action, AuthzDecisionQuery
+from ndg.saml.xml.etree import AuthzDecisionQueryElementTree, \
+    ResponseElementTree
+from ndg.soap.etree import SOAPEnvelope
+
+from authorize.saml.query_builder import ISSUER, NAMEID_FORMAT, QueryBuilder
+from authorize.saml.template import QueryTemplate, parse_decisions
+from .stubs import saml_response
+
+
+RESOURCE = "http://data.example.com/badc/cmip6/file.nc"
+USER = "https://example.com/openid/user"
+
+
+def build_with_object_model():
+
+    query = QueryBuilder.build_query(AuthzDecisionQuery, USER,
+        Action.READ_ACTION)
+    query.resource = RESOURCE
+
+    envelope = SOAPEnvelope()
+    envelope.create()
+    envelope.body.elem.append(AuthzDecisionQueryElementTree.toXML(query))
+
+    return envelope.serialize()
+
+
+def parse_with_object_model(response):
+
+    envelope = SOAPEnvelope()
+    envelope.parse(io.BytesIO(response))
+    saml_response = ResponseElementTree.fromXML(envelope.body.elem[0])
+
+    return [
+        statement.decision.value
+        for assertion in saml_response.assertions
+        for statement in assertion.authzDecisionStatements
+    ]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=10000)
+    args = parser.parse_args()
+
+    template = QueryTemplate(ISSUER, NAMEID_FORMAT)
+    response = saml_response("query-id", RESOURCE, USER)
+
+    def build_with_template():
+        return template.render(str(uuid4()), datetime.utcnow(), USER,
+            RESOURCE, Action.READ_ACTION)
+
+    def parse_with_streaming():
+        return parse_decisions(io.BytesIO(response), "query-id")
+
+    benchmarks = [
+        ("build: object model", build_with_object_model),
+        ("build: template", build_with_template),
+        ("parse: object model", lambda: parse_with_object_model(response)),
+        ("parse: streaming", parse_with_streaming),
+    ]
+
+    for name, func in benchmarks:
+
+        elapsed = timeit.timeit(func, number=args.number)
+        print(f"{name:>20}: {elapsed / args.number * 1e6:.1f} us per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+""" Benchmark of SAML query throughput with and without connection pooling.
+
+Queries are sent to a local stub SOAP server, with the decision cache
+disabled so that every query reaches the server. The stub serves plain HTTP,
+so the results show the saving from reusing TCP connections only; over TLS
+the pooled client also avoids a handshake per query.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+
+from authorize.saml.authorize import SAMLAuthorizer
+from authorize.saml.transport import PooledSOAPClient
+from .stubs import stub_soap_server
+
+
+def run(authorizer, queries, threads):
+    """ Sends queries for distinct resources and returns queries per second.
+    """
+
+    def query(i):
+        return authorizer.is_authorized(f"http://data/{i}", "user")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(query, range(queries)))
+
+    elapsed = time.perf_counter() - started
+    assert all(results)
+
+    return queries / elapsed
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0,
+        help="Seconds the stub server waits before responding")
+    args = parser.parse_args()
+
+    with stub_soap_server(delay=args.delay) as server:
+
+        clients = {
+            "per-query connections": None,
+            "pooled connections": PooledSOAPClient(pool_maxsize=args.threads),
+        }
+
+        for name, soap_client in clients.items():
+
+            authorizer = SAMLAuthorizer(server.url, cache_size=0,
+                soap_client=soap_client)
+
+            # Warm up connections before timing
+            run(authorizer, args.threads, args.threads)
+            qps = run(authorizer, args.queries, args.threads)
+
+            print(f"{name:>22}: {qps:.0f} queries per second")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+""" Microbenchmark of signed cookie sessions holding an authenticated user,
+comparing Django's JSON serialization with the compact session engine.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import timeit
+
+import django
+
+from django.conf import settings
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=10,
+        help="Number of groups the user belongs to")
+    args = parser.parse_args()
+
+    settings.configure(SECRET_KEY="benchmark")
+    django.setup()
+
+    from django.contrib.sessions.backends import signed_cookies
+    from authenticate import sessions
+    from authenticate.utils import USER_SESSION_KEY
+
+    user_data = {
+        "username": "https://example.com/openid/user",
+        "groups": [f"group-{i}" for i in range(args.groups)],
+    }
+
+    for name, store_class in [
+            ("JSON", signed_cookies.SessionStore),
+            ("compact", sessions.SessionStore)]:
+
+        store = store_class()
+        store[USER_SESSION_KEY] = user_data
+        session_key = store._get_session_key()
+
+        def load():
+            return store_class(session_key)[USER_SESSION_KEY]
+
+        dump_time = timeit.timeit(store._get_session_key, number=args.number)
+        load_time = timeit.timeit(load, number=args.number)
+
+        print(f"{name:>8}: {len(session_key)} byte cookie, "
+            f"{dump_time / args.number * 1e6:.1f} us to save, "
+            f"{load_time / args.number * 1e6:.1f} us to load")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+""" Throughput comparison of verify requests served by the full Django stack
+and by the lightweight verify handler.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import timeit
+
+from io import BytesIO
+
+import django
+
+from django.conf import settings
+
+
+# The middleware from the settings template
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "authenticate.oauth2.middleware.BearerTokenAuthenticationMiddleware",
+    "authorize.middleware.LoginAuthorizationMiddleware",
+]
+
+
+def configure():
+
+    settings.configure(
+        SECRET_KEY="benchmark",
+        ALLOWED_HOSTS=["*"],
+        ROOT_URLCONF="auth_service.urls",
+        INSTALLED_APPS=["django.contrib.sessions", "authenticate"],
+        MIDDLEWARE=MIDDLEWARE,
+        SESSION_ENGINE="authenticate.sessions",
+    )
+    django.setup()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+
+    configure()
+
+    from django.core.handlers.wsgi import WSGIHandler
+    from authenticate.sessions import SessionStore
+    from authenticate.utils import USER_SESSION_KEY, User
+    from authorize.handlers import VerifyWSGIApplication
+
+    session = SessionStore()
+    session[USER_SESSION_KEY] = User("alice", ["badc"])._asdict()
+    cookie = f"{settings.SESSION_COOKIE_NAME}={session._get_session_key()}"
+
+    full_application = WSGIHandler()
+
+    for name, application in [
+            ("full stack", full_application),
+            ("verify handler", VerifyWSGIApplication(full_application))]:
+
+        def verify():
+
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": "/verify/",
+                "QUERY_STRING": "next=http://data.example.com/file.nc",
+                "HTTP_COOKIE": cookie,
+                "SERVER_NAME": "localhost",
+                "SERVER_PORT": "80",
+                "wsgi.input": BytesIO(),
+                "wsgi.url_scheme": "http",
+            }
+
+            statuses = []
+            application(environ, lambda status, headers:
+                statuses.append(status))
+            assert statuses[0].startswith("200"), statuses[0]
+
+        elapsed = timeit.timeit(verify, number=args.number)
+        print(f"{name:>14}: {args.number / elapsed:.0f} requests per second")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+""" Replays recorded traffic against a running auth service's verify
+endpoint.
+
+Traffic is read from an nginx access log in the combined format, or from a
+JSONL trace with one request per line, e.g.
+
+    {"timestamp": 1602849600.25, "method": "GET", "credential": "bearer",
+        "client": "alice", "resource": "https://data.example.com/file.nc"}
+
+where `credential` is one of "bearer", "cookie", "session" or "none", and
+`client` identifies whoever made the request. Log entries with a remote
+user are given credentials of the `--credential` type and the rest none.
+
+Original credentials are never replayed. Each client is replaced by a
+pseudonym, and each pseudonym by a credential for the service under test:
+bearer tokens for the stub introspection server, and account or session
+cookies signed with the secrets given by `--shared-secret` and
+`--secret-key`. Requests by the same client share the same credential, so
+the repetition in the original traffic is kept.
+
+Requests are sent at the times recorded, scaled by `--speed`, e.g.
+
+    python -m benchmarks.replay access.log --target http://localhost:8000 \\
+        --speed 10 --concurrency 32 --output replay.json
+
+With `--stubs PORT`, stub introspection, OPA, SAML and OIDC servers are run
+on PORT to PORT + 3 for the service to be configured with, and the calls
+they receive are counted. Upstream calls are also counted from the
+`Server-Timing` header of each response when the service runs the
+`ServerTimingMiddleware` with `SERVER_TIMING = {"header": True}`.
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+
+import django
+import requests
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .stubs import stub_introspection_server, stub_oidc_server, \
+    stub_opa_server, stub_soap_server
+from .suite import percentile
+
+
+CREDENTIAL_TYPES = ["bearer", "cookie", "session", "none"]
+
+# The nginx "combined" log format
+ACCESS_LOG_PATTERN = re.compile(
+    r'(?P<remote_addr>\S+) \S+ (?P<remote_user>\S+) \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<uri>\S+)[^"]*" (?P<status>\d{3}) '
+)
+ACCESS_LOG_TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+Entry = namedtuple("Entry", "timestamp method resource credential client")
+
+
+def parse_access_log(lines, resource_root, credential):
+    """ Yields entries from the lines of an nginx access log. """
+
+    for line in lines:
+
+        match = ACCESS_LOG_PATTERN.match(line)
+        if not match:
+            continue
+
+        timestamp = datetime.strptime(match.group("time"),
+            ACCESS_LOG_TIME_FORMAT).timestamp()
+
+        remote_user = match.group("remote_user")
+        if remote_user == "-":
+            client = match.group("remote_addr")
+            entry_credential = "none"
+        else:
+            client = remote_user
+            entry_credential = credential
+
+        yield Entry(timestamp, match.group("method"),
+            f"{resource_root}{match.group('uri')}", entry_credential, client)
+
+
+def parse_trace(lines):
+    """ Yields entries from the lines of a JSONL trace. """
+
+    for line in lines:
+
+        if not line.strip():
+            continue
+
+        record = json.loads(line)
+        credential = record.get("credential", "none")
+        if credential not in CREDENTIAL_TYPES:
+            raise ValueError(f"Unknown credential type: {credential}")
+
+        yield Entry(float(record["timestamp"]), record.get("method", "GET"),
+            record["resource"], credential, record.get("client"))
+
+
+def load_entries(path, resource_root, credential):
+    """ Returns the entries of a log or trace file in time order. """
+
+    with open(path) as traffic_file:
+
+        lines = list(traffic_file)
+        first_line = next((line for line in lines if line.strip()), "")
+
+        if first_line.lstrip().startswith("{"):
+            entries = list(parse_trace(lines))
+        else:
+            entries = list(parse_access_log(lines, resource_root,
+                credential))
+
+    return sorted(entries, key=lambda entry: entry.timestamp)
+
+
+class CredentialFactory:
+    """ Issues a replacement credential for each client in the replayed
+    traffic. Clients are identified by a salted hash, so that the original
+    identities appear nowhere in the replayed requests.
+    """
+
+    def __init__(self, shared_secret=None, session_engine=None):
+
+        self._salt = os.urandom(16)
+        self._shared_secret = shared_secret
+        self._session_store = None
+        if session_engine:
+            self._session_store = import_string(
+                f"{session_engine}.SessionStore")
+
+        self._credentials = {}
+        self._lock = threading.Lock()
+
+    def pseudonym(self, client):
+        """ Returns a stable pseudonym for a client. """
+
+        digest = hashlib.sha256(self._salt + str(client).encode())
+        return f"replay-{digest.hexdigest()[:16]}"
+
+    def get(self, credential, client):
+        """ Returns the credential of some type for a client. """
+
+        key = (credential, client)
+        with self._lock:
+
+            value = self._credentials.get(key)
+            if value is None:
+                value = self._credentials[key] = self._issue(credential,
+                    self.pseudonym(client))
+
+        return value
+
+    def _issue(self, credential, username):
+
+        if credential == "bearer":
+            # The stub introspection server accepts any token
+            return username
+
+        if credential == "cookie":
+
+            from crypto_cookie.auth_tkt import SecureCookie
+            return SecureCookie(self._shared_secret, username,
+                "127.0.0.1").cookie_value()
+
+        if credential == "session":
+
+            from authenticate.utils import USER_SESSION_KEY, User
+
+            session = self._session_store()
+            session[USER_SESSION_KEY] = User(username, [])._asdict()
+            return session._get_session_key()
+
+
+def upstream_stages(server_timing):
+    """ Returns the names of the upstream stages in a Server-Timing header,
+    repeated for each call where the stage's description gives a count.
+    """
+
+    stages = []
+    for timing in server_timing.split(","):
+
+        name, *params = [part.strip() for part in timing.split(";")]
+        if not name.startswith("upstream-"):
+            continue
+
+        calls = 1
+        for param in params:
+            if param.startswith("desc="):
+                calls = int(param[len("desc="):].strip('"').split()[0])
+
+        stages.extend([name[len("upstream-"):]] * calls)
+
+    return stages
+
+
+class Replayer:
+    """ Sends entries to the verify endpoint of a service. """
+
+    def __init__(self, credentials, args):
+
+        self.credentials = credentials
+        self.url = f"{args.target.rstrip('/')}{args.verify_path}"
+        self.args = args
+
+        self._local = threading.local()
+
+    def _session(self):
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+
+        return session
+
+    def send(self, entry, due):
+        """ Sends an entry, as nginx would for an auth_request. Returns the
+        result of the request.
+        """
+
+        headers = {self.args.resource_header: entry.resource}
+        if entry.credential != "none":
+
+            credential = self.credentials.get(entry.credential, entry.client)
+            if entry.credential == "bearer":
+                headers["Authorization"] = f"Bearer {credential}"
+            elif entry.credential == "cookie":
+                headers["Cookie"] = \
+                    f"{self.args.account_cookie_name}={credential}"
+            else:
+                headers["Cookie"] = \
+                    f"{self.args.session_cookie_name}={credential}"
+
+        session = self._session()
+        session.cookies.clear()
+
+        started = time.perf_counter()
+        try:
+            response = session.request(entry.method, self.url,
+                headers=headers, allow_redirects=False,
+                timeout=self.args.timeout)
+            status = response.status_code
+            upstreams = upstream_stages(
+                response.headers.get("Server-Timing", ""))
+
+        except requests.RequestException:
+            status = None
+            upstreams = []
+
+        return {
+            "credential": entry.credential,
+            "status": status,
+            "latency": time.perf_counter() - started,
+            "lag": started - due,
+            "upstreams": upstreams,
+        }
+
+    def replay(self, entries):
+        """ Sends entries at their recorded times, scaled by the replay
+        speed, and returns their results.
+        """
+
+        speed = self.args.speed
+        first = entries[0].timestamp
+
+        futures = []
+        with ThreadPoolExecutor(self.args.concurrency) as executor:
+
+            started = time.perf_counter()
+            for entry in entries:
+
+                due = started
+                if speed:
+                    due += (entry.timestamp - first) / speed
+
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+                futures.append(executor.submit(self.send, entry, due))
+
+            results = [future.result() for future in futures]
+
+        return results, time.perf_counter() - started
+
+
+def latency_summary(latencies):
+    """ Returns percentiles of some latencies in milliseconds. """
+
+    latencies = sorted(latency * 1000 for latency in latencies)
+    if not latencies:
+        return {}
+
+    return {
+        "mean": round(sum(latencies) / len(latencies), 3),
+        "p50": round(percentile(latencies, 0.5), 3),
+        "p90": round(percentile(latencies, 0.9), 3),
+        "p99": round(percentile(latencies, 0.99), 3),
+        "max": round(latencies[-1], 3),
+    }
+
+
+def summarize(results, elapsed, stub_requests):
+    """ Returns a report of the results of a replay. """
+
+    def describe(group):
+
+        statuses = Counter(str(result["status"]) for result in group)
+        errors = sum(1 for result in group
+            if result["status"] is None or result["status"] >= 500)
+
+        upstreams = Counter(upstream for result in group
+            for upstream in result["upstreams"])
+
+        return {
+            "requests": len(group),
+            "statuses": dict(statuses),
+            "error_rate": round(errors / len(group), 4),
+            "latency_ms": latency_summary(
+                result["latency"] for result in group),
+            "upstream_calls_per_request": {name: round(count / len(group), 3)
+                for name, count in upstreams.items()},
+        }
+
+    by_credential = defaultdict(list)
+    for result in results:
+        by_credential[result["credential"]].append(result)
+
+    report = describe(results)
+    report.update({
+        "duration": round(elapsed, 3),
+        "requests_per_second": round(len(results) / elapsed, 1),
+        "lag_ms": latency_summary(max(result["lag"], 0)
+            for result in results),
+        "by_credential": {credential: describe(group)
+            for credential, group in sorted(by_credential.items())},
+    })
+
+    if stub_requests is not None:
+        report["stub_calls_per_request"] = {
+            name: round(count / len(results), 3)
+            for name, count in stub_requests.items()
+        }
+
+    return report
+
+
+def print_report(report):
+
+    def describe(name, summary):
+
+        latency = summary["latency_ms"]
+        upstreams = ", ".join(f"{upstream} {calls}" for upstream, calls in
+            sorted(summary["upstream_calls_per_request"].items()))
+
+        print(f"{name:<8} {summary['requests']:>7} requests  "
+            f"p50 {latency['p50']:>7.2f} ms  p99 {latency['p99']:>7.2f} ms  "
+            f"{summary['error_rate']:.2%} errors  "
+            f"statuses {summary['statuses']}")
+        if upstreams:
+            print(f"{'':<8} upstream calls per request: {upstreams}")
+
+    print(f"{report['requests']} requests in {report['duration']} s, "
+        f"{report['requests_per_second']} per second, "
+        f"p99 lag {report['lag_ms']['p99']:.2f} ms")
+
+    describe("all", report)
+    for credential, summary in report["by_credential"].items():
+        describe(credential, summary)
+
+    if "stub_calls_per_request" in report:
+        print(f"stub calls per request: {report['stub_calls_per_request']}")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traffic",
+        help="nginx access log or JSONL trace to replay")
+    parser.add_argument("--target", default="http://localhost:8000",
+        help="URL of the auth service")
+    parser.add_argument("--verify-path", default="/verify/")
+    parser.add_argument("--resource-header", default="X-Original-URI",
+        help="Header to send resource URIs in")
+    parser.add_argument("--resource-root", default="http://localhost",
+        help="Prefix of resource URIs read from access logs")
+    parser.add_argument("--credential", choices=CREDENTIAL_TYPES,
+        default="bearer",
+        help="Credential type for access log entries with a remote user")
+    parser.add_argument("--shared-secret",
+        help="The service's SECURITY_SHAREDSECRET, to sign account cookies")
+    parser.add_argument("--account-cookie-name", default="auth_tkt")
+    parser.add_argument("--secret-key",
+        help="The service's SECRET_KEY, to sign session cookies")
+    parser.add_argument("--session-engine", default="authenticate.sessions")
+    parser.add_argument("--session-cookie-name", default="sessionid")
+    parser.add_argument("--speed", type=float, default=1.0,
+        help="Replay speed relative to the recorded times, 0 for no delays")
+    parser.add_argument("--concurrency", type=int, default=16,
+        help="Maximum requests in flight")
+    parser.add_argument("--limit", type=int,
+        help="Number of entries to replay")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--stubs", type=int, metavar="PORT",
+        help="Run stub upstreams on this and the next three ports")
+    parser.add_argument("--stub-delay", type=float, default=0.0,
+        help="Seconds the stub upstreams wait before responding")
+    parser.add_argument("--output", help="File to write a JSON report to")
+    args = parser.parse_args()
+
+    entries = load_entries(args.traffic, args.resource_root, args.credential)
+    if args.limit:
+        entries = entries[:args.limit]
+
+    if not entries:
+        parser.error(f"No requests found in {args.traffic}")
+
+    credential_types = {entry.credential for entry in entries}
+    if "cookie" in credential_types and not args.shared_secret:
+        parser.error("--shared-secret is needed to replay cookie requests")
+    if "session" in credential_types and not args.secret_key:
+        parser.error("--secret-key is needed to replay session requests")
+
+    settings.configure(SECRET_KEY=args.secret_key or "replay")
+    django.setup()
+
+    shared_secret = None
+    if args.shared_secret:
+        shared_secret = base64.b64decode(args.shared_secret)
+
+    credentials = CredentialFactory(shared_secret, args.session_engine)
+
+    with ExitStack() as stack:
+
+        stubs = {}
+        if args.stubs:
+
+            for offset, (name, factory) in enumerate([
+                    ("introspection", stub_introspection_server),
+                    ("opa", stub_opa_server),
+                    ("saml", stub_soap_server),
+                    ("oidc", stub_oidc_server)]):
+
+                stubs[name] = stack.enter_context(factory(
+                    delay=args.stub_delay, port=args.stubs + offset))
+                print(f"Stub {name} server: {stubs[name].url}")
+
+        results, elapsed = Replayer(credentials, args).replay(entries)
+
+        stub_requests = None
+        if stubs:
+            stub_requests = {name: stub.requests
+                for name, stub in stubs.items()}
+
+    report = summarize(results, elapsed, stub_requests)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
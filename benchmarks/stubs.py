@@ -0,0 +1,272 @@
+""" Stub upstream servers for benchmarks. """
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import json
+import re
+import threading
+import time
+import uuid
+
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from authlib.jose import JsonWebKey, RSAKey, jwt
+
+
+SAML_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+SAML_RESPONSE_TEMPLATE = """\
+<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/">
+<SOAP-ENV:Body>
+<samlp:Response xmlns:samlp="urn:oasis:names:tc:SAML:2.0:protocol" \
+xmlns:saml="urn:oasis:names:tc:SAML:2.0:assertion" ID="{response_id}" \
+InResponseTo="{query_id}" IssueInstant="{now}" Version="2.0">
+<saml:Issuer Format="urn:oasis:names:tc:SAML:1.1:nameid-format:\
+X509SubjectName">/O=Stub/CN=authz</saml:Issuer>
+<samlp:Status>
+<samlp:StatusCode Value="urn:oasis:names:tc:SAML:2.0:status:Success"/>
+</samlp:Status>
+<saml:Assertion ID="{assertion_id}" IssueInstant="{now}" Version="2.0">
+<saml:Issuer Format="urn:oasis:names:tc:SAML:1.1:nameid-format:\
+X509SubjectName">/O=Stub/CN=authz</saml:Issuer>
+<saml:Subject>
+<saml:NameID Format="urn:esg:openid">{subject}</saml:NameID>
+</saml:Subject>
+<saml:Conditions NotBefore="{now}" NotOnOrAfter="{expires}"/>
+<saml:AuthzDecisionStatement Decision="{decision}" Resource="{resource}">
+<saml:Action Namespace="urn:oasis:names:tc:SAML:1.0:action:\
+rwedc-negation">read</saml:Action>
+</saml:AuthzDecisionStatement>
+</saml:Assertion>
+</samlp:Response>
+</SOAP-ENV:Body>
+</SOAP-ENV:Envelope>
+"""
+
+QUERY_ID_PATTERN = re.compile(rb'AuthzDecisionQuery[^>]*\sID="([^"]+)"')
+RESOURCE_PATTERN = re.compile(rb'Resource="([^"]*)"')
+SUBJECT_PATTERN = re.compile(rb'<(?:\w+:)?NameID[^>]*>([^<]*)<')
+
+
+def saml_response(query_id, resource, subject, decision="Permit"):
+    """ Returns a SOAP envelope containing a SAML authorization decision. """
+
+    now = datetime.utcnow()
+    return SAML_RESPONSE_TEMPLATE.format(
+        response_id=f"_{uuid.uuid4()}",
+        assertion_id=f"_{uuid.uuid4()}",
+        query_id=query_id,
+        now=now.strftime(SAML_DATETIME_FORMAT),
+        expires=(now + timedelta(hours=1)).strftime(SAML_DATETIME_FORMAT),
+        subject=subject,
+        resource=resource,
+        decision=decision,
+    ).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """ Base handler for stub upstreams, which keeps connections alive and
+    applies the server's configured delay.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    # Headers and body are written separately, which would otherwise wait
+    # on delayed ACKs from clients
+    disable_nagle_algorithm = True
+
+    def _read_body(self):
+
+        self.server.requests += 1
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _respond(self, body, content_type):
+
+        time.sleep(self.server.delay)
+
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubSOAPHandler(StubHandler):
+    """ Answers SAML authorization decision queries with the server's
+    configured decision.
+    """
+
+    def do_POST(self):
+
+        body = self._read_body()
+
+        query_id = QUERY_ID_PATTERN.search(body)
+        resource = RESOURCE_PATTERN.search(body)
+        subject = SUBJECT_PATTERN.search(body)
+
+        self._respond(
+            saml_response(
+                query_id.group(1).decode() if query_id else "",
+                resource.group(1).decode() if resource else "",
+                subject.group(1).decode() if subject else "",
+                self.server.decision,
+            ),
+            "text/xml"
+        )
+
+
+class StubOPAHandler(StubHandler):
+    """ Answers OPA data API queries with the server's configured result. """
+
+    def do_POST(self):
+
+        self._read_body()
+
+        body = json.dumps({
+            "result": self.server.result,
+            "provenance": {"bundles": {"authz": {"revision": "1"}}},
+        }).encode()
+        self._respond(body, "application/json")
+
+
+class StubIntrospectionHandler(StubHandler):
+    """ Answers token introspection requests, treating every token as an
+    active token for a user named after it.
+    """
+
+    def do_POST(self):
+
+        form = parse_qs(self._read_body().decode())
+        token = form.get("token", [""])[0]
+
+        body = json.dumps({
+            "active": True,
+            "preferred_username": f"user-{token}",
+            "groups": self.server.groups,
+            "exp": int(time.time()) + 3600,
+        }).encode()
+        self._respond(body, "application/json")
+
+
+class StubOIDCHandler(StubHandler):
+    """ Serves OIDC discovery, a JWKS and a token endpoint. Authorization
+    codes are used as the nonce of the ID tokens issued for them, so that
+    clients can complete a login flow without an authorization endpoint.
+    """
+
+    def do_GET(self):
+
+        self._read_body()
+
+        if self.path == "/.well-known/openid-configuration":
+            body = {
+                "issuer": self.server.url,
+                "authorization_endpoint": f"{self.server.url}/authorize",
+                "token_endpoint": f"{self.server.url}/token",
+                "jwks_uri": f"{self.server.url}/jwks",
+                "id_token_signing_alg_values_supported": ["RS256"],
+            }
+        elif self.path == "/jwks":
+            body = {"keys": [self.server.public_key]}
+        else:
+            body = {}
+
+        self._respond(json.dumps(body).encode(), "application/json")
+
+    def do_POST(self):
+
+        form = parse_qs(self._read_body().decode())
+        code = form.get("code", [""])[0]
+
+        now = int(time.time())
+        id_token = jwt.encode({"alg": "RS256", "kid": "stub"}, {
+            "iss": self.server.url,
+            "sub": "user",
+            "aud": self.server.client_id,
+            "iat": now,
+            "exp": now + 3600,
+            "nonce": code,
+            "preferred_username": "user",
+            "groups": self.server.groups,
+        }, self.server.private_key).decode()
+
+        body = json.dumps({
+            "access_token": uuid.uuid4().hex,
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "id_token": id_token,
+        }).encode()
+        self._respond(body, "application/json")
+
+
+class StubServer(ThreadingHTTPServer):
+    """ Stub upstream server running in a background thread. """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, handler_class, delay=0, status=200, host="127.0.0.1",
+            port=0, **attributes):
+        super().__init__((host, port), handler_class)
+
+        self.requests = 0
+        self.delay = delay
+        self.status = status
+        for name, value in attributes.items():
+            setattr(self, name, value)
+
+        self._thread = threading.Thread(target=self.serve_forever,
+            kwargs={"poll_interval": 0.05}, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_port}"
+
+    def __enter__(self):
+
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+
+        self.shutdown()
+        self.server_close()
+
+
+def stub_soap_server(decision="Permit", **kwargs):
+    """ Returns a stub SAML authorization service. """
+
+    return StubServer(StubSOAPHandler, decision=decision, **kwargs)
+
+
+def stub_opa_server(result=True, **kwargs):
+    """ Returns a stub OPA server. """
+
+    return StubServer(StubOPAHandler, result=result, **kwargs)
+
+
+def stub_introspection_server(groups=("badc",), **kwargs):
+    """ Returns a stub token introspection endpoint. """
+
+    return StubServer(StubIntrospectionHandler, groups=list(groups), **kwargs)
+
+
+def stub_oidc_server(client_id="auth-service", groups=("badc",), **kwargs):
+    """ Returns a stub OIDC provider. """
+
+    private_key = JsonWebKey.generate_key("RSA", 2048, is_private=True)
+    public_key = dict(RSAKey.import_key(private_key.get_public_key()),
+        kty="RSA", kid="stub")
+
+    return StubServer(StubOIDCHandler, client_id=client_id,
+        groups=list(groups), private_key=private_key, public_key=public_key,
+        **kwargs)
@@ -0,0 +1,490 @@
+""" Benchmark suite for the verify, login and login callback endpoints.
+
+Each scenario runs one endpoint through a combination of middleware, against
+local stub servers for token introspection, OPA, SAML and OIDC which wait
+`--delay` seconds before answering. Requests are sent through Django's test
+client and through a real WSGI server, and the requests per second, latency
+percentiles and upstream calls per request of each are reported.
+
+Results can be written as JSON with `--output` and compared with an earlier
+run with `--compare`, e.g.
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --compare before.json
+"""
+
+__author__ = "William Tucker"
+__date__ = "2026-10-18"
+__copyright__ = "Copyright 2026 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+
+
+import argparse
+import base64
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import django
+import requests
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from authenticate.config import meta_key
+from .stubs import stub_introspection_server, stub_oidc_server, \
+    stub_opa_server, stub_soap_server
+
+
+SECRET = os.urandom(32)
+
+BROWSER = ("Mozilla/5.0 (Windows NT 6.1; Win64; x64; rv:47.0) "
+    "Gecko/20100101 Firefox/47.0")
+
+SESSION = "django.contrib.sessions.middleware.SessionMiddleware"
+BEARER = "authenticate.oauth2.middleware.BearerTokenAuthenticationMiddleware"
+COOKIE = "authenticate.cookie.middleware.CookieAuthenticationMiddleware"
+OIDC = "authenticate.oidc.middleware.OpenIDConnectAuthenticationMiddleware"
+DISPATCH = "authenticate.middleware.DispatchAuthenticationMiddleware"
+LOGIN = "authorize.middleware.LoginAuthorizationMiddleware"
+OPA = "authorize.opa.middleware.OPAAuthorizationMiddleware"
+SAML = "authorize.saml.middleware.SAMLAuthorizationMiddleware"
+
+SCENARIOS = [
+    {"name": "verify-session-login", "request": "session",
+        "middleware": [SESSION, BEARER, LOGIN]},
+    {"name": "verify-bearer-login", "request": "bearer",
+        "middleware": [SESSION, BEARER, LOGIN]},
+    {"name": "verify-cookie-login", "request": "cookie",
+        "middleware": [SESSION, COOKIE, LOGIN]},
+    {"name": "verify-dispatch-login", "request": "bearer",
+        "middleware": [SESSION, DISPATCH, LOGIN]},
+    {"name": "verify-bearer-opa", "request": "bearer",
+        "middleware": [SESSION, BEARER, OPA]},
+    {"name": "verify-bearer-saml", "request": "bearer",
+        "middleware": [SESSION, BEARER, SAML]},
+    {"name": "login", "request": "login",
+        "middleware": [SESSION, OIDC, LOGIN]},
+    {"name": "login-callback", "request": "callback",
+        "middleware": [SESSION, OIDC, LOGIN]},
+]
+
+EXPECTED_STATUS = {
+    "session": 200,
+    "bearer": 200,
+    "cookie": 200,
+    "login": 302,
+    "callback": 302,
+}
+
+
+def configure(stubs, concurrency, uncached):
+
+    oidc_url = stubs["oidc"].url
+
+    cache_settings = {
+        "OAUTH2_INTROSPECTION_CACHE_TTL": 300,
+        "SAML_PERMIT_CACHE_TTL": 300,
+        "SAML_DENY_CACHE_TTL": 30,
+    }
+    if uncached:
+        cache_settings = {
+            "OAUTH2_INTROSPECTION_CACHE_SIZE": 0,
+            "COOKIE_TICKET_CACHE_SIZE": 0,
+            "SAML_DECISION_CACHE_SIZE": 0,
+        }
+
+    settings.configure(
+        SECRET_KEY="benchmark",
+        ALLOWED_HOSTS=["*"],
+        ROOT_URLCONF="auth_service.urls",
+        INSTALLED_APPS=["django.contrib.sessions", "authenticate"],
+        MIDDLEWARE=[],
+        SESSION_ENGINE="authenticate.sessions",
+        OAUTH_CLIENT_ID="auth-service",
+        OAUTH_CLIENT_SECRET="benchmark",
+        OAUTH_TOKEN_INTROSPECT_URL=stubs["introspection"].url,
+        ACCOUNT_COOKIE_NAME="auth_tkt",
+        SECURITY_SHAREDSECRET=base64.b64encode(SECRET).decode(),
+        OIDC_BACKEND_CLIENT_NAME="benchmark",
+        AUTHLIB_OAUTH_CLIENTS={
+            "benchmark": {
+                "client_id": "auth-service",
+                "client_secret": "benchmark",
+                "server_metadata_url":
+                    f"{oidc_url}/.well-known/openid-configuration",
+                "client_kwargs": {"scope": "openid profile"},
+            },
+        },
+        OPA_SERVER={
+            "host": "127.0.0.1",
+            "port": stubs["opa"].server_port,
+            "package_path": "authz",
+            "rule_name": "allow",
+        },
+        AUTHORIZATION_SERVICE_URL=stubs["saml"].url,
+        OUTBOUND_HTTP={"pool_maxsize": concurrency},
+        CIRCUIT_BREAKER={"failure_threshold": 0},
+        **cache_settings,
+    )
+    django.setup()
+
+
+class ClientDriver:
+    """ Sends requests through Django's test client. """
+
+    name = "client"
+
+    def __init__(self, url=None):
+
+        from django.test import Client
+        self.client = Client()
+
+    def set_cookie(self, name, value):
+        self.client.cookies[name] = value
+
+    def clear_cookies(self):
+        self.client.cookies.clear()
+
+    def get(self, path, params=None, headers=None):
+
+        meta = {meta_key(name): value
+            for name, value in (headers or {}).items()}
+
+        response = self.client.get(path, params, **meta)
+        return response.status_code, response.get("Location")
+
+
+class ServerDriver:
+    """ Sends requests to a WSGI server over HTTP. """
+
+    name = "server"
+
+    def __init__(self, url):
+
+        self.url = url
+        self.session = requests.Session()
+
+    def set_cookie(self, name, value):
+        self.session.cookies.set(name, value)
+
+    def clear_cookies(self):
+        self.session.cookies.clear()
+
+    def get(self, path, params=None, headers=None):
+
+        response = self.session.get(f"{self.url}{path}", params=params,
+            headers=headers, allow_redirects=False)
+        return response.status_code, response.headers.get("Location")
+
+
+DRIVERS = {
+    "client": ClientDriver,
+    "server": ServerDriver,
+}
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def wsgi_server():
+    """ Serves the Django application for the current settings from a
+    background thread and yields its URL.
+    """
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    server = make_server("127.0.0.1", 0, WSGIHandler(),
+        server_class=ThreadingWSGIServer,
+        handler_class=QuietWSGIRequestHandler)
+
+    thread = threading.Thread(target=server.serve_forever,
+        kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def resource(i):
+    return f"http://data.example.com/badc/{i}.nc"
+
+
+def build_credentials(users):
+    """ Returns a session cookie, account cookies and bearer tokens for a
+    number of users.
+    """
+
+    from crypto_cookie.auth_tkt import SecureCookie
+    from authenticate.sessions import SessionStore
+    from authenticate.utils import USER_SESSION_KEY, User
+
+    session = SessionStore()
+    session[USER_SESSION_KEY] = User("user", ["badc"])._asdict()
+
+    return {
+        "session": session._get_session_key(),
+        "cookies": [SecureCookie(SECRET, f"user-{i}", "127.0.0.1")
+            .cookie_value() for i in range(users)],
+        "tokens": [f"token-{i}" for i in range(users)],
+    }
+
+
+def prepare_request(kind, driver, i, credentials):
+    """ Sets up a request of some kind and returns a function which sends it.
+    Any requests needed beforehand, such as the login before a callback, are
+    sent here so that they aren't timed.
+    """
+
+    params = {"next": resource(i)}
+
+    # Drop session cookies set by earlier responses, so that each request is
+    # authenticated with the credentials it's meant to present
+    driver.clear_cookies()
+
+    if kind == "session":
+        driver.set_cookie(settings.SESSION_COOKIE_NAME,
+            credentials["session"])
+        return lambda: driver.get("/verify/", params)
+
+    if kind == "bearer":
+        tokens = credentials["tokens"]
+        headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+        return lambda: driver.get("/verify/", params, headers)
+
+    if kind == "cookie":
+        cookies = credentials["cookies"]
+        driver.set_cookie("auth_tkt", cookies[i % len(cookies)])
+        return lambda: driver.get("/verify/", params)
+
+    headers = {"User-Agent": BROWSER}
+    if kind == "login":
+        return lambda: driver.get("/login/", params, headers)
+
+    # The stub OIDC server accepts the nonce as the authorization code
+    _, location = driver.get("/login/", params, headers)
+    query = parse_qs(urlparse(location).query)
+    callback_params = {
+        "code": query["nonce"][0],
+        "state": query["state"][0],
+    }
+    return lambda: driver.get("/login/callback/", callback_params)
+
+
+def percentile(latencies, fraction):
+    """ Returns a percentile of some sorted latencies. """
+
+    index = min(int(len(latencies) * fraction), len(latencies) - 1)
+    return latencies[index]
+
+
+def run_scenario(scenario, driver_class, url, args, credentials, stubs):
+    """ Sends a scenario's requests with a driver and returns its results.
+    """
+
+    local = threading.local()
+    expected_status = EXPECTED_STATUS[scenario["request"]]
+
+    def send(i):
+
+        driver = getattr(local, "driver", None)
+        if driver is None:
+            driver = local.driver = driver_class(url)
+
+        request = prepare_request(scenario["request"], driver, i,
+            credentials)
+
+        started = time.perf_counter()
+        status, _ = request()
+        return time.perf_counter() - started, status == expected_status
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+
+        list(executor.map(send, range(args.warmup)))
+        upstream_requests = {name: stub.requests
+            for name, stub in stubs.items()}
+
+        started = time.perf_counter()
+        results = list(executor.map(send, range(args.number)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+
+    return {
+        "scenario": scenario["name"],
+        "driver": driver_class.name,
+        "middleware": scenario["middleware"],
+        "requests": args.number,
+        "errors": errors,
+        "requests_per_second": round(args.number / elapsed, 1),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(percentile(latencies, 0.5), 3),
+            "p90": round(percentile(latencies, 0.9), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "upstream_requests_per_request": {
+            name: round((stub.requests - upstream_requests[name]) /
+                args.number, 3)
+            for name, stub in stubs.items()
+        },
+    }
+
+
+def get_commit():
+    """ Returns the current git commit, if known. """
+
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result, baseline=None):
+
+    latency = result["latency_ms"]
+    line = (f"{result['scenario']:<22} {result['driver']:<6} "
+        f"{result['requests_per_second']:>8.0f} rps  "
+        f"p50 {latency['p50']:>7.2f} ms  p99 {latency['p99']:>7.2f} ms  "
+        f"{result['errors']} errors")
+
+    if baseline:
+
+        rps_change = result["requests_per_second"] / \
+            baseline["requests_per_second"] - 1
+        p99_change = latency["p99"] / baseline["latency_ms"]["p99"] - 1
+        line += f"  ({rps_change:+.1%} rps, {p99_change:+.1%} p99)"
+
+    print(line)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=500,
+        help="Timed requests per scenario and driver")
+    parser.add_argument("--warmup", type=int, default=20,
+        help="Untimed requests sent first")
+    parser.add_argument("--concurrency", type=int, default=1,
+        help="Requests in flight at once")
+    parser.add_argument("--delay", type=float, default=0.0,
+        help="Seconds the stub upstreams wait before responding")
+    parser.add_argument("--users", type=int, default=100,
+        help="Number of distinct tokens and account cookies")
+    parser.add_argument("--uncached", action="store_true",
+        help="Disable the introspection, cookie and SAML caches")
+    parser.add_argument("--scenarios", nargs="+",
+        choices=[scenario["name"] for scenario in SCENARIOS],
+        help="Scenarios to run, by default all of them")
+    parser.add_argument("--drivers", nargs="+", choices=list(DRIVERS),
+        default=list(DRIVERS))
+    parser.add_argument("--output", help="File to write JSON results to")
+    parser.add_argument("--compare",
+        help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    baselines = {}
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            for result in json.load(baseline_file)["results"]:
+                baselines[(result["scenario"], result["driver"])] = result
+
+    with ExitStack() as stack:
+
+        stubs = {
+            name: stack.enter_context(factory(delay=args.delay))
+            for name, factory in [
+                ("introspection", stub_introspection_server),
+                ("opa", stub_opa_server),
+                ("saml", stub_soap_server),
+                ("oidc", stub_oidc_server),
+            ]
+        }
+
+        configure(stubs, args.concurrency, args.uncached)
+
+        from django.test import override_settings
+
+        credentials = build_credentials(args.users)
+
+        results = []
+        skipped = []
+        for scenario in SCENARIOS:
+
+            if args.scenarios and scenario["name"] not in args.scenarios:
+                continue
+
+            try:
+                for path in scenario["middleware"]:
+                    import_string(path)
+
+            except ImportError as e:
+                print(f"{scenario['name']:<22} skipped: {e}")
+                skipped.append(scenario["name"])
+                continue
+
+            with override_settings(MIDDLEWARE=scenario["middleware"]):
+                for driver_name in args.drivers:
+
+                    driver_class = DRIVERS[driver_name]
+                    with ExitStack() as server_stack:
+
+                        url = None
+                        if driver_class is ServerDriver:
+                            url = server_stack.enter_context(wsgi_server())
+
+                        result = run_scenario(scenario, driver_class, url,
+                            args, credentials, stubs)
+
+                    results.append(result)
+                    print_result(result,
+                        baselines.get((result["scenario"], driver_name)))
+
+    if args.output:
+
+        with open(args.output, "w") as output_file:
+            json.dump({
+                "metadata": {
+                    "commit": get_commit(),
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ",
+                        time.gmtime()),
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                    "arguments": {name: value
+                        for name, value in vars(args).items()
+                        if name not in ("output", "compare")},
+                },
+                "skipped": skipped,
+                "results": results,
+            }, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
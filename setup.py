@@ -23,7 +23,7 @@ setup(
     long_description=LONG_DESCRIPTION,
     long_description_content_type="text/markdown",
     include_package_data=True,
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=[
         "Authlib",
         "django",
@@ -34,8 +34,8 @@ setup(
         "ua-parser",
         "user-agents",
         "requests",
+        "httpx",
         "crypto-cookie",
-        "OPA-python-client",
     ],
     classifiers=[
         "Development Status :: 4 - Beta",